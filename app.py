@@ -1,76 +1,261 @@
 import os
+import json
+import asyncio
+import signal
+import threading
+import time
+import multiprocessing
 from dotenv import load_dotenv
-from quart import Quart, request, jsonify, render_template
+from quart import Quart, Response, request, jsonify, render_template, make_response
 from werkzeug.utils import secure_filename
-from playwright.async_api import async_playwright
-from utils import DynamicWeb,Agent
+from utils import DynamicWeb,Agent,BrowserPool,ResourcePolicy,HarArchive,JobQueue,Metrics,Tracer,configure_logging,log
 
 app = Quart(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 load_dotenv('.env')  # Load environment variables from .env file in current directory
+configure_logging()  # JSON lines on stdout via a background thread; LOG_LEVEL / LOG_FORMAT
 
 api_key=os.environ.get("OPENAI_API_KEY")
 cap_key=os.environ.get("CAP_API")
 
+# Warm browsers shared by every /process request; each job leases its own context.
+# '--single-process' is left out because several contexts share one browser.
+browser_pool = BrowserPool(
+    size=int(os.environ.get("BROWSER_POOL_SIZE", 2)),
+    max_contexts=int(os.environ.get("BROWSER_MAX_CONTEXTS", 4)),
+    max_jobs=int(os.environ.get("BROWSER_MAX_JOBS", 50)),
+    max_memory_mb=int(os.environ.get("BROWSER_MAX_MEMORY_MB", 1500)),
+    resource_policy=ResourcePolicy.from_env(),  # BLOCK_RESOURCES=1 skips images, media, fonts and trackers
+    har_archive=HarArchive.from_env(),  # HAR_MODE=record saves each site, HAR_MODE=replay serves it offline
+    launch_args=[
+        '--ignore-ssl-errors',
+        '--ignore-certificate-errors',
+        '--ignore-certificate-errors-spki-list',
+        '--ignore-ssl-errors-spki-list',
+        '--disable-web-security',
+        '--disable-features=VizDisplayCompositor',
+        '--no-sandbox',
+        '--disable-dev-shm-usage',
+        '--disable-gpu'
+    ]
+)
+
+async def run_job(payload, emit):
+    return await run_playwright(payload['url'], payload.get('userData'), on_step=emit)
+
+# /process only enqueues; JOB_WORKERS jobs run at once and JOB_MAX_PENDING may wait.
+# JOB_BACKEND=redis://host:6379/0 shares the queue between app processes.
+job_queue = JobQueue.from_env(run_job)
+# False in the web process of multi-process mode, where browsers live in the workers
+runs_browsers = True
+
+@app.before_serving
+async def start_browser_pool():
+    if runs_browsers:
+        await browser_pool.start()
+    await job_queue.start()
+
+@app.after_serving
+async def stop_browser_pool():
+    await job_queue.stop(drain_timeout=float(os.environ.get("DRAIN_TIMEOUT", 60)))
+    if runs_browsers:
+        await browser_pool.stop()
+
 @app.route('/', methods=['GET'])
 async def home():
     return await render_template('index.html')  # HTML form lives here
 
+# Worker processes write their metrics here for the supervisor's /metrics
+METRICS_DIR = os.environ.get("METRICS_DIR", "cache/metrics")
+
+def write_metrics_snapshot(name):
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"{name}.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(Tracer.metrics.snapshot(), f)
+    os.replace(path + ".tmp", path)
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    Tracer.metrics.set("dynamicforms_jobs_pending", await job_queue.store.pending())
+    snapshots = [Tracer.metrics.snapshot()]
+    if not runs_browsers and os.path.isdir(METRICS_DIR):
+        for name in sorted(os.listdir(METRICS_DIR)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(METRICS_DIR, name), encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return Response(Metrics.merge(snapshots).render(), content_type="text/plain; version=0.0.4")
+
 @app.route('/process', methods=['POST'])
 async def process_url():
     try:
         data = await request.get_json()
-        print(data)
+        log.debug("Received /process request: %s", data)
         url = data.get('url')
         user_data = data.get('userData')  # <-- get userData from frontend
         if not url:
             return jsonify({"error": "Missing URL"}), 400
 
-        result = await run_playwright(url, user_data)
-        return jsonify(result)
+        job = await job_queue.submit({"url": url, "userData": user_data})
+        if job is None:
+            return jsonify({"status": "busy", "message": "Too many queued jobs, retry later"}), 429, {"Retry-After": "30"}
+        return jsonify({
+            "job_id": job["id"],
+            "status": job["status"],
+            "status_url": f"/process/{job['id']}",
+            "events_url": f"/process/{job['id']}/events"
+        }), 202
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
-async def run_playwright(url, user_data=None):
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=True,
-            args=[
-                '--ignore-ssl-errors',
-                '--ignore-certificate-errors',
-                '--ignore-certificate-errors-spki-list',
-                '--ignore-ssl-errors-spki-list',
-                '--disable-web-security',
-                '--disable-features=VizDisplayCompositor',
-                '--no-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-gpu',
-                '--single-process'
-            ]
-        )
-        context = await browser.new_context(ignore_https_errors=True)
-        page = await context.new_page()
-
-        pipe = DynamicWeb(cap_key, api_key, user_data=user_data)  # <-- pass user_data
+@app.route('/process/<job_id>', methods=['GET'])
+async def job_status(job_id):
+    job = await job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
+
+@app.route('/process/<job_id>/events', methods=['GET'])
+async def job_events(job_id):
+    if await job_queue.get(job_id) is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    async def send_events():
+        async for event in job_queue.stream(job_id):
+            if event is None:
+                yield b": keep-alive\n\n"  # SSE comment so proxies keep the connection open
+            else:
+                yield f"event: {event['step']}\ndata: {json.dumps(event)}\n\n".encode()
+
+    response = await make_response(send_events(), {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    response.timeout = None
+    return response
+
+async def run_playwright(url, user_data=None, on_step=None):
+    pipe = DynamicWeb(cap_key, api_key, user_data=user_data, browser_pool=browser_pool, on_step=on_step)  # <-- pass user_data
+
+    try:
+        # process_page leases a fresh context from the pool and navigates itself
+        result = await pipe.process_page(None, url)
+        if not isinstance(result, dict):
+            result = {"status": "failed", "message": "Form could not be processed"}
+        result["timings"] = pipe.timings
+        return result
+
+    except Exception as e:
+        log.exception("Error in run_playwright")
+        return {"status": "error", "message": str(e)}
+
+def run_worker(shard):
+    """Worker process: own Playwright and browser pool, runs the jobs of one shard until SIGTERM."""
+    async def serve():
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stopping.set)
 
+        async def publish_metrics():
+            while True:
+                await asyncio.sleep(10)
+                write_metrics_snapshot(f"worker-{shard}")
+
+        queue = JobQueue.from_env(run_job, shard=shard)
+        await browser_pool.start()
+        await queue.start()
+        publisher = asyncio.create_task(publish_metrics())
         try:
-            print(f"[🌐] Navigating to {url}")
-            await page.goto(url)
-            await page.wait_for_load_state("networkidle")
-
-            # Process the page after CAPTCHA handling
-            result = await pipe.process_page(page, url)
-            return result
-            
-
-        except Exception as e:
-            print(f"[!] Error in run_playwright: {str(e)}")
-            return {"status": "error", "message": str(e)}
+            await stopping.wait()
+            log.info("Worker %s draining", shard)
+            await queue.stop(drain_timeout=float(os.environ.get("DRAIN_TIMEOUT", 60)))
         finally:
-            await browser.close()
+            publisher.cancel()
+            write_metrics_snapshot(f"worker-{shard}")
+            await browser_pool.stop()
+
+    asyncio.run(serve())
+
+def start_worker(context, shard):
+    process = context.Process(target=run_worker, args=(shard,), name=f"form-worker-{shard}")
+    process.start()
+    return process
+
+def monitor_workers(context, processes, stopping, interval=2.0):
+    """Restart worker processes that exit, backing off while a shard keeps crashing.
+
+    A restarted worker's JobQueue.start() calls store.recover(), so the jobs
+    its shard had claimed are queued again instead of being lost.
+    """
+    started = [time.monotonic()] * len(processes)
+    failures = [0] * len(processes)
+    while not stopping.wait(interval):
+        for shard, process in enumerate(processes):
+            if process.is_alive():
+                continue
+            now = time.monotonic()
+            # A worker that ran for a while before dying starts a fresh backoff
+            if now - started[shard] > 60:
+                failures[shard] = 0
+            delay = min(60, 2 ** failures[shard]) if failures[shard] else 0
+            if now - started[shard] < delay:
+                continue
+            log.warning("%s exited with code %s, restarting", process.name, process.exitcode)
+            failures[shard] += 1
+            started[shard] = now
+            processes[shard] = start_worker(context, shard)
+
+def run_supervisor(port, workers):
+    """Serve HTTP here and run the browser jobs in ``workers`` processes, sharded by domain."""
+    global job_queue, runs_browsers
+    # Every process shares the job store; SQLite unless JOB_BACKEND names Redis
+    if os.environ.get("JOB_BACKEND", "memory") == "memory":
+        os.environ["JOB_BACKEND"] = "sqlite:///cache/jobs.sqlite3"
+    os.environ["JOB_SHARDS"] = str(workers)
+    job_queue = JobQueue.from_env(run_job, workers=0)
+    runs_browsers = False
+
+    # Drop snapshots left by an earlier run with a different worker count
+    if os.path.isdir(METRICS_DIR):
+        for name in os.listdir(METRICS_DIR):
+            if name.startswith("worker-"):
+                os.remove(os.path.join(METRICS_DIR, name))
+
+    context = multiprocessing.get_context("spawn")
+    processes = [start_worker(context, shard) for shard in range(workers)]
+    stopping = threading.Event()
+    monitor = threading.Thread(target=monitor_workers, args=(context, processes, stopping),
+                               name="worker-monitor", daemon=True)
+    monitor.start()
+    log.info("Supervisor started %s worker processes", workers)
+    try:
+        app.run(host="0.0.0.0", port=port)
+    finally:
+        stopping.set()
+        monitor.join()
+        # SIGTERM lets each worker finish its running jobs before it exits
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = float(os.environ.get("DRAIN_TIMEOUT", 60)) + 15
+        for process in processes:
+            process.join(timeout=deadline)
+            if process.is_alive():
+                log.warning("%s did not drain in time, killing it", process.name)
+                process.kill()
 
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port)
+    workers = int(os.environ.get("APP_WORKERS", 1))
+    if workers > 1:
+        run_supervisor(port, workers)
+    else:
+        app.run(host="0.0.0.0", port=port)
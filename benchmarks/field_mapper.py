@@ -0,0 +1,116 @@
+"""Microbenchmark: FormFieldMapper.map_field / find_button_pattern.
+
+Compares the compiled matcher against the original nested re.search loop on
+the same identifiers and checks both give identical answers. The compiled
+matcher is timed with and without its LRU cache: the uncached figure is what a
+never-seen field costs, the cached one what a repeated identifier costs.
+Every figure is the median of several runs.
+
+    python benchmarks/field_mapper.py [rounds] [repeat]
+"""
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import FormFieldMapper
+
+
+IDENTIFIERS = [
+    ('first_name', 'input_1_3', 'First Name'),
+    ('last-name', 'lname', 'Your surname'),
+    ('your-email', 'email-field', 'Email Address'),
+    ('phone', 'tel', '(555) 555-5555'),
+    ('message', 'comments', 'How can we help?'),
+    ('company_name', None, 'Business'),
+    ('input_7', 'field_7', 'Street address'),
+    ('zip', 'postal_code', None),
+    ('g-recaptcha-response', None, None),
+    ('fields[country]', 'country-select', 'Country'),
+    ('qty', 'quantity', 'Quantity'),
+    ('wpforms[fields][4]', 'wpforms-123-field_4', 'Project details'),
+    (None, None, 'Preferred date'),
+    ('utm_source', None, None),
+]
+
+BUTTON_TEXTS = [
+    'Get a Free Quote', 'Request an Estimate', 'Contact Us Today', 'Learn more',
+    'Home', 'About', 'Get Started', 'Schedule a consultation form', 'Facebook',
+]
+
+
+def legacy_map_field(mapper, field_name, field_id, placeholder):
+    """The original implementation, kept here as the reference."""
+    identifiers = [field_name, field_id, placeholder]
+    identifiers = [i.lower() for i in identifiers if i]
+    for field_type, field_info in mapper.field_patterns.items():
+        for pattern in field_info['patterns']:
+            for identifier in identifiers:
+                if re.search(pattern, identifier, re.IGNORECASE):
+                    return field_type
+    return None
+
+
+def legacy_find_button_pattern(mapper, text):
+    text = text.lower()
+    return any(re.search(pattern, text, re.IGNORECASE) for pattern in mapper.form_button_patterns)
+
+
+def per_call(func, calls_per_round, rounds, repeat):
+    """Median seconds per call over ``repeat`` runs of ``rounds`` rounds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func()
+        samples.append((time.perf_counter() - start) / (rounds * calls_per_round))
+    return statistics.median(samples)
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    mapper = FormFieldMapper()
+
+    for ids in IDENTIFIERS:
+        expected = legacy_map_field(mapper, *ids)
+        actual = mapper.map_field(*ids)[0]
+        assert expected == actual, f"{ids}: expected {expected}, got {actual}"
+    for text in BUTTON_TEXTS:
+        assert legacy_find_button_pattern(mapper, text) == mapper.find_button_pattern(text), text
+
+    # The single-pass matcher on its own, bypassing the matcher's LRU cache
+    uncached = mapper._matcher.__wrapped__
+
+    fields = len(IDENTIFIERS)
+    buttons = len(BUTTON_TEXTS)
+    results = {
+        'map_field legacy': per_call(
+            lambda: [legacy_map_field(mapper, *ids) for ids in IDENTIFIERS], fields, rounds, repeat),
+        'map_field single-pass (uncached)': per_call(
+            lambda: [uncached(tuple(i.lower() for i in ids if i)) for ids in IDENTIFIERS], fields, rounds, repeat),
+        'map_field compiled + LRU (repeat identifiers)': per_call(
+            lambda: [mapper.map_field(*ids) for ids in IDENTIFIERS], fields, rounds, repeat),
+        'find_button_pattern legacy': per_call(
+            lambda: [legacy_find_button_pattern(mapper, t) for t in BUTTON_TEXTS], buttons, rounds, repeat),
+        'find_button_pattern compiled': per_call(
+            lambda: [mapper.find_button_pattern(t) for t in BUTTON_TEXTS], buttons, rounds, repeat),
+    }
+
+    print(f"[📊] {fields} fields, {buttons} button texts; median of {repeat} runs x {rounds} rounds")
+    for name, seconds in results.items():
+        print(f"  - {name}: {seconds * 1e6:.2f} µs/call")
+    legacy = results['map_field legacy']
+    print(f"[✓] map_field single-pass speedup (uncached): "
+          f"{legacy / results['map_field single-pass (uncached)']:.1f}x")
+    print(f"[✓] map_field speedup with a warm cache (the same identifiers seen again): "
+          f"{legacy / results['map_field compiled + LRU (repeat identifiers)']:.1f}x")
+    print(f"[✓] find_button_pattern speedup: "
+          f"{results['find_button_pattern legacy'] / results['find_button_pattern compiled']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""Offline benchmark and regression check for form detection.
+
+Loads every HTML snapshot listed in benchmarks/fixtures/manifest.json into
+Chromium with page.set_content (every network request is aborted), then runs
+find_form_elements, the find_button candidate extraction and ranking, and
+FormFieldMapper on the detected form's fields. LLM agents are replaced by
+deterministic fakes, so nothing leaves the machine.
+
+For each fixture it prints per-step latency (median over the rounds),
+Playwright round trips, fake LLM calls and whether the detected form, the
+chosen navigation element and the field mapping match the manifest. The exit
+status is 1 when a form or button expectation fails, when field accuracy
+drops below --min-field-accuracy, or when no round trips were counted.
+
+    python benchmarks/form_detection.py [rounds] [--json report.json] [--only NAME]
+
+Manifest entries: ``file`` (relative to the manifest), ``form`` (a CSS
+selector the detected form or iframe must match, or null for "no form"),
+``button`` (a regex the chosen element's text or href must match, or null
+for "nothing should be chosen") and ``fields`` (field name or id ->
+expected FormFieldMapper type).
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright
+
+from utils import DynamicWeb, Tracer, traced
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+STEPS = ('set_content', 'find_form', 'map_fields', 'button_candidates')
+
+
+class FakeAgent:
+    """Deterministic stand-in for utils.Agent.
+
+    Navigation questions get index 0 (the local ranker's best candidate),
+    option questions get the first option, and everything else is reported
+    as a success.
+    """
+
+    def __init__(self, role: str):
+        self.role = role
+        self.calls = 0
+
+    @traced("llm")
+    async def analyze(self, content, additional_context=None):
+        self.calls += 1
+        Tracer.annotate(role=self.role, fake=True)
+        try:
+            options = json.loads(content)
+        except (TypeError, ValueError):
+            options = None
+        selected = options[0] if isinstance(options, list) and options else None
+        return {
+            "status": "success",
+            "confidence": 50,
+            "best_element_index": 0,
+            "selected_option": selected,
+            "message": "offline fake",
+            "reasoning": "offline fake"
+        }
+
+
+def offline_pipeline():
+    """A DynamicWeb whose agents are all FakeAgents."""
+    pipe = DynamicWeb(None, 'offline-benchmark')
+    fakes = []
+    for owner, attr in ((pipe.navigation_agent, 'agent'), (pipe.sentiment_analyzer, 'agent'),
+                        (pipe.form_analyzer, 'sentiment_agent'), (pipe.form_analyzer, 'radio_agent'),
+                        (pipe.form_analyzer, 'dropdown_agent')):
+        fake = FakeAgent(getattr(owner, attr).role)
+        setattr(owner, attr, fake)
+        fakes.append(fake)
+    return pipe, fakes
+
+
+async def form_root(pipe, page, identifier):
+    """The detected form's element handle and the frame or locator holding its fields."""
+    if identifier[0] == 'iframe':
+        frame = await pipe._resolve_form_frame(page, identifier[1])
+        if frame is None:
+            return None, None
+        return await frame.frame_element(), frame.locator('html')
+    root = page.locator(pipe.form_selector(identifier)).first
+    if await root.count() == 0:
+        return None, None
+    return await root.element_handle(), root
+
+
+@traced("map_fields")
+async def map_fields(pipe, root):
+    """field name (or id) -> FormFieldMapper type, the same lookups fill_form makes."""
+    mapped = {}
+    for field in await root.evaluate(pipe.FIELD_DESCRIBE_SCRIPT):
+        if not field['visible'] or field['type'] in pipe.NON_TEXT_TYPES or field['tag'] == 'select':
+            continue
+        field_type, _ = pipe.field_mapper.map_field(field['name'], field['id'], field['placeholder'])
+        if not field_type:
+            field_type, _ = pipe.field_mapper.map_field(field['label'], field['ariaLabel'], None)
+        mapped[field['name'] or field['id']] = field_type
+    return mapped
+
+
+async def run_once(pipe, page, html):
+    tracer = Tracer('fixture').activate()
+    try:
+        with tracer.span('set_content'):
+            await page.set_content(html, wait_until='domcontentloaded')
+        identifier = await pipe.find_form_elements(page)
+        element, root = await form_root(pipe, page, identifier) if identifier else (None, None)
+        mapped = await map_fields(pipe, root) if root is not None else {}
+        with tracer.span('button_candidates'):
+            elements = await page.evaluate(pipe.CLICKABLE_SCRIPT, 150)
+            choice = await pipe.navigation_agent.analyze_navigation_elements(elements)
+    finally:
+        tracer.deactivate()
+    index = choice.get('best_element_index', -1)
+    chosen = elements[index] if 0 <= index < len(elements) else None
+    return tracer.summary(), identifier, element, mapped, chosen
+
+
+async def check(fixture, identifier, element, mapped, chosen):
+    expected_form = fixture.get('form')
+    if expected_form is None:
+        form_ok = not identifier
+    else:
+        form_ok = element is not None and await element.evaluate(
+            "(el, selector) => el.matches(selector) || !!el.closest(selector)", expected_form)
+
+    expected_button = fixture.get('button')
+    if expected_button is None:
+        button_ok = chosen is None
+    else:
+        button_ok = chosen is not None and bool(
+            re.search(expected_button, f"{chosen['text']} {chosen['href']}", re.IGNORECASE))
+
+    expected_fields = fixture.get('fields', {})
+    correct = sum(1 for key, field_type in expected_fields.items() if mapped.get(key) == field_type)
+    return form_ok, button_ok, correct, len(expected_fields)
+
+
+async def run_fixture(browser, fixture, rounds):
+    with open(os.path.join(FIXTURES, fixture['file']), encoding='utf-8', errors='replace') as f:
+        html = f.read()
+
+    context = await browser.new_context()
+    await context.route('**/*', lambda route: route.abort())
+    try:
+        page = await context.new_page()
+        pipe, fakes = offline_pipeline()
+        samples = []
+        for _ in range(rounds):
+            summary, identifier, element, mapped, chosen = await run_once(pipe, page, html)
+            samples.append(summary)
+        form_ok, button_ok, correct, expected = await check(fixture, identifier, element, mapped, chosen)
+    finally:
+        await context.close()
+
+    last = samples[-1]
+    return {
+        'name': fixture['name'],
+        'latency_ms': {
+            step: round(statistics.median(s['steps'].get(step, 0) for s in samples) * 1000, 2)
+            for step in STEPS
+        },
+        'total_ms': round(statistics.median(s['total'] for s in samples) * 1000, 2),
+        'round_trips': last['round_trips'],
+        'round_trips_by_step': {
+            span['name']: span['round_trips'] for span in last['spans'] if span['round_trips']
+        },
+        'llm_calls': sum(fake.calls for fake in fakes) // rounds,
+        'form': list(identifier) if identifier else None,
+        'form_ok': form_ok,
+        'button': chosen['text'] if chosen else None,
+        'button_ok': button_ok,
+        'fields_correct': correct,
+        'fields_expected': expected,
+        'fields': mapped,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('rounds', nargs='?', type=int, default=5)
+    parser.add_argument('--json', help='also write the full report to this file')
+    parser.add_argument('--only', help='run only the fixture with this name')
+    parser.add_argument('--manifest', default=os.path.join(FIXTURES, 'manifest.json'))
+    parser.add_argument('--min-field-accuracy', type=float, default=0.0)
+    args = parser.parse_args()
+
+    with open(args.manifest, encoding='utf-8') as f:
+        fixtures = [fx for fx in json.load(f) if not args.only or fx['name'] == args.only]
+
+    async with async_playwright() as playwright:
+        Tracer.instrument(playwright)
+        browser = await playwright.chromium.launch(headless=True)
+        try:
+            results = [await run_fixture(browser, fixture, args.rounds) for fixture in fixtures]
+        finally:
+            await browser.close()
+
+    print(f"[📊] {len(results)} fixtures, {args.rounds} rounds each (median latency)")
+    for r in results:
+        steps = ', '.join(f"{step} {ms:.1f}" for step, ms in r['latency_ms'].items())
+        print(f"  - {r['name']}: {r['total_ms']:.1f} ms ({steps}), "
+              f"{r['round_trips']} round trips, {r['llm_calls']} LLM calls")
+        print(f"      form {'✓' if r['form_ok'] else '✗'} {r['form']}, "
+              f"button {'✓' if r['button_ok'] else '✗'} {r['button']!r}, "
+              f"fields {r['fields_correct']}/{r['fields_expected']}")
+
+    detection_ok = all(r['form_ok'] and r['button_ok'] for r in results)
+    expected = sum(r['fields_expected'] for r in results)
+    accuracy = sum(r['fields_correct'] for r in results) / expected if expected else 1.0
+    print(f"[{'✓' if detection_ok else '!'}] form/button detection: "
+          f"{sum(r['form_ok'] and r['button_ok'] for r in results)}/{len(results)} fixtures")
+    print(f"[ℹ️] field mapping accuracy: {accuracy:.0%}")
+    # Every fixture loads a page, so zero means Tracer.instrument lost the connection
+    counted = any(r['round_trips'] for r in results) or not results
+    if not counted:
+        print("[!] no Playwright round trips were counted; Tracer.instrument did not attach")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'rounds': args.rounds, 'field_accuracy': accuracy, 'fixtures': results}, f, indent=2)
+
+    return 0 if detection_ok and counted and accuracy >= args.min_field_accuracy else 1
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
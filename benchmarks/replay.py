@@ -0,0 +1,104 @@
+"""End-to-end throughput and latency from recorded HAR archives.
+
+Record once against the live sites (needs network and real keys):
+
+    HAR_MODE=record python main.py sites.csv
+
+then replay the full process_page -> submit_form pipeline offline, as often
+as needed:
+
+    python benchmarks/replay.py sites.csv [--concurrency 4] [--json report.json]
+
+Replay serves each site from HAR_DIR (default cache/har), answers form
+submissions and CAPTCHA/LLM calls with local fakes and aborts everything
+else, so the numbers only depend on this machine.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import BatchRunner, BrowserPool, DynamicWeb, HarArchive, ResourcePolicy
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('file', help='.xlsx, .csv or .jsonl with a "Website" column')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--pool-size', type=int, default=2)
+    parser.add_argument('--har-dir', default=os.environ.get('HAR_DIR', 'cache/har'))
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    archive = HarArchive('replay', args.har_dir)
+    urls = DynamicWeb(None, 'offline-replay').ingestion(args.file)
+    if urls is None:
+        return 1
+    urls = [url for url in urls if os.path.exists(archive.path(url))]
+    if not urls:
+        print(f"[!] No HAR archives in {args.har_dir} for the sites in {args.file}")
+        return 1
+
+    pool = BrowserPool(size=args.pool_size, max_contexts=args.concurrency // args.pool_size + 1,
+                       resource_policy=ResourcePolicy.from_env(), har_archive=archive)
+    results_path = os.path.join(tempfile.mkdtemp(prefix='replay-'), 'results.jsonl')
+    await pool.start()
+    try:
+        runner = BatchRunner(pool, 'offline-replay', 'offline-replay', results_path,
+                             concurrency=args.concurrency, per_domain=1, domain_delay=0)
+        started = time.perf_counter()
+        stats = await runner.run(urls)
+        wall = time.perf_counter() - started
+    finally:
+        await pool.stop()
+
+    with open(results_path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    elapsed = [r['elapsed'] for r in records]
+    steps = sorted({step for r in records for step in r.get('steps', {})})
+    report = {
+        'jobs': len(records),
+        'statuses': {k: v for k, v in stats.items() if v},
+        'wall_seconds': round(wall, 2),
+        'jobs_per_minute': round(len(records) / wall * 60, 1) if wall else 0.0,
+        'latency_seconds': {
+            'p50': percentile(elapsed, 50), 'p95': percentile(elapsed, 95), 'max': max(elapsed, default=0.0)
+        },
+        'step_median_seconds': {
+            step: round(statistics.median(r['steps'][step] for r in records if step in r.get('steps', {})), 3)
+            for step in steps
+        },
+        'round_trips_mean': round(statistics.mean(r.get('round_trips', 0) for r in records), 1) if records else 0,
+        'navigations_mean': round(statistics.mean(r.get('navigations', 0) for r in records), 2) if records else 0,
+    }
+
+    print(f"[📊] Replayed {report['jobs']} sites in {report['wall_seconds']}s "
+          f"({report['jobs_per_minute']} jobs/min, concurrency {args.concurrency})")
+    print(f"  - statuses: {report['statuses']}")
+    print(f"  - latency p50 {report['latency_seconds']['p50']:.2f}s, p95 {report['latency_seconds']['p95']:.2f}s, "
+          f"max {report['latency_seconds']['max']:.2f}s")
+    print(f"  - round trips per job: {report['round_trips_mean']}, page loads per job: {report['navigations_mean']}")
+    for step, seconds in report['step_median_seconds'].items():
+        print(f"  - {step}: {seconds:.3f}s median")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
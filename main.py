@@ -1,48 +1,51 @@
 import numpy as np
 import asyncio
 import os
-from utils import DynamicWeb
-from playwright.async_api import async_playwright
+import sys
+from utils import DynamicWeb, BrowserPool, BatchRunner, ResourcePolicy, HarArchive, configure_logging
 from dotenv import load_dotenv
 
 load_dotenv('.env')  # Load environment variables from .env file in current directory
+configure_logging()
 
 api_key=os.environ.get("OPENAI_API_KEY")
 cap_key=os.environ.get("CAP_API")
 async def run():
-    file ='uploads/file_A.xlsx'
+    # Spreadsheet (.xlsx), .csv or .jsonl with a "Website" column
+    file = sys.argv[1] if len(sys.argv) > 1 else 'uploads/file_A.xlsx'
+    results = os.environ.get("BATCH_RESULTS", 'uploads/results.jsonl')
+    concurrency = int(os.environ.get("BATCH_CONCURRENCY", 4))
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=True,
-            args=[
-                '--ignore-ssl-errors',
-                '--ignore-certificate-errors',
-                '--ignore-certificate-errors-spki-list',
-                '--ignore-ssl-errors-spki-list',
-                '--disable-web-security',
-                '--disable-features=VizDisplayCompositor'
-            ]
-        )
-        context = await browser.new_context(ignore_https_errors=True)
-        page = await context.new_page()
+    browser_pool = BrowserPool(
+        size=int(os.environ.get("BROWSER_POOL_SIZE", 2)),
+        max_contexts=max(1, concurrency // int(os.environ.get("BROWSER_POOL_SIZE", 2)) + 1),
+        resource_policy=ResourcePolicy.from_env(),
+        har_archive=HarArchive.from_env(),
+        launch_args=[
+            '--ignore-ssl-errors',
+            '--ignore-certificate-errors',
+            '--ignore-certificate-errors-spki-list',
+            '--ignore-ssl-errors-spki-list',
+            '--disable-web-security',
+            '--disable-features=VizDisplayCompositor'
+        ]
+    )
+    await browser_pool.start()
+    try:
         ##crearte an instance of our class DynamicWeb
         pipe = DynamicWeb(cap_key, api_key)
-        urls=pipe.ingestion(file)
-        # for url in urls:
-        url="https://www.arsroofing.net/"
-        try:
-                print(f"[🌐] Navigating to {url}")
-                await page.goto(url)
-                await page.wait_for_load_state("networkidle") ##waits for page to become fully loaded
-
-                await pipe.process_page(page, url) ##fill the form right away, or by going to form page and filling up 
-
-            
-        except Exception as e:
-            print(f"[!] Error processing URL {url}: {str(e)}")
+        urls = pipe.ingestion(file)
+        if urls is None:
             return False
 
-    await browser.close()
+        runner = BatchRunner(
+            browser_pool, cap_key, api_key, results,
+            concurrency=concurrency,
+            per_domain=int(os.environ.get("BATCH_PER_DOMAIN", 1)),
+            domain_delay=float(os.environ.get("BATCH_DOMAIN_DELAY", 2.0)),
+        )
+        await runner.run(urls)  ##results are streamed to the results file as each site finishes
+    finally:
+        await browser_pool.stop()
 
-asyncio.run(run())
\ No newline at end of file
+asyncio.run(run())
@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Keep the decision and form-location caches out of the working tree."""
+    monkeypatch.setenv("DECISION_CACHE_PATH", str(tmp_path / "decisions.sqlite3"))
+    monkeypatch.setenv("FORM_CACHE", "0")
@@ -0,0 +1,31 @@
+import asyncio
+import json
+
+from utils import BatchRunner
+
+
+def run_batch(results_path, urls):
+    # Without a browser pool every job ends at once with an error record
+    runner = BatchRunner(None, None, "test", str(results_path), concurrency=2, domain_delay=0)
+    stats = asyncio.run(runner.run(urls))
+    with open(results_path, encoding="utf-8") as f:
+        return stats, [json.loads(line)["url"] for line in f]
+
+
+def test_repeated_urls_are_processed_once(tmp_path):
+    urls = ["https://a.com/0", "https://b.com/", "https://a.com/0", {"url": "https://a.com/0"}]
+
+    stats, results = run_batch(tmp_path / "results.jsonl", urls)
+
+    assert sorted(results) == ["https://a.com/0", "https://b.com/"]
+    assert stats["skipped"] == 2
+
+
+def test_checkpointed_urls_are_skipped_on_resume(tmp_path):
+    path = tmp_path / "results.jsonl"
+    run_batch(path, ["https://a.com/0"])
+
+    stats, results = run_batch(path, ["https://a.com/0", "https://c.com/"])
+
+    assert results == ["https://a.com/0", "https://c.com/"]
+    assert stats["skipped"] == 1
@@ -0,0 +1,67 @@
+import asyncio
+import sqlite3
+import time
+
+from utils import DecisionCache, FormLocationCache
+
+
+def test_caches_keep_their_own_keys_and_tables(tmp_path):
+    async def scenario():
+        decisions = DecisionCache(str(tmp_path / "decisions.sqlite3"))
+        forms = FormLocationCache(str(tmp_path / "forms.sqlite3"))
+
+        await decisions.set(DecisionCache.key("country", ["USA", " Canada "]), {"selected": "USA"})
+        await forms.set(FormLocationCache.key("https://www.example.com/contact"), {"identifier": ["id", "contact"]})
+
+        fresh_decisions = DecisionCache(str(tmp_path / "decisions.sqlite3"))
+        fresh_forms = FormLocationCache(str(tmp_path / "forms.sqlite3"))
+        assert not isinstance(forms, DecisionCache)
+        return (await fresh_decisions.get(DecisionCache.key("country", ["usa", "canada"])),
+                await fresh_forms.get("example.com"))
+
+    decision, location = asyncio.run(scenario())
+
+    assert decision == {"selected": "USA"}
+    assert location == {"identifier": ["id", "contact"]}
+
+
+def test_form_cache_ttl_is_read_when_the_cache_is_created(tmp_path, monkeypatch):
+    monkeypatch.setenv("FORM_CACHE_TTL", "60")
+    assert FormLocationCache(str(tmp_path / "a.sqlite3")).ttl == 60
+    assert FormLocationCache(str(tmp_path / "b.sqlite3"), ttl=5).ttl == 5
+
+    monkeypatch.delenv("FORM_CACHE_TTL")
+    assert FormLocationCache(str(tmp_path / "c.sqlite3")).ttl == FormLocationCache.DEFAULT_TTL
+
+
+def test_locked_database_does_not_block_the_event_loop(tmp_path):
+    path = str(tmp_path / "decisions.sqlite3")
+    DecisionCache(path, busy_timeout=1.0)._executor.shutdown(wait=True)
+    lock = sqlite3.connect(path, isolation_level=None)
+    lock.execute("BEGIN EXCLUSIVE")
+
+    async def scenario():
+        cache = DecisionCache(path, busy_timeout=1.0)
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.05)
+
+        ticker = asyncio.create_task(tick())
+        started = time.monotonic()
+        await cache.set("key", {"selected": "USA"})
+        waited = time.monotonic() - started
+        ticker.cancel()
+        return waited, ticks, await cache.get("key")
+
+    try:
+        waited, ticks, value = asyncio.run(scenario())
+    finally:
+        lock.rollback()
+        lock.close()
+
+    assert waited >= 0.9 and ticks >= 10
+    assert value == {"selected": "USA"}
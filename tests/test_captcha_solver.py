@@ -0,0 +1,127 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from utils import CaptchaSolver
+
+
+class FakeSolver:
+    """In-process stand-in for the CapSolver API behind ``base_url``."""
+
+    def __init__(self, create=None, polls=None):
+        self.create = create if create is not None else {"errorId": 0, "taskId": "task-1"}
+        self.polls = list(polls or [])
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request.url.path)
+        assert request.url.host == "solver.test"
+        if request.url.path == "/createTask":
+            body = self.create
+        elif self.polls:
+            body = self.polls.pop(0)
+        else:
+            body = {"errorId": 0, "status": "processing"}
+        if isinstance(body, str):
+            return httpx.Response(200, text=body)
+        return httpx.Response(200, content=json.dumps(body))
+
+
+@pytest.fixture
+def fake_solver(monkeypatch):
+    def install(**kwargs):
+        solver = FakeSolver(**kwargs)
+        monkeypatch.setattr(CaptchaSolver, "transport", httpx.MockTransport(solver))
+        monkeypatch.setattr(CaptchaSolver, "_http", None)
+        return solver
+    return install
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the poll delays without waiting them out."""
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay, *args, **kwargs):
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    return delays
+
+
+def solver(**kwargs):
+    return CaptchaSolver("key", base_url="http://solver.test/", **kwargs)
+
+
+def test_create_task_error_returns_none(fake_solver):
+    fake = fake_solver(create={"errorId": 1, "errorDescription": "ERROR_KEY_DENIED_ACCESS"})
+    assert asyncio.run(solver().solve("site-key", "https://example.com")) is None
+    assert fake.requests == ["/createTask"]
+
+
+@pytest.mark.parametrize("reply", ["<html>502 Bad Gateway</html>", ["not", "an", "object"]])
+def test_malformed_create_task_reply_returns_none(fake_solver, reply):
+    fake_solver(create=reply)
+    assert asyncio.run(solver().solve("site-key", "https://example.com")) is None
+
+
+def test_null_error_id_is_not_an_error(fake_solver, sleeps):
+    fake_solver(create={"errorId": None, "taskId": "task-1"},
+                polls=[{"errorId": None, "status": "ready", "solution": {"gRecaptchaResponse": "token"}}])
+    assert asyncio.run(solver().solve("site-key", "https://example.com")) == "token"
+
+
+def test_polling_backs_off_up_to_max_delay(fake_solver, sleeps):
+    fake = fake_solver(polls=[{"errorId": 0, "status": "processing"}] * 5 + [
+        "not json",
+        {"errorId": 0, "status": "ready", "solution": {"gRecaptchaResponse": "token"}},
+    ])
+    token = asyncio.run(solver(initial_delay=2, backoff=1.5, max_delay=10).solve("site-key", "https://example.com"))
+
+    assert token == "token"
+    assert sleeps == [2, 3, 4.5, 6.75, 10, 10, 10]
+    assert fake.requests == ["/createTask"] + ["/getTaskResult"] * 7
+
+
+def test_failed_task_returns_none(fake_solver, sleeps):
+    fake_solver(polls=[{"errorId": 12, "errorDescription": "ERROR_CAPTCHA_UNSOLVABLE"}])
+    assert asyncio.run(solver().solve("site-key", "https://example.com")) is None
+
+
+def test_deadline_gives_up(fake_solver):
+    fake = fake_solver()
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        token = await solver(deadline=0.3, initial_delay=0.02, max_delay=0.05).solve("site-key", "https://example.com")
+        return token, loop.time() - started
+
+    token, elapsed = asyncio.run(scenario())
+
+    assert token is None
+    assert 0.25 <= elapsed < 1.0
+    assert fake.requests.count("/getTaskResult") > 1
+
+
+def test_cancellation_stops_polling(fake_solver):
+    fake = fake_solver()
+
+    async def scenario():
+        task = asyncio.create_task(solver(initial_delay=0.02, max_delay=0.02).solve("site-key", "https://example.com"))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        polls = len(fake.requests)
+        await asyncio.sleep(0.1)
+        return polls
+
+    polls = asyncio.run(scenario())
+
+    assert polls > 1
+    assert len(fake.requests) == polls
@@ -0,0 +1,40 @@
+import re
+
+import pytest
+
+from utils import FormFieldMapper
+
+
+def nested_loop_map_field(mapper, *identifiers):
+    """The original type/pattern/identifier loop the matcher replaces."""
+    identifiers = [i.lower() for i in identifiers if i]
+    for field_type, field_info in mapper.field_patterns.items():
+        for pattern in field_info['patterns']:
+            if any(re.search(pattern, identifier, re.IGNORECASE) for identifier in identifiers):
+                return field_type
+    return None
+
+
+@pytest.mark.parametrize("identifiers", [
+    ("first_name", "input_1_3", "First Name"),
+    ("last-name", "lname", "Your surname"),
+    ("your-email", "email-field", "Email Address"),
+    ("company_name", None, "Business"),
+    ("input_7", "field_7", "Street address"),
+    ("zip", "postal_code", None),
+    ("zip code", None, None),
+    ("fields[country]", "country-select", "Country"),
+    ("qty", "quantity", "Quantity"),
+    ("utm_source", None, None),
+    ("contactnumber", "telnum", None),
+    ("organisation", "orgname", None),
+])
+def test_single_pass_matcher_agrees_with_the_nested_loop(identifiers):
+    mapper = FormFieldMapper()
+    assert mapper.map_field(*identifiers)[0] == nested_loop_map_field(mapper, *identifiers)
+
+
+def test_patterns_expand_to_literals():
+    assert FormFieldMapper._expand_pattern("zip[- ]?code") == ["zip-code", "zip code", "zipcode"]
+    with pytest.raises(ValueError):
+        FormFieldMapper._expand_pattern("get.*quote")
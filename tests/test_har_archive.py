@@ -0,0 +1,41 @@
+import json
+import os
+import zipfile
+
+import pytest
+
+from utils import DecisionCache, DynamicWeb, HarArchive
+
+
+@pytest.mark.parametrize("mode", ["record", "replay"])
+def test_har_modes_keep_off_the_production_caches(mode, tmp_path, monkeypatch):
+    production = str(tmp_path / "production" / "decisions.sqlite3")
+    monkeypatch.setenv("DECISION_CACHE_PATH", production)
+    monkeypatch.setenv("FORM_CACHE", "1")
+
+    HarArchive(mode, str(tmp_path / "har"))
+    pipe = DynamicWeb(None, "test")
+
+    assert pipe.form_cache is None
+    path = pipe.form_analyzer.decision_cache.path
+    assert path != production and path == DecisionCache.shared().path
+    assert not os.path.exists(production)
+
+
+def test_replay_drops_requests_that_failed_while_recording(tmp_path):
+    archive = HarArchive("replay", str(tmp_path / "har"))
+    path = archive.path("https://example.com")
+    entries = [
+        {"request": {"url": "https://example.com/"}, "response": {"status": 200}},
+        {"request": {"url": "https://tracker.test/t.js"}, "response": {"status": -1}},
+    ]
+    with zipfile.ZipFile(path, "w") as f:
+        f.writestr("har.har", json.dumps({"log": {"entries": entries}}))
+        f.writestr("body.html", "<html></html>")
+
+    replayable = archive.replayable(path)
+
+    assert replayable != path and archive.replayable(path) == replayable
+    with zipfile.ZipFile(replayable) as f:
+        assert [e["request"]["url"] for e in json.loads(f.read("har.har"))["log"]["entries"]] == ["https://example.com/"]
+        assert f.read("body.html") == b"<html></html>"
@@ -0,0 +1,29 @@
+import asyncio
+
+from utils import JobQueue, MemoryJobStore
+
+
+async def collect(queue, job_id):
+    return [event async for event in queue.stream(job_id, heartbeat=0.1) if event is not None]
+
+
+def test_stop_ends_streams_of_running_and_queued_jobs():
+    async def scenario():
+        async def handler(payload, emit):
+            await asyncio.sleep(60)
+
+        queue = JobQueue(handler, workers=1, store=MemoryJobStore())
+        await queue.start()
+        running = await queue.submit({"url": "https://example.com"})
+        queued = await queue.submit({"url": "https://example.org"})
+        streams = [asyncio.create_task(collect(queue, job["id"])) for job in (running, queued)]
+        await asyncio.sleep(0.2)
+
+        await queue.stop(drain_timeout=0.1)
+        return await asyncio.wait_for(asyncio.gather(*streams), timeout=5)
+
+    running_events, queued_events = asyncio.run(scenario())
+
+    assert running_events[-1] == {**running_events[-1], "step": "finished", "status": "cancelled"}
+    assert queued_events[-1] == {**queued_events[-1], "step": "finished", "status": "cancelled"}
+    assert [event["step"] for event in queued_events] == ["queued", "finished"]
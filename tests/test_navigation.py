@@ -0,0 +1,107 @@
+import asyncio
+
+from utils import DynamicWeb, FormLocationCache
+
+
+class FakePage:
+    """Just enough of a Playwright page for process_page, counting goto calls."""
+
+    def __init__(self, url="about:blank", cached_form_valid=True):
+        self.url = url
+        self.gotos = []
+        self.cached_form_valid = cached_form_valid
+
+    async def set_extra_http_headers(self, headers):
+        pass
+
+    async def goto(self, url, **kwargs):
+        self.gotos.append(url)
+        self.url = url
+
+    async def evaluate(self, script, arg=None):
+        # Only the readiness detector and the form cache check run against
+        # the page itself here
+        if script == DynamicWeb.FORM_CACHE_CHECK_SCRIPT:
+            return self.cached_form_valid
+        return {"signal": "fake", "elapsed": 0}
+
+    async def wait_for_load_state(self, state=None):
+        pass
+
+
+def same_page_pipeline(form_cache=None):
+    """A DynamicWeb that finds, fills and submits a form on the loaded page."""
+    pipe = DynamicWeb(None, "test", form_cache=form_cache)
+
+    async def find_form_elements(page):
+        return ("id", "contact")
+
+    async def succeed(*args, **kwargs):
+        return True
+
+    pipe.find_form_elements = find_form_elements
+    pipe.fill_form = succeed
+    pipe.submit_form = succeed
+    pipe.start_captcha_solving = lambda page, url: None
+    return pipe
+
+
+def test_same_page_form_loads_the_page_once():
+    pipe = same_page_pipeline()
+    page = FakePage()
+
+    result = asyncio.run(pipe.process_page(page, "https://example.com"))
+
+    assert result["status"] == "success"
+    assert page.gotos == ["https://example.com"]
+    assert pipe.navigation_count == 1
+
+
+def test_preloaded_page_is_not_loaded_again():
+    pipe = same_page_pipeline()
+    page = FakePage("https://example.com/")
+
+    asyncio.run(pipe.process_page(page, "https://www.example.com"))
+
+    assert page.gotos == []
+    assert pipe.navigation_count == 0
+
+
+def test_navigation_count_is_per_job():
+    pipe = same_page_pipeline()
+
+    for url in ("https://example.com", "https://example.org"):
+        page = FakePage()
+        asyncio.run(pipe.process_page(page, url))
+        assert len(page.gotos) == 1
+        assert pipe.navigation_count == 1
+
+
+def cached_contact_page(tmp_path):
+    cache = FormLocationCache(str(tmp_path / "forms.sqlite3"))
+    asyncio.run(cache.set("example.com", {"form_url": "https://example.com/contact.html",
+                                          "identifier": ["id", "contact"], "vendor": None,
+                                          "submit_selector": None, "fields": {}}))
+    return cache
+
+
+def test_cached_form_page_is_loaded_directly(tmp_path):
+    pipe = same_page_pipeline(cached_contact_page(tmp_path))
+    page = FakePage()
+
+    result = asyncio.run(pipe.process_page(page, "https://example.com"))
+
+    assert result["status"] == "success"
+    assert page.gotos == ["https://example.com/contact.html"]
+    assert pipe.navigation_count == 1
+
+
+def test_stale_cached_form_falls_back_to_the_url(tmp_path):
+    cache = cached_contact_page(tmp_path)
+    pipe = same_page_pipeline(cache)
+    page = FakePage(cached_form_valid=False)
+
+    asyncio.run(pipe.process_page(page, "https://example.com"))
+
+    assert page.gotos == ["https://example.com/contact.html", "https://example.com"]
+    assert asyncio.run(cache.get("example.com"))["form_url"] == "https://example.com"
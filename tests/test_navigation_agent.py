@@ -0,0 +1,39 @@
+import asyncio
+
+from utils import FormNavigationAgent
+
+
+class FakeAgent:
+    def __init__(self):
+        self.prompts = []
+
+    async def analyze(self, content, additional_context=None):
+        self.prompts.append(content)
+        return {"best_element_index": 0, "confidence": 70, "reasoning": "fake"}
+
+
+def navigation_agent():
+    agent = FormNavigationAgent("test")
+    agent.agent = FakeAgent()
+    return agent
+
+
+def test_page_context_is_only_built_for_a_close_call():
+    calls = []
+
+    async def page_context():
+        calls.append(1)
+        return "Acme Plumbing: emergency repairs"
+
+    clear = [{"text": "Contact Us", "href": "https://example.com/contact", "tagName": "A"},
+             {"text": "Blog", "href": "https://example.com/blog", "tagName": "A"}]
+    close = [{"text": "Contact", "href": "https://example.com/contact", "tagName": "A"},
+             {"text": "Contact Us", "href": "https://example.com/contact-us", "tagName": "A"}]
+
+    agent = navigation_agent()
+    result = asyncio.run(agent.analyze_navigation_elements(clear, page_context))
+    assert result["source"] == "local" and calls == [] and agent.agent.prompts == []
+
+    asyncio.run(agent.analyze_navigation_elements(close, page_context))
+    assert calls == [1]
+    assert "Acme Plumbing: emergency repairs" in agent.agent.prompts[0]
@@ -0,0 +1,51 @@
+import logging
+
+from utils import Tracer
+
+
+class StubConnection:
+    """Shaped like playwright._impl._connection.Connection as of 1.52."""
+
+    def __init__(self):
+        self.sent = []
+
+    def _send_message_to_server(self, object, method, params, no_reply=False):
+        self.sent.append(method)
+
+
+class StubImpl:
+    def __init__(self, connection):
+        self._connection = connection
+
+
+class StubPlaywright:
+    def __init__(self, connection):
+        self._impl_obj = StubImpl(connection)
+
+
+def test_instrument_counts_round_trips():
+    connection = StubConnection()
+    Tracer.instrument(StubPlaywright(connection))
+    Tracer.instrument(StubPlaywright(connection))
+
+    tracer = Tracer().activate()
+    try:
+        with tracer.span("fill"):
+            connection._send_message_to_server(None, "fill", {})
+            connection._send_message_to_server(None, "click", {})
+        connection._send_message_to_server(None, "evaluateExpression", {})
+    finally:
+        tracer.deactivate()
+
+    summary = tracer.summary()
+    assert summary["round_trips"] == 3 > 0
+    assert summary["round_trips_by_method"] == {"fill": 1, "click": 1, "evaluateExpression": 1}
+    assert summary["spans"][0]["round_trips"] == 2
+    assert connection.sent == ["fill", "click", "evaluateExpression"]
+
+
+def test_instrument_warns_when_connection_cannot_be_wrapped(caplog):
+    with caplog.at_level(logging.WARNING, logger="dynamicforms"):
+        Tracer.instrument(StubPlaywright(object()))
+
+    assert "round trips will not be counted" in caplog.text
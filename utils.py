@@ -1,24 +1,693 @@
-import pandas as pd
 from io import BytesIO
-import requests
 from playwright.async_api import async_playwright
-import time
+import asyncio
+import os
 import re
+import time
+import httpx
 import openai
-from typing import Optional, Dict, Any, List
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from functools import lru_cache, wraps
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import queue
+import sys
+import tempfile
+from html.parser import HTMLParser
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Callable, Awaitable
+import csv
+import hashlib
 import json
+import sqlite3
 import base64
+import uuid
+import weakref
+import zipfile
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+import openpyxl
+from urllib.parse import urlparse, urlunparse
+from cachetools import LRUCache, TTLCache
+
+
+log = logging.getLogger("dynamicforms")
+_log_context: contextvars.ContextVar = contextvars.ContextVar("dynamicforms_log_context", default={})
+
+
+def bind_log_context(**fields) -> contextvars.Token:
+    """Attach fields (job id, URL) to every log record of the current task and its children."""
+    return _log_context.set({**_log_context.get(), **fields})
+
+
+class _LogContextFilter(logging.Filter):
+    # Runs in the logging task, where the job context and open span are visible
+    def filter(self, record):
+        context = _log_context.get()
+        record.job = context.get("job")
+        record.url = context.get("url")
+        span = Tracer._span.get()
+        record.step = span["name"] if span else None
+        return True
+
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line: time, level, message, job, url and step."""
+
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "message": record.getMessage(),
+            "job": getattr(record, "job", None),
+            "url": getattr(record, "url", None),
+            "step": getattr(record, "step", None),
+            "process": record.process
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> logging.handlers.QueueListener:
+    """Send ``dynamicforms`` logs through a queue to a background writer thread.
+
+    Callers only enqueue records, so stdout I/O never blocks the event loop.
+    LOG_LEVEL (default INFO) filters before anything is formatted; per-field
+    and per-element messages are DEBUG. LOG_FORMAT is ``json`` (default) or
+    ``text``.
+    """
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.environ.get("LOG_FORMAT", "json")).lower()
+
+    output = logging.StreamHandler(sys.stdout)
+    if fmt == "text":
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(job)s %(step)s] %(message)s"))
+    else:
+        output.setFormatter(JsonLogFormatter())
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(records)
+    handler.addFilter(_LogContextFilter())
+    listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # flush queued records on exit
+
+    log.handlers = [handler]
+    log.setLevel(level)
+    log.propagate = False
+    return listener
+
+
+class Metrics:
+    """Prometheus-style counters, gauges and latency histograms for this process.
+
+    ``snapshot`` returns a JSON-friendly copy so worker processes can hand
+    their numbers to the process serving ``/metrics``, which adds them up
+    with ``merge`` and formats them with ``render``.
+    """
+
+    BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+    def __init__(self):
+        self._histograms: Dict[tuple, Dict[str, Any]] = {}
+        self._counters: Dict[tuple, float] = {}
+        self._gauges: Dict[tuple, float] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> tuple:
+        return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = {"buckets": [0] * len(self.BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(self.BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        self._gauges[self._key(name, labels)] = value
+
+    def snapshot(self) -> Dict[str, List]:
+        return {
+            "histograms": [[name, list(labels), data] for (name, labels), data in self._histograms.items()],
+            "counters": [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+            "gauges": [[name, list(labels), value] for (name, labels), value in self._gauges.items()]
+        }
+
+    @classmethod
+    def merge(cls, snapshots: Iterable[Dict[str, List]]) -> "Metrics":
+        merged = cls()
+        for snapshot in snapshots:
+            for name, labels, data in snapshot.get("histograms", []):
+                key = (name, tuple(tuple(label) for label in labels))
+                target = merged._histograms.setdefault(key, {"buckets": [0] * len(cls.BUCKETS), "sum": 0.0, "count": 0})
+                target["buckets"] = [a + b for a, b in zip(target["buckets"], data["buckets"])]
+                target["sum"] += data["sum"]
+                target["count"] += data["count"]
+            for name, labels, value in snapshot.get("counters", []):
+                key = (name, tuple(tuple(label) for label in labels))
+                merged._counters[key] = merged._counters.get(key, 0) + value
+            for name, labels, value in snapshot.get("gauges", []):
+                key = (name, tuple(tuple(label) for label in labels))
+                merged._gauges[key] = merged._gauges.get(key, 0) + value
+        return merged
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in pairs) + '}'
+
+        lines = []
+        for name in sorted({name for name, _ in self._histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), data in sorted(self._histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(self.BUCKETS, data["buckets"]):
+                    lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {count}")
+                lines.append(f"{name}_bucket{fmt(labels, [('le', '+Inf')])} {data['count']}")
+                lines.append(f"{name}_sum{fmt(labels)} {data['sum']:.6f}")
+                lines.append(f"{name}_count{fmt(labels)} {data['count']}")
+        for kind, values in (("counter", self._counters), ("gauge", self._gauges)):
+            for name in sorted({name for name, _ in values}):
+                lines.append(f"# TYPE {name} {kind}")
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{fmt(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+class Tracer:
+    """Timing spans and protocol round-trip counts for one job.
+
+    The active tracer lives in a context variable, so tasks spawned by the
+    job (CAPTCHA solving, concurrent dropdown decisions) report into it
+    without passing it around. Every finished span is also observed in the
+    process-wide ``Tracer.metrics``.
+    """
+
+    metrics = Metrics()
+    _current: contextvars.ContextVar = contextvars.ContextVar("dynamicforms_tracer", default=None)
+    _span: contextvars.ContextVar = contextvars.ContextVar("dynamicforms_span", default=None)
+
+    def __init__(self, name: str = "job"):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.round_trips: Counter = Counter()
+        self._token = None
+
+    @classmethod
+    def current(cls) -> Optional["Tracer"]:
+        return cls._current.get()
+
+    def activate(self) -> "Tracer":
+        self._token = self._current.set(self)
+        return self
+
+    def deactivate(self):
+        if self._token is not None:
+            self._current.reset(self._token)
+            self._token = None
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        parent = self._span.get()
+        span = {
+            "name": name,
+            "parent": parent["name"] if parent else None,
+            "start": round(time.perf_counter() - self.started, 4),
+            "duration": None,
+            "round_trips": 0,
+            "attrs": attrs
+        }
+        token = self._span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span["attrs"]["error"] = type(e).__name__
+            raise
+        finally:
+            self._span.reset(token)
+            span["duration"] = round(time.perf_counter() - started, 4)
+            self.spans.append(span)
+            self.metrics.observe("dynamicforms_step_duration_seconds", span["duration"], step=name)
+
+    @classmethod
+    def annotate(cls, **attrs):
+        """Add attributes to the innermost open span, e.g. the strategy that won."""
+        span = cls._span.get()
+        if span is not None:
+            span["attrs"].update(attrs)
+
+    @classmethod
+    def count(cls, method: str):
+        """Record one protocol round trip against the active job and span."""
+        tracer = cls._current.get()
+        if tracer is None:
+            return
+        tracer.round_trips[method] += 1
+        span = cls._span.get()
+        if span is not None:
+            span["round_trips"] += 1
+        cls.metrics.inc("dynamicforms_protocol_calls_total", method=method)
+
+    @classmethod
+    def instrument(cls, playwright):
+        """Count every message Playwright sends to the browser driver.
+
+        This wraps Playwright's connection, which is internal API; if its
+        shape changes, tracing keeps working without round-trip counts and
+        a warning says so.
+        """
+        connection = getattr(getattr(playwright, "_impl_obj", playwright), "_connection", None)
+        name = next((name for name in ("_send_message_to_server", "send_message_to_server")
+                     if callable(getattr(connection, name, None))), None)
+        if name is None:
+            log.warning("Playwright connection has no _send_message_to_server; "
+                        "protocol round trips will not be counted")
+            return
+        send = getattr(connection, name)
+        if getattr(send, "_dynamicforms_traced", False):
+            return
+
+        @wraps(send)
+        def counted(obj, method, *args, **kwargs):
+            cls.count(method)
+            return send(obj, method, *args, **kwargs)
+
+        counted._dynamicforms_traced = True
+        setattr(connection, name, counted)
+
+    def finish(self, status: str) -> Dict[str, Any]:
+        """Close the trace, record the job latency and return its summary."""
+        total = time.perf_counter() - self.started
+        self.metrics.observe("dynamicforms_job_duration_seconds", total, status=status)
+        self.metrics.inc("dynamicforms_jobs_total", status=status)
+        return self.summary(total)
+
+    def summary(self, total: Optional[float] = None) -> Dict[str, Any]:
+        steps: Dict[str, float] = {}
+        for span in self.spans:
+            steps[span["name"]] = round(steps.get(span["name"], 0) + span["duration"], 4)
+        return {
+            "total": round(total if total is not None else time.perf_counter() - self.started, 4),
+            "steps": steps,
+            "round_trips": sum(self.round_trips.values()),
+            "round_trips_by_method": dict(self.round_trips),
+            "spans": sorted(self.spans, key=lambda span: span["start"])
+        }
+
+
+def traced(name: str):
+    """Run the decorated coroutine inside a span of the active Tracer, if any."""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            tracer = Tracer.current()
+            if tracer is None:
+                return await func(*args, **kwargs)
+            with tracer.span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class BrowserPool:
+    """Keeps warm Chromium browsers and leases a fresh BrowserContext per job.
+
+    Each browser serves at most ``max_contexts`` contexts at a time and is
+    recycled after ``max_jobs`` jobs or once its processes use more than
+    ``max_memory_mb`` of resident memory. A failed relaunch is retried with
+    backoff; once no browser is left, leases fail instead of waiting. An
+    optional ``ResourcePolicy`` is
+    applied to every leased context, and an optional ``HarArchive`` records
+    or replays the traffic of the site a context is leased for.
+    """
+
+    def __init__(self, size: int = 2, max_contexts: int = 4, max_jobs: int = 50,
+                 max_memory_mb: Optional[int] = 1500, launch_args: Optional[List[str]] = None,
+                 headless: bool = True, resource_policy: Optional["ResourcePolicy"] = None,
+                 har_archive: Optional["HarArchive"] = None):
+        self.size = size
+        self.resource_policy = resource_policy
+        self.har_archive = har_archive
+        self.max_contexts = max_contexts
+        self.max_jobs = max_jobs
+        self.max_memory_mb = max_memory_mb
+        self.launch_args = launch_args or []
+        self.headless = headless
+        self._playwright = None
+        self._browsers: List[Dict[str, Any]] = []
+        self._cond: Optional[asyncio.Condition] = None
+        # Replacements being launched; leases keep waiting while there are any
+        self._relaunching = 0
+
+    async def start(self):
+        """Start Playwright and launch the warm browsers."""
+        if self._playwright is not None:
+            return
+        self._cond = asyncio.Condition()
+        self._playwright = await async_playwright().start()
+        Tracer.instrument(self._playwright)
+        if self.har_archive is not None:
+            self.har_archive.install()
+        self._browsers = [await self._launch() for _ in range(self.size)]
+        log.info("Browser pool started with %s browsers", self.size)
+
+    async def stop(self):
+        """Close every browser and stop Playwright."""
+        if self._playwright is None:
+            return
+        browsers, self._browsers = self._browsers, []
+        for slot in browsers:
+            try:
+                await slot["browser"].close()
+            except Exception as e:
+                log.warning("Error closing pooled browser: %s", e)
+        await self._playwright.stop()
+        self._playwright = None
+        log.info("Browser pool stopped")
+
+    @asynccontextmanager
+    async def lease(self, url: Optional[str] = None, **context_options):
+        """Lease a fresh BrowserContext; it is closed when the block exits.
+
+        ``url`` names the site the context is for, which selects its HAR
+        archive when one is configured.
+        """
+        slot = await self._acquire()
+        context = None
+        try:
+            options = {"ignore_https_errors": True, **context_options}
+            if self.har_archive is not None:
+                options.update(self.har_archive.context_options(url))
+            context = await slot["browser"].new_context(**options)
+            if self.resource_policy is not None:
+                await self.resource_policy.apply(context)
+            if self.har_archive is not None:
+                await self.har_archive.apply(context, url)
+            yield context
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception as e:
+                    log.warning("Error closing leased context: %s", e)
+            await self._release(slot)
+
+    async def _launch(self) -> Dict[str, Any]:
+        browser = await self._playwright.chromium.launch(headless=self.headless, args=self.launch_args)
+        return {"browser": browser, "active": 0, "jobs": 0, "retiring": False, "cdp": None}
+
+    @traced("lease_wait")
+    async def _acquire(self) -> Dict[str, Any]:
+        if self._cond is None:
+            raise RuntimeError("BrowserPool.start() must be awaited before leasing")
+        async with self._cond:
+            while True:
+                candidates = [
+                    slot for slot in self._browsers
+                    if not slot["retiring"] and slot["active"] < self.max_contexts
+                ]
+                if candidates:
+                    slot = min(candidates, key=lambda b: b["active"])
+                    slot["active"] += 1
+                    return slot
+                if not self._browsers and not self._relaunching:
+                    raise RuntimeError("Browser pool has no browsers left")
+                await self._cond.wait()
+
+    async def _release(self, slot: Dict[str, Any]):
+        slot["jobs"] += 1
+        browser = slot["browser"]
+        recycle = slot["jobs"] >= self.max_jobs or not browser.is_connected()
+        if not recycle and self.max_memory_mb:
+            memory = await self._memory_mb(slot)
+            recycle = memory is not None and memory > self.max_memory_mb
+            if recycle:
+                log.info("Browser uses %.0f MB, recycling", memory)
+
+        async with self._cond:
+            slot["active"] -= 1
+            if recycle:
+                slot["retiring"] = True
+            replace = slot["retiring"] and slot["active"] == 0 and slot in self._browsers
+            if replace:
+                self._browsers.remove(slot)
+                self._relaunching += 1
+            self._cond.notify_all()
+
+        if replace:
+            await self._replace(slot)
+
+    async def _replace(self, slot: Dict[str, Any], attempts: int = 4):
+        """Close a retired browser and launch its replacement.
+
+        The launch is retried with exponential backoff. If every attempt
+        fails the slot is dropped; when that leaves the pool empty, waiting
+        and future leases raise instead of blocking forever.
+        """
+        log.info("Recycling browser after %s jobs", slot['jobs'])
+        try:
+            await slot["browser"].close()
+        except Exception:
+            pass
+        fresh = None
+        for attempt in range(attempts):
+            if self._playwright is None:
+                break
+            try:
+                fresh = await self._launch()
+                break
+            except Exception as e:
+                log.warning("Failed to relaunch pooled browser (attempt %s/%s): %s", attempt + 1, attempts, e)
+                if attempt < attempts - 1:
+                    await asyncio.sleep(2 ** attempt)
+        async with self._cond:
+            self._relaunching -= 1
+            if fresh is not None:
+                self._browsers.append(fresh)
+            elif not self._browsers:
+                log.error("Browser pool has no browsers left")
+            self._cond.notify_all()
+
+    async def _memory_mb(self, slot: Dict[str, Any]) -> Optional[float]:
+        """Resident memory of all of a browser's processes, read from /proc.
+
+        The CDP session is opened once per browser and reused.
+        """
+        try:
+            if slot["cdp"] is None:
+                slot["cdp"] = await slot["browser"].new_browser_cdp_session()
+            info = await slot["cdp"].send("SystemInfo.getProcessInfo")
+        except Exception:
+            slot["cdp"] = None
+            return None
+
+        total = 0
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        for process in info.get("processInfo", []):
+            try:
+                with open(f"/proc/{process['id']}/statm") as f:
+                    total += int(f.read().split()[1]) * page_size
+            except (OSError, ValueError, KeyError, IndexError):
+                continue
+        return total / (1024 * 1024) if total else None
+
+
+class _VisibleTextParser(HTMLParser):
+    """Collects text outside script/style/head-like elements, one block per line."""
+    SKIP = {'script', 'style', 'noscript', 'svg', 'head', 'template', 'iframe'}
+    BLOCKS = {'p', 'div', 'section', 'article', 'li', 'tr', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+              'form', 'label', 'button', 'option', 'header', 'footer', 'main', 'td', 'th'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skipping += 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self._skipping:
+            self._skipping -= 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+class PromptBuilder:
+    """Turns raw page content into compact prompt text within a token budget.
+
+    Markup is stripped, whitespace collapsed and repeated lines dropped. When
+    the text is still over the role's budget, lines mentioning the focus
+    keywords (success/error wording by default) and their neighbours are kept
+    first, then the rest in document order until the budget is spent.
+    Structured payloads (a JSON document such as a serialized option list)
+    are passed through untouched: cutting or de-duplicating them would hand
+    the model malformed JSON and silently drop options.
+    """
+    DEFAULT_BUDGETS = {
+        'sentiment_analyzer': 800,
+        'binary Selector': 800,
+        'radio_selector': 1000,
+        'dropdown_selector': 1000,
+        'form_navigation_analyzer': 1500,
+    }
+    FOCUS_KEYWORDS = ('thank', 'success', 'submitted', 'sent', 'received', 'confirm',
+                      'error', 'failed', 'invalid', 'required', 'missing', 'try again')
+    # Roughly how a BPE tokenizer splits English: short letter runs, digit
+    # groups and single punctuation marks
+    _TOKEN_RE = re.compile(r"[A-Za-z]{1,5}|\d{1,3}|[^\sA-Za-z\d]")
+    _HTML_RE = re.compile(r"<(?:!doctype|html|body|div|form|p|span|script|a)\b", re.IGNORECASE)
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, default_budget: int = 2000):
+        self.budgets = {**self.DEFAULT_BUDGETS, **(budgets or {})}
+        self.default_budget = default_budget
+
+    @classmethod
+    def estimate_tokens(cls, text: str) -> int:
+        return len(cls._TOKEN_RE.findall(text))
+
+    def to_text(self, content: str) -> str:
+        """Strip markup if ``content`` looks like HTML."""
+        if not self._HTML_RE.search(content[:5000]):
+            return content
+        parser = _VisibleTextParser()
+        parser.feed(content)
+        parser.close()
+        return "".join(parser.parts)
+
+    @staticmethod
+    def is_structured(content: str) -> bool:
+        """Whether ``content`` is a JSON array or object."""
+        if content.lstrip()[:1] not in ('[', '{'):
+            return False
+        try:
+            json.loads(content)
+        except ValueError:
+            return False
+        return True
+
+    @staticmethod
+    def dedupe_lines(text: str) -> List[str]:
+        lines = []
+        seen = set()
+        for line in text.splitlines():
+            line = " ".join(line.split())
+            key = line.lower()
+            if not line or key in seen:
+                continue
+            seen.add(key)
+            lines.append(line)
+        return lines
+
+    def build(self, content: str, role: str, focus: Optional[List[str]] = None) -> str:
+        """Compact ``content`` to fit the token budget for ``role``."""
+        if content and self.is_structured(content):
+            return content
+        budget = self.budgets.get(role, self.default_budget)
+        lines = self.dedupe_lines(self.to_text(content or ''))
+        costs = [self.estimate_tokens(line) for line in lines]
+        if sum(costs) <= budget:
+            return "\n".join(lines)
+
+        keywords = [k.lower() for k in (focus or self.FOCUS_KEYWORDS)]
+        priority = []
+        for i, line in enumerate(lines):
+            if any(k in line.lower() for k in keywords):
+                priority.extend(j for j in (i - 1, i, i + 1) if 0 <= j < len(lines))
+        order = list(dict.fromkeys(priority + list(range(len(lines)))))
+
+        selected = set()
+        used = 0
+        for i in order:
+            if used + costs[i] > budget:
+                if not selected and costs[i]:
+                    # A single huge line (minified text): keep its head
+                    ratio = budget / costs[i]
+                    lines[i] = lines[i][:int(len(lines[i]) * ratio)]
+                    selected.add(i)
+                    break
+                continue
+            selected.add(i)
+            used += costs[i]
+        return "\n".join(lines[i] for i in sorted(selected))
 
 
 class Agent:
-    def __init__(self, api_key: str, role: str, system_prompt: str):
+    # One AsyncOpenAI client (and its connection pool) per API key, shared by
+    # every agent, plus a process-wide cap on in-flight LLM calls.
+    _clients: Dict[str, Any] = {}
+    _semaphore: Optional[asyncio.Semaphore] = None
+    max_concurrency = int(os.environ.get("LLM_MAX_CONCURRENCY", 8))
+    max_connections = int(os.environ.get("LLM_MAX_CONNECTIONS", 20))
+    prompt_builder = PromptBuilder()
+    # Set by HarArchive replay to answer completions in-process
+    transport: Optional[httpx.AsyncBaseTransport] = None
+
+    def __init__(self, api_key: str, role: str, system_prompt: str, timeout: Optional[float] = None):
         self.api_key = api_key
         self.role = role
         self.system_prompt = system_prompt
-        self.client = openai.OpenAI(api_key=api_key)
+        self.timeout = timeout if timeout is not None else float(os.environ.get("LLM_TIMEOUT", 30))
+        self.client = self.shared_client(api_key)
+
+    @classmethod
+    def shared_client(cls, api_key: str):
+        """Return the pooled async client for ``api_key``, creating it on first use."""
+        client = cls._clients.get(api_key)
+        if client is None:
+            client = openai.AsyncOpenAI(
+                api_key=api_key,
+                max_retries=1,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=cls.max_connections,
+                        max_keepalive_connections=cls.max_connections,
+                    ),
+                    transport=cls.transport,
+                ),
+            )
+            cls._clients[api_key] = client
+        return client
+
+    @classmethod
+    def _limiter(cls) -> asyncio.Semaphore:
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(cls.max_concurrency)
+        return cls._semaphore
 
+    @traced("llm")
     async def analyze(self, content: str, additional_context: Optional[Dict] = None) -> Dict[str, Any]:
         try:
+            Tracer.annotate(role=self.role)
+            content = self.prompt_builder.build(content, self.role)
             prompt = f"""
             Content to analyze:
             {content}
@@ -33,15 +702,16 @@ class Agent:
             - reasoning: brief explanation
             """
 
-            # OpenAI's client is not async, so we don't await it
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={ "type": "json_object" }  # Force JSON response
-            )
+            async with self._limiter():
+                response = await self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": self.system_prompt},
+                        {"role": "user", "content": prompt}
+                    ],
+                    response_format={ "type": "json_object" },  # Force JSON response
+                    timeout=self.timeout
+                )
 
             analysis_text = response.choices[0].message.content
             if not analysis_text:
@@ -50,7 +720,7 @@ class Agent:
             try:
                 analysis = json.loads(analysis_text)
             except json.JSONDecodeError as e:
-                print(f"[!] Failed to parse JSON response: {analysis_text}")
+                log.warning("Failed to parse JSON response: %s", analysis_text)
                 raise ValueError(f"Invalid JSON response: {str(e)}")
 
             # Ensure all required fields are present
@@ -62,7 +732,7 @@ class Agent:
             return analysis
 
         except Exception as e:
-            print(f"[!] Error in {self.role} analysis: {str(e)}")
+            log.warning("Error in %s analysis: %s", self.role, e)
             return {
                 "status": "error",
                 "confidence": 0,
@@ -70,9 +740,162 @@ class Agent:
                 "reasoning": "Error occurred during analysis"
             }
 
+class SqliteTTLCache:
+    """JSON values in a SQLite table behind an in-memory TTL/LRU tier.
+
+    Both tiers expire entries after ``ttl`` seconds. Subclasses name the
+    table, the environment variables for the path and TTL, and how their
+    keys are built; ``shared()`` keeps one instance per path and class.
+
+    Every worker process shares the SQLite file, so a write may wait up to
+    ``busy_timeout`` seconds for its lock. The disk tier therefore runs on a
+    single-thread executor that owns the connection; only the in-memory
+    tier is read and written on the event loop.
+    """
+    TABLE: str = ""
+    PATH_ENV: str = ""
+    DEFAULT_PATH: str = ""
+    TTL_ENV: Optional[str] = None
+    DEFAULT_TTL: float = 24 * 3600
+    _shared: Dict[str, "SqliteTTLCache"] = {}
+
+    def __init__(self, path: str, ttl: Optional[float] = None, memory_size: int = 4096,
+                 busy_timeout: float = 5.0):
+        self.path = path
+        if ttl is None and self.TTL_ENV:
+            ttl = float(os.environ.get(self.TTL_ENV, self.DEFAULT_TTL))
+        self.ttl = ttl or self.DEFAULT_TTL
+        self.busy_timeout = busy_timeout
+        self._memory = TTLCache(maxsize=memory_size, ttl=self.ttl)
+        self._db: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{self.TABLE}-cache")
+        # Queued ahead of every read and write, so construction never blocks
+        self._executor.submit(self._open)
+
+    @classmethod
+    def shared(cls, path: Optional[str] = None):
+        """Process-wide cache for ``path`` (default: the ``PATH_ENV`` variable)."""
+        path = path or os.environ.get(cls.PATH_ENV, cls.DEFAULT_PATH)
+        if path not in cls._shared:
+            cls._shared[path] = cls(path)
+        return cls._shared[path]
+
+    def _open(self):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                                 timeout=self.busy_timeout)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.TABLE} (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db = db
+        except (sqlite3.Error, OSError) as e:
+            log.warning("%s unavailable, keeping entries in memory only: %s", type(self).__name__, e)
+
+    async def _disk(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._memory.get(key)
+        if value is not None:
+            return value
+        value = await self._disk(self._load, key)
+        if value is not None:
+            self._memory[key] = value
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        self._memory[key] = value
+        await self._disk(self._store, key, json.dumps(value), time.time() + self.ttl)
+
+    async def delete(self, key: str):
+        self._memory.pop(key, None)
+        await self._disk(self._remove, key)
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                f"SELECT value, expires_at FROM {self.TABLE} WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            log.warning("%s read failed: %s", type(self).__name__, e)
+            return None
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def _store(self, key: str, value: str, expires_at: float):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.TABLE} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at)
+            )
+        except sqlite3.Error as e:
+            log.warning("%s write failed: %s", type(self).__name__, e)
+
+    def _remove(self, key: str):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(f"DELETE FROM {self.TABLE} WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            log.warning("%s write failed: %s", type(self).__name__, e)
+
+
+class DecisionCache(SqliteTTLCache):
+    """Two-tier cache of LLM option choices (dropdowns, radio groups).
+
+    Entries are content-addressed by the agent role and the normalized option
+    list, so the same "US states" dropdown resolves without an LLM call on
+    every site.
+    """
+    TABLE = "decisions"
+    PATH_ENV = "DECISION_CACHE_PATH"
+    DEFAULT_PATH = "cache/decisions.sqlite3"
+    DEFAULT_TTL = 30 * 24 * 3600
+    _shared: Dict[str, "DecisionCache"] = {}
+
+    @staticmethod
+    def normalize_option(option: str) -> str:
+        return " ".join(str(option).split()).lower()
+
+    @classmethod
+    def key(cls, role: str, options: List[str]) -> str:
+        normalized = [cls.normalize_option(option) for option in options]
+        return hashlib.sha256(json.dumps([role, normalized]).encode("utf-8")).hexdigest()
+
+
+class FormLocationCache(SqliteTTLCache):
+    """Per-domain record of where the contact form was found last time.
+
+    An entry holds the URL the form was filled on, the ``find_form_elements``
+    identifier, the iframe vendor, the submit button selector that worked and
+    the field -> FormFieldMapper type mapping, so a repeat visit can go
+    straight to fill-and-submit after one validation round trip.
+    """
+    TABLE = "form_locations"
+    PATH_ENV = "FORM_CACHE_PATH"
+    DEFAULT_PATH = "cache/forms.sqlite3"
+    TTL_ENV = "FORM_CACHE_TTL"
+    DEFAULT_TTL = 7 * 24 * 3600
+    _shared: Dict[str, "FormLocationCache"] = {}
+
+    @classmethod
+    def key(cls, url: str) -> str:
+        host = urlparse(DynamicWeb.normalize_url(url) or '').netloc.lower()
+        return host[4:] if host.startswith('www.') else host
+
 class FormAnalyzer:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, decision_cache: Optional[DecisionCache] = None):
         self.api_key = api_key
+        self.decision_cache = decision_cache or DecisionCache.shared()
         
         self.sentiment_agent = Agent(
             api_key=api_key,
@@ -124,16 +947,35 @@ class FormAnalyzer:
         return await self.sentiment_agent.analyze(page_content)
 
     async def select_radio_option(self, options: List[str]) -> Dict[str, Any]:
-        return await self.radio_agent.analyze(
-            json.dumps(options),
-            {"field_type": "radio"}
-        )
+        return await self._cached_selection(self.radio_agent, options, "radio")
 
     async def select_dropdown_option(self, options: List[str]) -> Dict[str, Any]:
-        return await self.dropdown_agent.analyze(
-            json.dumps(options),
-            {"field_type": "dropdown"}
-        )
+        return await self._cached_selection(self.dropdown_agent, options, "dropdown")
+
+    async def _cached_selection(self, agent: Agent, options: List[str], field_type: str) -> Dict[str, Any]:
+        """Answer from the decision cache when possible, else ask ``agent`` and cache a valid choice."""
+        key = DecisionCache.key(agent.role, options)
+        cached = await self.decision_cache.get(key)
+        if cached:
+            selected = self._match_option(cached.get("selected_option"), options)
+            if selected is not None:
+                log.debug("Cached %s choice: %s", field_type, selected)
+                return {**cached, "selected_option": selected}
+
+        result = await agent.analyze(json.dumps(options), {"field_type": field_type})
+        selected = self._match_option(result.get("selected_option"), options)
+        if selected is not None:
+            result = {**result, "selected_option": selected}
+            await self.decision_cache.set(key, result)
+        return result
+
+    @staticmethod
+    def _match_option(selected: Optional[str], options: List[str]) -> Optional[str]:
+        """The option in ``options`` equal to ``selected`` up to case and whitespace."""
+        if not selected:
+            return None
+        target = DecisionCache.normalize_option(selected)
+        return next((option for option in options if DecisionCache.normalize_option(option) == target), None)
 
 class SentimentAnalyzer:
     def __init__(self, api_key: str):
@@ -147,10 +989,10 @@ class SentimentAnalyzer:
         """
         try:
             result = await self.agent.analyze(content=text, additional_context=context)
-            print(f"[✓] Message analysis result: {result}")
+            log.info("Message analysis result: %s", result)
             return result
         except Exception as e:
-            print(f"[!] Error analyzing message: {e}")
+            log.warning("Error analyzing message: %s", e)
             return {
                 "status": "unknown",
                 "confidence": 0,
@@ -231,6 +1073,11 @@ class FormFieldMapper:
             'pricing.*form',
             'consultation.*form'
         ]
+        # Compiled once; mappers with the same patterns share one matcher and its cache
+        self._matcher = self._compile_matcher(tuple(
+            (field_type, tuple(info['patterns'])) for field_type, info in self.field_patterns.items()
+        ))
+        self._button_regex = re.compile('|'.join(f'(?:{p})' for p in self.form_button_patterns), re.IGNORECASE)
 
     def get_default_values(self):
         if self.default_values is not None:
@@ -255,31 +1102,131 @@ class FormFieldMapper:
             }
         return self.default_values
 
+    @staticmethod
+    def _expand_pattern(pattern: str) -> List[str]:
+        """Every literal string a field pattern matches.
+
+        Field patterns are near-literal: plain characters, ``[..]`` character
+        classes and ``?`` after either. Anything else is rejected, since the
+        matcher below only knows literals.
+        """
+        variants = ['']
+        i = 0
+        while i < len(pattern):
+            if pattern[i] == '[':
+                close = pattern.index(']', i)
+                choices = list(pattern[i + 1:close])
+                i = close + 1
+            elif pattern[i] in '.^$*+(){}|\\?]':
+                raise ValueError(f"Unsupported field pattern {pattern!r}: only literals, [..] and ? are allowed")
+            else:
+                choices = [pattern[i]]
+                i += 1
+            if i < len(pattern) and pattern[i] == '?':
+                choices.append('')
+                i += 1
+            variants = [variant + choice for variant in variants for choice in choices]
+        return [variant.lower() for variant in variants]
+
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def _compile_matcher(spec: tuple):
+        """Build a memoized ``identifiers -> field_type`` matcher for ``spec``.
+
+        ``spec`` is ``((field_type, (pattern, ...)), ...)`` in priority order.
+        Every pattern is expanded to its literals and all of them go into one
+        Aho-Corasick automaton whose states carry the best (lowest) priority
+        of any literal ending there. Each identifier is then scanned once,
+        character by character, and the highest-priority field type that
+        matched anywhere wins, exactly like the nested
+        type/pattern/identifier loop did.
+        """
+        field_types = [field_type for field_type, _ in spec]
+        none = len(field_types)
+        goto: List[Dict[str, int]] = [{}]
+        best = [none]
+        for priority, (_, patterns) in enumerate(spec):
+            for pattern in patterns:
+                for literal in FormFieldMapper._expand_pattern(pattern):
+                    state = 0
+                    for char in literal:
+                        if char not in goto[state]:
+                            goto.append({})
+                            best.append(none)
+                            goto[state][char] = len(goto) - 1
+                        state = goto[state][char]
+                    best[state] = min(best[state], priority)
+
+        # Breadth-first failure links, folded into a full transition table so
+        # the scan never backtracks; characters outside the table go to the root
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+        order = deque(goto[0].values())
+        while order:
+            state = order.popleft()
+            best[state] = min(best[state], best[fail[state]])
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            for char, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(char, 0)
+                order.append(child)
+
+        @lru_cache(maxsize=4096)
+        def match(identifiers: tuple) -> Optional[str]:
+            found = none
+            for identifier in identifiers:
+                state = 0
+                for char in identifier:
+                    state = delta[state].get(char, 0)
+                    if best[state] < found:
+                        found = best[state]
+                        if found == 0:
+                            return field_types[0]
+            return field_types[found] if found < none else None
+
+        return match
+
     def map_field(self, field_name: str, field_id: str, placeholder: str) -> tuple:
-        import re
-        identifiers = [field_name, field_id, placeholder]
-        identifiers = [i.lower() for i in identifiers if i]
-        for field_type, field_info in self.field_patterns.items():
-            for pattern in field_info['patterns']:
-                for identifier in identifiers:
-                    if re.search(pattern, identifier, re.IGNORECASE):
-                        key = field_info['key']
-                        # Use user_data if present, else default values
-                        value = self.user_data.get(key)
-                        if value is None:
-                            value = self.get_default_values().get(key)
-                        return field_type, value
-        return None, None
+        identifiers = tuple(i.lower() for i in (field_name, field_id, placeholder) if i)
+        field_type = self._matcher(identifiers) if identifiers else None
+        if field_type is None:
+            return None, None
+        return field_type, self.value_for(field_type)
+
+    def value_for(self, field_type: str):
+        """Value for a mapped field type: user_data if present, else the default."""
+        pattern = self.field_patterns.get(field_type)
+        if pattern is None:
+            return None
+        key = pattern['key']
+        value = self.user_data.get(key)
+        if value is None:
+            value = self.get_default_values().get(key)
+        return value
 
     def find_button_pattern(self, text: str) -> bool:
         """Check if the text matches any form button patterns."""
-        import re
-        text = text.lower()
-        return any(re.search(pattern, text, re.IGNORECASE) for pattern in self.form_button_patterns)
+        return self._button_regex.search(text.lower()) is not None
 
 class FormNavigationAgent:
-    def __init__(self, api_key: str):
+    # Local ranker weights: phrases matched against element text and link targets
+    TEXT_KEYWORDS = [
+        ('request a free estimate', 14), ('request free estimate', 14), ('free estimate', 12),
+        ('request a quote', 14), ('request quote', 14), ('get a quote', 14), ('get quote', 13),
+        ('free quote', 12), ('quote', 9), ('estimate', 9), ('consultation', 8), ('contact us', 10),
+        ('get in touch', 9), ('contact', 7), ('schedule', 5), ('get started', 5), ('request', 4),
+        ('book', 3), ('submit', 2)
+    ]
+    HREF_KEYWORDS = [('quote', 8), ('estimate', 8), ('contact', 7), ('consult', 5), ('request', 4), ('form', 4)]
+    BUTTON_CLASSES = ('button', 'btn', 'cta')
+    NEGATIVE_WORDS = ('facebook', 'twitter', 'instagram', 'linkedin', 'youtube', 'pinterest', 'tiktok',
+                      'login', 'log in', 'sign in', 'cart', 'privacy', 'terms', 'careers')
+
+    def __init__(self, api_key: str, top_k: int = 5, confident_score: int = 12, margin: int = 6):
         self.api_key = api_key
+        self.top_k = top_k
+        self.confident_score = confident_score
+        self.margin = margin
         self.agent = Agent(
             api_key=api_key,
             role="form_navigation_analyzer",
@@ -302,8 +1249,55 @@ class FormNavigationAgent:
             }"""
         )
 
-    async def analyze_navigation_elements(self, elements: List[Dict]) -> Dict[str, Any]:
-        """Analyze clickable elements to find the best navigation option."""
+    def score_element(self, element: Dict) -> int:
+        """Deterministic form-likelihood score for one clickable element."""
+        text = " ".join((element.get('text') or '').lower().split())[:200]
+        href = (element.get('href') or '').lower()
+        class_name = str(element.get('className') or '').lower()
+
+        score = 0
+        # Only the strongest text phrase counts, so "Request a Quote" is not
+        # also rewarded for "quote" and "request"
+        score += max((weight for phrase, weight in self.TEXT_KEYWORDS if phrase in text), default=0)
+        score += max((weight for word, weight in self.HREF_KEYWORDS if word in href), default=0)
+        if any(btn_class in class_name for btn_class in self.BUTTON_CLASSES):
+            score += 3
+        if href.startswith(('tel:', 'mailto:', 'javascript:void')):
+            score -= 10
+        if any(word in text or word in href for word in self.NEGATIVE_WORDS):
+            score -= 10
+        # Long texts are containers or paragraphs, not calls to action
+        if len(text) > 80:
+            score -= 6
+        return score
+
+    def rank_elements(self, elements: List[Dict]) -> List[tuple]:
+        """``(score, index)`` pairs, best first, one per distinct element."""
+        ranked = []
+        seen = set()
+        for i, element in enumerate(elements):
+            identity = (
+                " ".join((element.get('text') or '').split()).lower(),
+                element.get('href') or '',
+                (element.get('tagName') or '').lower()
+            )
+            if identity in seen:
+                continue
+            seen.add(identity)
+            ranked.append((self.score_element(element), i))
+        ranked.sort(key=lambda pair: (-pair[0], pair[1]))
+        return ranked
+
+    async def analyze_navigation_elements(
+            self, elements: List[Dict],
+            page_context: Optional[Callable[[], Awaitable[Optional[str]]]] = None) -> Dict[str, Any]:
+        """Find the element most likely to lead to a form.
+
+        Clear winners from the local ranker are returned without an LLM call;
+        only close calls go to the agent, and then only the top-k candidates.
+        ``page_context`` returns a page summary for that prompt and is only
+        awaited for a close call.
+        """
         try:
             if not elements:
                 return {
@@ -313,91 +1307,81 @@ class FormNavigationAgent:
                     "element_text": ""
                 }
 
-            # Prepare element data for analysis
+            ranked = self.rank_elements(elements)
+            top_score, top_index = ranked[0]
+            runner_up = ranked[1][0] if len(ranked) > 1 else 0
+
+            if top_score <= 0:
+                return {
+                    "best_element_index": -1,
+                    "confidence": 0,
+                    "reasoning": "No element looks like it leads to a form",
+                    "element_text": ""
+                }
+
+            if top_score >= self.confident_score and top_score - runner_up >= self.margin:
+                log.info("Local ranker selected element %s (score %s, next %s)", top_index, top_score, runner_up)
+                return {
+                    "best_element_index": top_index,
+                    "confidence": min(100, 50 + top_score * 3),
+                    "reasoning": f"Local ranker: score {top_score} vs {runner_up}",
+                    "element_text": elements[top_index].get('text', ''),
+                    "source": "local"
+                }
+
+            # Close call: let the LLM decide between the top-k candidates only
+            candidates = [index for score, index in ranked[:self.top_k] if score > 0]
             element_data = []
-            for i, element in enumerate(elements):
+            for i, index in enumerate(candidates):
+                element = elements[index]
                 element_data.append({
                     "index": i,
-                    "text": element.get('text', ''),
-                    "className": element.get('className', ''),
+                    "text": " ".join((element.get('text') or '').split())[:120],
+                    "href": element.get('href', ''),
+                    "className": str(element.get('className') or '')[:80],
                     "id": element.get('id', ''),
                     "tagName": element.get('tagName', '')
                 })
 
+            summary = await page_context() if page_context else None
+
             # Create analysis prompt
             analysis_prompt = f"""
             Analyze these clickable elements to find the one most likely to lead to a form or quote request:
 
-            {json.dumps(element_data, indent=2)}
+            {json.dumps(element_data, separators=(',', ':'))}
+
+            Page summary: {summary or 'None'}
 
             Which element is most likely to lead to a form? Consider:
             - Text content that suggests form submission
-            - Class names that indicate form-related functionality
-            - IDs that suggest form navigation
+            - Link targets, class names and IDs that suggest form navigation
             - Overall context and business relevance
 
             Return the index of the best element (0-based) and explain why you chose it.
             """
 
-            # Use the agent to analyze
+            log.debug("Local scores too close (%s vs %s), asking agent about %s candidates", top_score, runner_up, len(candidates))
             result = await self.agent.analyze(analysis_prompt)
-            
-            print(f"[🤖] Agent response: {result}")
-            
-            # Try to extract best_element_index from the result
-            best_index = result.get('best_element_index', -1)
-            reasoning = result.get('reasoning', '')
-            message = result.get('message', '')
-            
-            # If agent didn't provide a valid index, use fallback logic
-            if best_index == -1 or best_index >= len(elements):
-                print("[⚠️] Agent didn't provide valid index, using fallback logic...")
-                
-                # Priority-based selection
-                priority_keywords = [
-                    'request free estimate', 'request estimate', 'request quote', 'get quote',
-                    'request', 'quote', 'estimate', 'contact', 'get', 'submit'
-                ]
-                
-                best_index = 0
-                best_score = 0
-                
-                for i, element in enumerate(elements):
-                    element_text = element.get('text', '').lower()
-                    element_class = element.get('className', '').lower()
-                    
-                    # Calculate score based on keywords
-                    score = 0
-                    for keyword in priority_keywords:
-                        if keyword in element_text:
-                            score += priority_keywords.index(keyword) + 1  # Higher score for earlier keywords
-                    
-                    # Bonus for button classes
-                    if any(btn_class in element_class for btn_class in ['button', 'btn', 'cta']):
-                        score += 5
-                    
-                    # Penalty for social media and non-form elements
-                    if any(social in element_text for social in ['facebook', 'twitter', 'x', 'instagram', 'linkedin']):
-                        score -= 10
-                    
-                    if score > best_score:
-                        best_score = score
-                        best_index = i
-                
-                print(f"[🎯] Fallback selected element {best_index} with score {best_score}")
-            
-            # Get the text of the best element
-            best_element_text = elements[best_index].get('text', '') if best_index < len(elements) else ""
-            
+            log.debug("Agent response: %s", result)
+
+            best = result.get('best_element_index', -1)
+            if isinstance(best, int) and 0 <= best < len(candidates):
+                best_index = candidates[best]
+            else:
+                log.warning("Agent didn't provide valid index, using local ranker's choice")
+                best_index = top_index
+
             return {
                 "best_element_index": best_index,
                 "confidence": result.get('confidence', 0),
-                "reasoning": reasoning,
-                "element_text": best_element_text
+                "reasoning": result.get('reasoning', ''),
+                "element_text": elements[best_index].get('text', ''),
+                "source": "llm"
             }
 
         except Exception as e:
-            print(f"[!] Error in form navigation analysis: {str(e)}")
+            log.warning("Error in form navigation analysis: %s", e)
             return {
                 "best_element_index": -1,
                 "confidence": 0,
@@ -405,452 +1389,980 @@ class FormNavigationAgent:
                 "element_text": ""
             }
 
-class DynamicWeb:
-    def __init__(self,cap_api,api_key,user_data=None):
-        self.sitekey = None
-        self.data = None
-        self.web = None
-        self.Cap_API = cap_api
-        self.form_analyzer = FormAnalyzer(api_key)
-        self.field_mapper = FormFieldMapper(user_data=user_data)
-        self.sentiment_analyzer = SentimentAnalyzer(api_key)
-        self.navigation_agent = FormNavigationAgent(api_key)
+class CaptchaSolver:
+    """Async CapSolver client that creates a reCAPTCHA v2 task and polls it.
+
+    Polling backs off exponentially and gives up after ``deadline`` seconds.
+    ``base_url`` (or ``CAPSOLVER_URL``) can point at a local fake solver server.
+    """
+    _http: Optional[httpx.AsyncClient] = None
+    # Set by HarArchive replay to answer solver requests in-process
+    transport: Optional[httpx.AsyncBaseTransport] = None
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, deadline: float = 120.0,
+                 initial_delay: float = 2.0, max_delay: float = 10.0, backoff: float = 1.5):
+        self.api_key = api_key
+        self.base_url = (base_url or os.environ.get("CAPSOLVER_URL", "https://api.capsolver.com")).rstrip("/")
+        self.deadline = deadline
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+
+    @classmethod
+    def shared_client(cls) -> httpx.AsyncClient:
+        """HTTP session shared by every solver in the process."""
+        if cls._http is None:
+            cls._http = httpx.AsyncClient(timeout=httpx.Timeout(15.0), transport=cls.transport)
+        return cls._http
 
-    def ingestion(self, file):
+    @traced("captcha")
+    async def solve(self, site_key: str, url: str) -> Optional[str]:
+        """Return the gRecaptchaResponse token, or None on error or deadline.
+
+        Cancelling the awaiting task stops polling immediately.
+        """
         try:
-            self.data = pd.read_excel(file)
-            self.data = self.data['Website'].to_list()
-            return self.data
-        except Exception as e:
-            print("Not Correct file type", e)
+            return await asyncio.wait_for(self._solve(site_key, url), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            log.warning("CAPTCHA not solved within %.0fs", self.deadline)
+            return None
+        except httpx.HTTPError as e:
+            log.warning("CAPTCHA solver request failed: %s", e)
+            return None
+        except ValueError as e:
+            log.warning("CAPTCHA solver returned an invalid response: %s", e)
             return None
 
-    def Captcha_solver(self,site_key,web):
-        self.web=web
-        self.sitekey=site_key
-        res=requests.post("https://api.capsolver.com/createTask",
-                        data={
-            "clientKey": self.Cap_API,
+    async def _solve(self, site_key: str, url: str) -> Optional[str]:
+        client = self.shared_client()
+        response = await client.post(f"{self.base_url}/createTask", json={
+            "clientKey": self.api_key,
             "task": {
                 "type": "ReCaptchaV2Task",
-                "websiteURL": self.web,
-                "websiteKey": self.sitekey
+                "websiteURL": url,
+                "websiteKey": site_key
             }
-        }).json()
-        if res.get("error_id") > 0:
-            print(f"Error creating task: {res.get('errorDescription')}")
+        })
+        res = response.json()
+        if not isinstance(res, dict):
+            raise ValueError(f"createTask returned {type(res).__name__}, not an object")
+        if (res.get("errorId") or 0) > 0 or not res.get("taskId"):
+            log.warning("Error creating CAPTCHA task: %s", res.get('errorDescription'))
             return None
-        
-        task_id = res.get("task_id")
 
+        task_id = res["taskId"]
+        log.debug("CAPTCHA task created: %s", task_id)
+        delay = self.initial_delay
+        tracer = Tracer.current()
         while True:
-            get_captcha = requests.post(
-                "https://api.capsolver.com/getTaskResult",
-            json={
-                "clientKey": self.Cap_API,
-                "taskId": task_id
-            }
-            ).json()
+            await asyncio.sleep(delay)
+            try:
+                with tracer.span("captcha_poll") if tracer else nullcontext():
+                    result = (await client.post(f"{self.base_url}/getTaskResult", json={
+                        "clientKey": self.api_key,
+                        "taskId": task_id
+                    })).json()
+                if not isinstance(result, dict):
+                    raise ValueError(f"getTaskResult returned {type(result).__name__}, not an object")
+            except (httpx.HTTPError, ValueError) as e:
+                log.warning("CAPTCHA poll failed, retrying: %s", e)
+            else:
+                if (result.get("errorId") or 0) > 0 or result.get("status") == "failed":
+                    log.warning("CAPTCHA task failed: %s", result.get('errorDescription'))
+                    return None
+                if result.get("status") == "ready":
+                    return result.get("solution", {}).get("gRecaptchaResponse")
+            delay = min(delay * self.backoff, self.max_delay)
 
-            if get_captcha.get("status") == "ready":
-                return get_captcha.get("solution",{}).get("gRecaptchaResponse")
+class ContentExtractor:
+    """Readability-based main-content text, injected once per browser context.
 
-            time.sleep(3)
+    The bundled ``readability_bundle.js`` and ``readability_wrapper.js`` are
+    registered with ``add_init_script`` so every document in the context has
+    ``window.runReadability``; pages loaded before installation get the
+    script injected once. Only compact text is returned, never article HTML.
+    """
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    _script: Optional[str] = None
 
-    async def site_key(self,web):
-        self.web=web
-        async with async_playwright() as p:
-            browser = await p.chromium.launch()
-            page = await browser.new_page()
-            await page.goto(self.web)
-            
-            # Try multiple selectors for site key
-            site_key_selectors = [
-                ".g-recaptcha[data-sitekey]",
-                "[data-sitekey]",
-                "iframe[title='reCAPTCHA']",
-                ".g-recaptcha",
-                "[class*='recaptcha']"
-            ]
-            
-            for selector in site_key_selectors:
-                try:
-                    # Check if element exists
-                    element = page.locator(selector)
-                    if await element.count() > 0:
-                        # Try to get site key from data-sitekey attribute
-                        site_key = await element.first.get_attribute("data-sitekey")
-                        if site_key:
-                            print(f"[🔑] Found site key: {site_key}")
-                            await browser.close()
-                            return site_key
-                        
-                        # Try to get from iframe src
-                        iframe_src = await element.first.get_attribute("src")
-                        if iframe_src and "recaptcha" in iframe_src:
-                            # Extract site key from URL
-                            import re
-                            match = re.search(r'k=([^&]+)', iframe_src)
-                            if match:
-                                site_key = match.group(1)
-                                print(f"[🔑] Found site key from iframe: {site_key}")
-                                await browser.close()
-                                return site_key
-                except Exception as e:
-                    print(f"[!] Error with selector {selector}: {str(e)}")
-                    continue
-            
-            print("[!] Could not find site key")
-            await browser.close()
+    EXTRACT_SCRIPT = r"""
+        (maxChars) => {
+            if (typeof window.runReadability !== 'function') return { missing: true };
+            const article = window.runReadability();
+            if (!article) return null;
+            const text = (article.textContent || '').replace(/\s+/g, ' ').trim();
+            return { title: article.title || '', excerpt: article.excerpt || '', text: text.slice(0, maxChars) };
+        }
+    """
+
+    def __init__(self, max_chars: int = 4000):
+        self.max_chars = max_chars
+        self._contexts = weakref.WeakSet()
+
+    @classmethod
+    def script(cls) -> str:
+        if cls._script is None:
+            parts = []
+            for name in ('readability_bundle.js', 'readability_wrapper.js'):
+                with open(os.path.join(cls.BASE_DIR, name), encoding='utf-8') as f:
+                    parts.append(f.read())
+            cls._script = "\n;\n".join(parts)
+        return cls._script
+
+    async def install(self, context):
+        """Register Readability for every future document in ``context``."""
+        if context in self._contexts:
+            return
+        await context.add_init_script(script=self.script())
+        self._contexts.add(context)
+
+    @traced("readability")
+    async def extract(self, page) -> Optional[Dict[str, str]]:
+        """``{"title", "excerpt", "text"}`` for the page's main content, or None."""
+        try:
+            await self.install(page.context)
+            article = await page.evaluate(self.EXTRACT_SCRIPT, self.max_chars)
+            if article and article.get('missing'):
+                # Document was loaded before install; inject into it once
+                await page.add_script_tag(content=self.script())
+                article = await page.evaluate(self.EXTRACT_SCRIPT, self.max_chars)
+            if not article or article.get('missing'):
+                return None
+            return article
+        except Exception as e:
+            log.warning("Readability extraction failed: %s", e)
             return None
 
-    async def load_page_with_retry(self, page, url: str, max_retries: int = 3) -> bool:
-        """Load page with retry logic and multiple strategies."""
-        for attempt in range(max_retries):
+
+class NetworkCapture:
+    """Passive capture of form-submission traffic through page events.
+
+    Only document/XHR/fetch requests that carry a body (POST, PUT, PATCH) are
+    kept, in a ring buffer of ``max_entries`` with bodies truncated to
+    ``max_body`` characters. Unlike ``page.route`` nothing is intercepted,
+    so other requests never round-trip through Python.
+    """
+    RESOURCE_TYPES = {'document', 'xhr', 'fetch'}
+    METHODS = {'POST', 'PUT', 'PATCH'}
+
+    def __init__(self, max_entries: int = 50, max_body: int = 2048):
+        self.max_body = max_body
+        self.entries = deque(maxlen=max_entries)
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+        self._page = None
+
+    def attach(self, page) -> "NetworkCapture":
+        self._page = page
+        page.on("request", self._on_request)
+        page.on("response", self._on_response)
+        page.on("requestfailed", self._on_request_failed)
+        return self
+
+    def detach(self):
+        if self._page is None:
+            return
+        for event, handler in (("request", self._on_request), ("response", self._on_response),
+                               ("requestfailed", self._on_request_failed)):
             try:
-                print(f"[🔄] Loading attempt {attempt + 1}/{max_retries}")
-                
-                # Strategy 1: Try with domcontentloaded + JavaScript dependencies
-                try:
-                    await page.goto(url, wait_until="domcontentloaded", timeout=30000)
-                    # Wait for JavaScript dependencies
-                    await page.wait_for_function("""
-                        () => {
-                            // Wait for common JS frameworks to load
-                            return (
-                                (typeof jQuery === 'undefined' || jQuery.ready) &&
-                                (typeof React === 'undefined' || React) &&
-                                (typeof angular === 'undefined' || angular.element) &&
-                                (typeof Vue === 'undefined' || Vue) &&
-                                document.readyState === 'complete'
-                            );
-                        }
-                    """, timeout=20000)
-                    await page.wait_for_load_state("networkidle", timeout=15000)
-                    print("[✓] Page loaded with domcontentloaded + JS dependencies strategy")
-                    return True
-                except Exception as e:
-                    print(f"[!] domcontentloaded + JS strategy failed: {str(e)}")
-                
-                # Strategy 2: Try with load event + extended JS wait
-                try:
-                    await page.goto(url, wait_until="load", timeout=30000)
-                    # Wait for all JavaScript to execute
-                    await page.wait_for_function("""
-                        () => {
-                            return new Promise((resolve) => {
-                                if (document.readyState === 'complete') {
-                                    // Wait a bit more for any delayed scripts
-                                    setTimeout(resolve, 2000);
-                                } else {
-                                    window.addEventListener('load', () => {
-                                        setTimeout(resolve, 2000);
-                                    });
-                                }
-                            });
-                        }
-                    """, timeout=25000)
-                    print("[✓] Page loaded with load + extended JS wait strategy")
-                    return True
-                except Exception as e:
-                    print(f"[!] load + extended JS strategy failed: {str(e)}")
-                
-                # Strategy 3: Try without wait_until + comprehensive JS check
-                try:
-                    await page.goto(url, timeout=30000)
-                    # Comprehensive JavaScript dependency check
-                    await page.wait_for_function("""
-                        () => {
-                            return new Promise((resolve) => {
-                                const checkJS = () => {
-                                    // Check if all common frameworks are loaded
-                                    const frameworksLoaded = (
-                                        (typeof jQuery === 'undefined' || jQuery.ready) &&
-                                        (typeof React === 'undefined' || React) &&
-                                        (typeof angular === 'undefined' || angular.element) &&
-                                        (typeof Vue === 'undefined' || Vue) &&
-                                        (typeof bootstrap === 'undefined' || bootstrap) &&
-                                        (typeof moment === 'undefined' || moment) &&
-                                        document.readyState === 'complete'
-                                    );
-                                    
-                                    if (frameworksLoaded) {
-                                        resolve(true);
-                                    } else {
-                                        setTimeout(checkJS, 500);
-                                    }
-                                };
-                                checkJS();
-                            });
-                        }
-                    """, timeout=30000)
-                    print("[✓] Page loaded with comprehensive JS check strategy")
-                    return True
-                except Exception as e:
-                    print(f"[!] comprehensive JS check strategy failed: {str(e)}")
-                
-                # Strategy 4: Try with commit + minimal JS wait
-                try:
-                    await page.goto(url, wait_until="commit", timeout=30000)
-                    await page.wait_for_selector('body', timeout=15000)
-                    # Minimal JavaScript wait
-                    await page.wait_for_function("document.readyState === 'complete'", timeout=10000)
-                    print("[✓] Page loaded with commit + minimal JS strategy")
-                    return True
-                except Exception as e:
-                    print(f"[!] commit + minimal JS strategy failed: {str(e)}")
-                
+                self._page.remove_listener(event, handler)
+            except Exception:
+                pass
+        self._page = None
+        self._pending.clear()
+
+    def _on_request(self, request):
+        if request.resource_type not in self.RESOURCE_TYPES or request.method not in self.METHODS:
+            return
+        try:
+            body = request.post_data
+        except Exception:
+            body = None  # binary body
+        entry = {
+            'url': request.url,
+            'method': request.method,
+            'resource_type': request.resource_type,
+            'content_type': request.headers.get('content-type', ''),
+            'post_data': body[:self.max_body] if body else None,
+            'status': None,
+            'time': time.time()
+        }
+        self.entries.append(entry)
+        self._pending[request] = entry
+
+    def _on_response(self, response):
+        entry = self._pending.pop(response.request, None)
+        if entry is not None:
+            entry['status'] = response.status
+
+    def _on_request_failed(self, request):
+        entry = self._pending.pop(request, None)
+        if entry is not None:
+            entry['status'] = 0
+
+    def submissions(self, since: float = 0) -> List[Dict[str, Any]]:
+        """Captured requests started at or after ``since`` (epoch seconds)."""
+        return [entry for entry in self.entries if entry['time'] >= since]
+
+    def last_status(self, since: float = 0) -> Optional[int]:
+        """Status of the most recent completed submission since ``since``."""
+        for entry in reversed(self.entries):
+            if entry['time'] >= since and entry['status'] is not None:
+                return entry['status']
+        return None
+
+
+class ResourcePolicy:
+    """Context-level blocking of images, media, fonts and tracker/ads hosts.
+
+    The route is registered with a single regex, so Playwright only pauses
+    requests that could be blocked; everything else (documents, scripts,
+    XHR) never round-trips through Python. URLs belonging to form and
+    CAPTCHA vendors are always allowed.
+    """
+    EXTENSIONS = {
+        'image': ('png', 'jpe?g', 'gif', 'webp', 'avif', 'svg', 'ico', 'bmp'),
+        'media': ('mp4', 'webm', 'mp3', 'ogg', 'wav', 'm4a', 'mov'),
+        'font': ('woff2?', 'ttf', 'otf', 'eot'),
+    }
+    TRACKER_HOSTS = (
+        'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+        'googleadservices.com', 'connect.facebook.net', 'hotjar.com', 'clarity.ms', 'segment.io',
+        'cdn.segment.com', 'mixpanel.com', 'fullstory.com', 'nr-data.net', 'criteo.com', 'taboola.com',
+        'outbrain.com', 'adsrvr.org', 'bat.bing.com', 'snap.licdn.com', 'analytics.tiktok.com',
+        'ct.pinterest.com', 'quantserve.com', 'scorecardresearch.com', 'adroll.com', 'mc.yandex.ru',
+        'crazyegg.com', 'mouseflow.com', 'luckyorange.com'
+    )
+    ALLOW = ('jotform', 'hsforms', 'hubspot', 'hs-scripts', 'gravityforms', 'gravity-forms',
+             '/recaptcha/', 'recaptcha.net', 'hcaptcha.com', 'challenges.cloudflare.com')
+
+    def __init__(self, block_types: Iterable[str] = ('image', 'media', 'font'), block_trackers: bool = True,
+                 extra_blocked_hosts: Iterable[str] = (), allow: Iterable[str] = ()):
+        self.block_types = set(block_types)
+        self.allow = tuple(self.ALLOW) + tuple(allow)
+        self.blocked_hosts = (tuple(self.TRACKER_HOSTS) if block_trackers else ()) + tuple(extra_blocked_hosts)
+        self.pattern = self._build_pattern()
+
+    def _build_pattern(self):
+        alternatives = []
+        extensions = [ext for kind in self.block_types for ext in self.EXTENSIONS.get(kind, ())]
+        if extensions:
+            alternatives.append(r'[^?#]*\.(?:' + '|'.join(extensions) + r')(?:[?#].*)?$')
+        if self.blocked_hosts:
+            hosts = '|'.join(re.escape(host) for host in self.blocked_hosts)
+            alternatives.append(r'(?:[^/?#]*\.)?(?:' + hosts + r')(?:[:/?#].*)?$')
+        if not alternatives:
+            return None
+        allow = '|'.join(re.escape(item) for item in self.allow)
+        return re.compile(r'^(?!.*(?:' + allow + r'))https?://(?:' + '|'.join(alternatives) + ')', re.IGNORECASE)
+
+    @classmethod
+    def from_env(cls) -> Optional["ResourcePolicy"]:
+        """Policy from ``BLOCK_RESOURCES`` (comma-separated types, "1" for the defaults, unset for none)."""
+        setting = os.environ.get("BLOCK_RESOURCES", "").strip()
+        if not setting or setting == "0":
+            return None
+        if setting == "1":
+            return cls()
+        return cls(block_types=[t.strip() for t in setting.split(',') if t.strip() and t.strip() != 'trackers'],
+                   block_trackers='trackers' in setting)
+
+    async def apply(self, context):
+        if self.pattern is not None:
+            await context.route(self.pattern, self._handle)
+
+    async def _handle(self, route):
+        try:
+            await route.abort("blockedbyclient")
+        except Exception:
+            pass
+
+
+class HarArchive:
+    """Record each site's traffic to a HAR archive, or replay it without network.
+
+    ``record`` saves ``<directory>/<domain>.har.zip`` when the job's context
+    closes. ``replay`` serves that archive through ``route_from_har``.
+    Anything missing from it is faked: form submissions (POST/PUT/PATCH) get
+    a canned success response and every other request is aborted. Replay
+    also swaps the CAPTCHA solver and the LLM client onto in-process fake
+    transports, so a replayed job makes no external requests at all.
+
+    Either mode keeps runs away from the production caches: the form
+    location cache is disabled and decisions go to a throwaway SQLite file,
+    so a recording captures every page load and a replay neither reads
+    warm entries nor writes fake LLM answers back.
+    """
+    SUCCESS_HTML = "<html><body><div class=\"success-message\">Thank you! Your message has been sent.</div></body></html>"
+    SUCCESS_JSON = {"success": True, "message": "Thank you! Your message has been sent."}
+    # Canned answer for every agent role: a success verdict, the first
+    # candidate for navigation questions and no dropdown choice
+    LLM_ANSWER = {"status": "success", "confidence": 80, "message": "Thank you! Your message has been sent.",
+                  "reasoning": "offline replay", "best_element_index": 0, "selected_option": None}
+
+    def __init__(self, mode: str, directory: str = "cache/har"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"HAR mode must be 'record' or 'replay', not {mode!r}")
+        self.mode = mode
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.isolate_caches()
+        # (archive path, mtime) -> the copy replay actually serves
+        self._replayable: Dict[tuple, str] = {}
+        self._scratch: Optional[str] = None
+
+    @staticmethod
+    def isolate_caches():
+        """Disable FORM_CACHE and point DECISION_CACHE_PATH at a temp dir.
+
+        Set through the environment so later DynamicWeb instances, and
+        worker processes spawned from this one, pick it up.
+        """
+        os.environ["FORM_CACHE"] = "0"
+        os.environ["DECISION_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="har-caches-"), "decisions.sqlite3")
+
+    @classmethod
+    def from_env(cls) -> Optional["HarArchive"]:
+        """Archive from ``HAR_MODE`` (record / replay, unset for none) and ``HAR_DIR``."""
+        mode = os.environ.get("HAR_MODE", "").strip().lower()
+        if not mode:
+            return None
+        return cls(mode, os.environ.get("HAR_DIR", "cache/har"))
+
+    def path(self, url: str) -> str:
+        host = urlparse(DynamicWeb.normalize_url(url) or '').netloc.lower()
+        host = host[4:] if host.startswith('www.') else host
+        return os.path.join(self.directory, re.sub(r'[^a-z0-9.-]', '_', host or 'unknown') + '.har.zip')
+
+    def context_options(self, url: Optional[str]) -> Dict[str, Any]:
+        if self.mode != "record" or not url:
+            return {}
+        return {"record_har_path": self.path(url), "record_har_mode": "full", "record_har_content": "attach"}
+
+    def install(self):
+        """Point the CAPTCHA solver and LLM clients at fakes (replay only)."""
+        if self.mode != "replay":
+            return
+        CaptchaSolver.transport = httpx.MockTransport(self._fake_captcha)
+        CaptchaSolver._http = None
+        Agent.transport = httpx.MockTransport(self._fake_llm)
+        Agent._clients = {}
+        log.info("Replaying sites from %s; CAPTCHA and LLM calls are faked", self.directory)
+
+    async def apply(self, context, url: Optional[str]):
+        if self.mode != "replay":
+            return
+        # Routes registered later run first: the HAR answers what it knows,
+        # then falls back to the fake endpoint
+        await context.route("**/*", self._fake_endpoint)
+        path = self.path(url) if url else None
+        if path and os.path.exists(path):
+            await context.route_from_har(self.replayable(path), not_found="fallback")
+        else:
+            log.warning("No HAR archive for %s, every request will be faked", url)
+
+    def replayable(self, path: str) -> str:
+        """``path``, or a copy of it without the requests that failed while recording.
+
+        ``route_from_har`` stalls entries recorded with status -1 (aborted,
+        blocked or unresolvable requests) forever instead of falling back,
+        which hangs any page that waits on one of them. Dropped from the
+        copy, they reach the fake endpoint and are aborted.
+        """
+        key = (path, os.path.getmtime(path))
+        if key in self._replayable:
+            return self._replayable[key]
+        result = path
+        with zipfile.ZipFile(path) as archive:
+            name = next(name for name in archive.namelist() if name.endswith(".har"))
+            har = json.loads(archive.read(name))
+            entries = har["log"]["entries"]
+            har["log"]["entries"] = [entry for entry in entries if entry["response"].get("status") != -1]
+            if len(har["log"]["entries"]) < len(entries):
+                if self._scratch is None:
+                    self._scratch = tempfile.mkdtemp(prefix="har-replay-")
+                result = os.path.join(self._scratch, os.path.basename(path))
+                with zipfile.ZipFile(result, "w", zipfile.ZIP_DEFLATED) as copy:
+                    for info in archive.infolist():
+                        copy.writestr(info, json.dumps(har) if info.filename == name else archive.read(info))
+                log.debug("Replaying %s without %s failed requests", path, len(entries) - len(har["log"]["entries"]))
+        self._replayable[key] = result
+        return result
+
+    async def _fake_endpoint(self, route):
+        request = route.request
+        try:
+            if request.method not in ("POST", "PUT", "PATCH"):
+                await route.abort("internetdisconnected")
+            elif request.resource_type == "document":
+                await route.fulfill(status=200, content_type="text/html", body=self.SUCCESS_HTML)
+            else:
+                await route.fulfill(status=200, content_type="application/json", body=json.dumps(self.SUCCESS_JSON))
+        except Exception:
+            pass
+
+    @staticmethod
+    def _fake_captcha(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/createTask"):
+            return httpx.Response(200, json={"errorId": 0, "taskId": "replay-task"})
+        return httpx.Response(200, json={"errorId": 0, "status": "ready",
+                                         "solution": {"gRecaptchaResponse": "replay-captcha-token"}})
+
+    @classmethod
+    def _fake_llm(cls, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={
+            "id": "chatcmpl-replay",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "replay",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(cls.LLM_ANSWER)},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        })
+
+
+class DynamicWeb:
+    def __init__(self,cap_api,api_key,user_data=None,browser_pool=None,use_readability=None,on_step=None,
+                 form_cache=None):
+        self.sitekey = None
+        self.data = None
+        self.web = None
+        self.Cap_API = cap_api
+        self.captcha_solver = CaptchaSolver(cap_api)
+        self._captcha_task: Optional[asyncio.Task] = None
+        self.form_analyzer = FormAnalyzer(api_key)
+        self.field_mapper = FormFieldMapper(user_data=user_data)
+        self.sentiment_analyzer = SentimentAnalyzer(api_key)
+        self.navigation_agent = FormNavigationAgent(api_key)
+        self.browser_pool = browser_pool
+        self.form_candidates: List[Dict[str, Any]] = []
+        self.load_telemetry: Dict[str, Any] = {}
+        # page.goto calls made by the current process_page call (one per load
+        # attempt or direct link)
+        self.navigation_count = 0
+        # Summary of the last process_page trace (step timings, round trips)
+        self.timings: Dict[str, Any] = {}
+        # Opt-in: send Readability main-content text to the analyzers
+        if use_readability is None:
+            use_readability = os.environ.get("USE_READABILITY", "0") == "1"
+        self.content_extractor = ContentExtractor() if use_readability else None
+        # Optional callback receiving {"step", "time", ...} progress events
+        self.on_step = on_step
+        # Where each domain's form was found last time (FORM_CACHE=0 disables)
+        if form_cache is None and os.environ.get("FORM_CACHE", "1") == "1":
+            form_cache = FormLocationCache.shared()
+        self.form_cache = form_cache
+        # What this run resolved (recorded in the cache after a successful
+        # submission) and what the cache suggested for it
+        self.form_vendor: Optional[str] = None
+        self.submit_selector: Optional[str] = None
+        self.field_map: Dict[str, str] = {}
+        self.cached_submit_selector: Optional[str] = None
+        self.cached_field_map: Dict[str, str] = {}
+
+    def step(self, name: str, **detail):
+        """Report pipeline progress to ``on_step``; callback errors never break a job."""
+        if self.on_step is None:
+            return
+        try:
+            self.on_step({"step": name, "time": time.time(), **detail})
+        except Exception as e:
+            log.warning("Step callback failed: %s", e)
+
+    def ingestion(self, file, column: str = 'Website'):
+        """Lazily yield normalized, de-duplicated URLs from a spreadsheet.
+
+        Supports .xlsx (read-only streaming), .csv and .jsonl; see
+        ``iter_work_items``. Returns None for unsupported files.
+        """
+        if not str(file).lower().endswith(('.xlsx', '.xlsm', '.csv', '.jsonl')):
+            log.warning("Not Correct file type %s", file)
+            return None
+        return (item['url'] for item in self.iter_work_items(file, column))
+
+    def iter_work_items(self, file, column: str = 'Website') -> Iterator[Dict[str, Any]]:
+        """Yield ``{"url", "row", "record"}`` work items as rows are read.
+
+        URLs are normalized and duplicates dropped on the fly; only a short
+        digest per URL is kept in memory.
+        """
+        seen = set()
+        for row_number, record in self._iter_rows(file):
+            raw = record.get(column)
+            if raw is None:
+                raw = next((v for k, v in record.items() if k and str(k).strip().lower() in (column.lower(), 'url')), None)
+            url = self.normalize_url(raw)
+            if not url:
+                continue
+            digest = hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            yield {"url": url, "row": row_number, "record": record}
+
+    @staticmethod
+    def normalize_url(raw) -> Optional[str]:
+        """Canonical http(s) URL for a spreadsheet cell, or None if it is not one."""
+        if raw is None:
+            return None
+        value = str(raw).strip()
+        if not value or value.lower() in ('nan', 'none', 'null'):
+            return None
+        if '://' not in value:
+            value = 'https://' + value.lstrip('/')
+        parsed = urlparse(value)
+        if parsed.scheme.lower() not in ('http', 'https') or '.' not in parsed.netloc:
+            return None
+        return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), parsed.path.rstrip('/') or '/',
+                           '', parsed.query, ''))
+
+    @staticmethod
+    def _iter_rows(file) -> Iterator[tuple]:
+        """Yield ``(row_number, record)`` pairs without loading the whole file."""
+        name = str(file).lower()
+        if name.endswith('.csv'):
+            with open(file, newline='', encoding='utf-8-sig') as f:
+                for row_number, record in enumerate(csv.DictReader(f), start=2):
+                    yield row_number, record
+        elif name.endswith('.jsonl'):
+            with open(file, encoding='utf-8') as f:
+                for row_number, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        yield row_number, json.loads(line)
+                    except ValueError:
+                        log.warning("Skipping invalid JSON on line %s", row_number)
+        else:
+            workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+            try:
+                rows = workbook.active.iter_rows(values_only=True)
+                header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+                for row_number, values in enumerate(rows, start=2):
+                    yield row_number, dict(zip(header, values))
+            finally:
+                workbook.close()
+
+    async def Captcha_solver(self,site_key,web):
+        self.web=web
+        self.sitekey=site_key
+        return await self.captcha_solver.solve(site_key, web)
+
+    def start_captcha_solving(self, page, url: str) -> asyncio.Task:
+        """Detect and solve a CAPTCHA in the background so it overlaps with form filling."""
+        self.cancel_captcha_solving()
+        self._captcha_task = asyncio.create_task(self._detect_and_solve_captcha(page, url))
+        return self._captcha_task
+
+    def cancel_captcha_solving(self):
+        """Cancel a pending speculative CAPTCHA solve, if any."""
+        if self._captcha_task is not None and not self._captcha_task.done():
+            self._captcha_task.cancel()
+        self._captcha_task = None
+
+    async def _detect_and_solve_captcha(self, page, url: str) -> Optional[str]:
+        if not await self.check_for_captcha(page):
+            return None
+        log.debug("Solvable CAPTCHA detected, attempting to solve...")
+        site_key = await self.site_key(page)
+        if not site_key:
+            log.warning("Could not find site key")
+            return None
+        log.debug("Found site key: %s", site_key)
+        solution = await self.Captcha_solver(site_key, url)
+        if not solution:
+            log.warning("Failed to solve CAPTCHA")
+        return solution
+
+    # Site keys discovered per domain, shared by every DynamicWeb in the process
+    _site_key_cache = TTLCache(maxsize=10000, ttl=24 * 3600)
+
+    SITE_KEY_SCRIPT = """
+        () => {
+            const fromSrc = (src) => {
+                const match = (src || '').match(/[?&](?:k|sitekey)=([^&#]+)/);
+                return match ? decodeURIComponent(match[1]) : null;
+            };
+            const el = document.querySelector('.g-recaptcha[data-sitekey], .h-captcha[data-sitekey], [data-sitekey]');
+            if (el && el.getAttribute('data-sitekey')) return el.getAttribute('data-sitekey');
+            const frames = document.querySelectorAll("iframe[title='reCAPTCHA'], iframe[src*='recaptcha'], iframe[src*='hcaptcha']");
+            for (const frame of frames) {
+                const key = fromSrc(frame.getAttribute('src'));
+                if (key) return key;
+            }
+            return null;
+        }
+    """
+
+    @traced("captcha_site_key")
+    async def site_key(self, page):
+        """Find the reCAPTCHA/hCaptcha site key on the live page or one of its frames.
+
+        Each frame is probed with a single evaluate; results are cached per domain.
+        """
+        self.web = page.url
+        domain = urlparse(page.url).netloc.lower()
+        cached = self._site_key_cache.get(domain)
+        if cached:
+            log.debug("Using cached site key for %s", domain)
+            return cached
+
+        for frame in [page.main_frame] + [f for f in page.frames if f is not page.main_frame]:
+            try:
+                site_key = await frame.evaluate(self.SITE_KEY_SCRIPT)
             except Exception as e:
-                print(f"[!] Attempt {attempt + 1} completely failed: {str(e)}")
+                log.debug("Error probing frame for site key: %s", e)
+                continue
+            if site_key:
+                log.debug("Found site key: %s", site_key)
+                self._site_key_cache[domain] = site_key
+                return site_key
+
+        log.warning("Could not find site key")
+        return None
+
+    # Resolves once the page is usable for form work: a form field, a form
+    # iframe or a form CTA is present and the DOM has had no structural
+    # mutations for quietMs; or, with none of those, once the document is
+    # complete and quiet for idleMs; or at timeoutMs.
+    READINESS_SCRIPT = """
+        ({ quietMs, idleMs, timeoutMs }) => new Promise((resolve) => {
+            const FORM = 'form input:not([type="hidden"]), form textarea, form select';
+            const IFRAME = 'iframe[src*="form" i], iframe[src*="jotform"], iframe[src*="hsforms"], iframe[title*="form" i]';
+            const CTA = 'a[href*="contact" i], a[href*="quote" i], a[href*="estimate" i], a[href*="request" i]';
+            const signal = () => document.querySelector(FORM) ? 'form'
+                : document.querySelector(IFRAME) ? 'iframe'
+                : document.querySelector(CTA) ? 'cta' : null;
+
+            const start = performance.now();
+            let lastMutation = start;
+            const observer = new MutationObserver(() => { lastMutation = performance.now(); });
+            observer.observe(document.documentElement || document, { childList: true, subtree: true });
+
+            const timer = setInterval(() => {
+                const now = performance.now();
+                const quietFor = now - lastMutation;
+                const found = signal();
+                let result = null;
+                if (found && quietFor >= quietMs && document.readyState !== 'loading') result = found;
+                else if (!found && quietFor >= idleMs && document.readyState === 'complete') result = 'quiet';
+                else if (now - start >= timeoutMs) result = found ? found + '-timeout' : 'timeout';
+                if (result) {
+                    observer.disconnect();
+                    clearInterval(timer);
+                    resolve({ signal: result, elapsed: Math.round(now - start) });
+                }
+            }, 50);
+        })
+    """
+
+    # Learned time-to-ready per domain (seconds, moving average) and counts of
+    # which readiness signal fired, shared by every DynamicWeb in the process
+    _domain_ready_seconds = LRUCache(maxsize=10000)
+    readiness_signals: Counter = Counter()
+
+    def readiness_timeout(self, domain: str) -> float:
+        """Readiness timeout for ``domain`` in seconds, from its learned load time."""
+        learned = self._domain_ready_seconds.get(domain)
+        if learned is None:
+            return 15.0
+        return min(30.0, max(5.0, learned * 3))
+
+    def _record_readiness(self, domain: str, seconds: float, signal: str):
+        previous = self._domain_ready_seconds.get(domain)
+        self._domain_ready_seconds[domain] = seconds if previous is None else previous * 0.7 + seconds * 0.3
+        self.readiness_signals[signal] += 1
+        self.load_telemetry = {"domain": domain, "signal": signal, "seconds": round(seconds, 2)}
+
+    @traced("readiness")
+    async def wait_until_ready(self, page, timeout: float, quiet_ms: int = 500, idle_ms: int = 1500) -> Dict[str, Any]:
+        """Run the readiness detector, re-arming it if a client-side redirect replaces the document."""
+        for _ in range(3):
+            try:
+                return await page.evaluate(self.READINESS_SCRIPT, {
+                    "quietMs": quiet_ms, "idleMs": idle_ms, "timeoutMs": int(timeout * 1000)
+                })
+            except Exception as e:
+                if "context was destroyed" not in str(e) and "navigation" not in str(e).lower():
+                    raise
+                await page.wait_for_load_state("domcontentloaded")
+        return {"signal": "redirect-loop", "elapsed": 0}
+
+    @traced("load_page")
+    async def load_page_with_retry(self, page, url: str, max_retries: int = 3) -> bool:
+        """Navigate once per attempt, then wait until the page is ready for form work."""
+        domain = urlparse(url).netloc.lower()
+        for attempt in range(max_retries):
+            try:
+                log.debug("Loading attempt %s/%s", attempt + 1, max_retries)
+                timeout = self.readiness_timeout(domain)
+                started = time.monotonic()
+                self.navigation_count += 1
+                await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+                readiness = await self.wait_until_ready(page, timeout)
+                elapsed = time.monotonic() - started
+                self._record_readiness(domain, elapsed, readiness["signal"])
+                Tracer.annotate(signal=readiness["signal"], attempts=attempt + 1)
+                log.info("Page ready via '%s' after %.1fs", readiness['signal'], elapsed)
+                return True
+            except Exception as e:
+                log.warning("Attempt %s failed: %s", attempt + 1, e)
                 if attempt < max_retries - 1:
-                    print(f"[⏳] Waiting 3 seconds before retry...")
-                    await page.wait_for_timeout(3000)
+                    delay = 2 ** attempt
+                    log.info("Waiting %s seconds before retry...", delay)
+                    await asyncio.sleep(delay)
         
         return False
 
+    OPTIONS_SCRIPT = """
+        (select) => {
+            return Array.from(select.options).map(option => ({
+                text: option.text,
+                value: option.value,
+                selected: option.selected
+            }));
+        }
+    """
+
+    # Describes every fillable field under a root element in one round trip and
+    # tags each one with data-df-field so the fill script can find it again.
+    FIELD_DESCRIBE_SCRIPT = """
+        (root) => {
+            const fields = root.querySelectorAll('input:not([type="submit"]):not([type="hidden"]), select, textarea');
+            const text = (el) => (el ? (el.innerText || el.textContent || '') : '').trim().slice(0, 200);
+            const labelFor = (el) => {
+                if (el.labels && el.labels.length) return text(el.labels[0]);
+                const wrapping = el.closest('label');
+                if (wrapping) return text(wrapping);
+                const labelledBy = el.getAttribute('aria-labelledby');
+                if (labelledBy) return labelledBy.split(/\\s+/).map(id => text(document.getElementById(id))).join(' ').trim();
+                return '';
+            };
+            const isVisible = (el) => {
+                const style = window.getComputedStyle(el);
+                return style.display !== 'none' && style.visibility !== 'hidden' && style.opacity !== '0' &&
+                    (el.offsetParent !== null || style.position === 'fixed');
+            };
+            return Array.from(fields).map((el, index) => {
+                el.setAttribute('data-df-field', String(index));
+                const tag = el.tagName.toLowerCase();
+                return {
+                    index: index,
+                    tag: tag,
+                    type: (el.getAttribute('type') || (tag === 'input' ? 'text' : tag)).toLowerCase(),
+                    name: el.getAttribute('name') || '',
+                    id: el.id || '',
+                    placeholder: el.getAttribute('placeholder') || '',
+                    label: labelFor(el),
+                    ariaLabel: el.getAttribute('aria-label') || '',
+                    visible: isVisible(el),
+                    options: tag === 'select'
+                        ? Array.from(el.options).map(o => ({ text: o.text, value: o.value, selected: o.selected }))
+                        : null
+                };
+            });
+        }
+    """
+
+    # Applies all values in one round trip through the native value setters so
+    # framework-controlled inputs (React, Vue) see the change, then fires the
+    # input/change/blur events a user would.
+    FIELD_FILL_SCRIPT = """
+        (root, values) => values.map(({ index, value }) => {
+            const el = root.querySelector('[data-df-field="' + index + '"]');
+            if (!el) return { index: index, ok: false };
+            const proto = Object.getPrototypeOf(el);
+            const descriptor = Object.getOwnPropertyDescriptor(proto, 'value');
+            el.focus();
+            if (descriptor && descriptor.set) {
+                descriptor.set.call(el, value);
+            } else {
+                el.value = value;
+            }
+            el.dispatchEvent(new Event('input', { bubbles: true }));
+            el.dispatchEvent(new Event('change', { bubbles: true }));
+            el.blur();
+            return { index: index, ok: el.value === value };
+        })
+    """
+
+    # Where debug runs dump pages after a button click (untracked)
+    DEBUG_DIR = "cache/debug"
+
+    # Input types that take no free-text value
+    NON_TEXT_TYPES = {'checkbox', 'radio', 'file', 'button', 'image', 'reset', 'range', 'color'}
+
+    @traced("dropdown_choice")
+    async def choose_dropdown_option(self, options: List[Dict[str, Any]]) -> Optional[str]:
+        """Ask the dropdown agent for an option and return its value, or None."""
+        if not options:
+            log.warning("No options found in dropdown")
+            return None
+
+        log.debug("Found %d options in dropdown", len(options))
+
+        # Extract option texts for the agent
+        option_texts = [opt['text'] for opt in options]
+
+        # Use the dropdown agent to select the most appropriate option
+        selection = await self.form_analyzer.select_dropdown_option(option_texts)
+
+        if not selection or 'selected_option' not in selection:
+            log.warning("Agent could not make a selection")
+            return None
+
+        selected_text = selection['selected_option']
+        log.debug("Agent selected option: %s", selected_text)
+
+        # Find the matching option
+        for option in options:
+            if option['text'] == selected_text:
+                return option['value']
+
+        log.warning("Could not find matching option")
+        return None
+
     async def handle_dropdown_selection(self, page, element) -> bool:
         """Handle dropdown selection using the agent system."""
         try:
-            print("[🔍] Processing dropdown selection...")
-            
-            # Get all options from the dropdown
-            options = await element.evaluate("""
-                (select) => {
-                    return Array.from(select.options).map(option => ({
-                        text: option.text,
-                        value: option.value,
-                        selected: option.selected
-                    }));
-                }
-            """)
-            
-            if not options:
-                print("[!] No options found in dropdown")
-                return False
-                
-            print(f"[✓] Found {len(options)} options in dropdown")
-            
-            # Extract option texts for the agent
-            option_texts = [opt['text'] for opt in options]
-            
-            # Use the dropdown agent to select the most appropriate option
-            selection = await self.form_analyzer.select_dropdown_option(option_texts)
-            
-            if not selection or 'selected_option' not in selection:
-                print("[!] Agent could not make a selection")
+            log.debug("Processing dropdown selection...")
+            options = await element.evaluate(self.OPTIONS_SCRIPT)
+            option_value = await self.choose_dropdown_option(options)
+            if option_value is None:
                 return False
-                
-            selected_text = selection['selected_option']
-            print(f"[✓] Agent selected option: {selected_text}")
-            
-            # Find the matching option and select it
-            for option in options:
-                if option['text'] == selected_text:
-                    # Select the option
-                    await element.select_option(value=option['value'])
-                    print(f"[✓] Selected option: {selected_text}")
-                    return True
-                    
-            print("[!] Could not find matching option")
-            return False
-            
+            await element.select_option(value=option_value)
+            log.debug("Selected option: %s", option_value)
+            return True
+
         except Exception as e:
-            print(f"[!] Error handling dropdown selection: {str(e)}")
+            log.warning("Error handling dropdown selection: %s", e)
             return False
 
+    async def handle_dropdown_selection_in_frame(self, frame, element) -> bool:
+        """Handle dropdown selection in iframe context."""
+        return await self.handle_dropdown_selection(frame, element)
+
+    @staticmethod
+    def _css_string(value: str) -> str:
+        """``value`` as a double-quoted CSS string."""
+        return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+    async def _resolve_form_frame(self, page, value):
+        """Content frame of the iframe identified by ``value``.
+
+        ``value`` is the unique selector found during discovery; an iframe id,
+        title or src fragment (older identifiers) is matched as a fallback.
+        """
+        quoted = self._css_string(value)
+        iframe = None
+        for selector in (value, f'iframe[id={quoted}]', f'iframe[title*={quoted}]', f'iframe[src*={quoted}]'):
+            try:
+                candidate = page.locator(selector).first
+                if await candidate.count() > 0 and await candidate.evaluate("el => el.tagName === 'IFRAME'"):
+                    iframe = candidate
+                    break
+            except Exception:
+                # ``value`` is not a valid selector on its own
+                continue
+
+        if iframe is None:
+            log.warning("Could not find iframe")
+            return None
+
+        handle = await iframe.element_handle()
+        frame = await handle.content_frame() if handle else None
+        if not frame:
+            log.warning("Could not access iframe content")
+        return frame
+
+    @traced("fill_form")
     async def fill_form(self, page,form_found):
-        """Fill the form with appropriate values and return the parent div."""
+        """Fill the identified form (or iframe form) in bulk.
+
+        One evaluate describes every field, values are mapped in Python and
+        dropdown choices are made concurrently, then one evaluate applies
+        all values.
+        """
         try:
             key , value = form_found
-            
-            # Handle iframe forms
+
             if key == 'iframe':
-                print(f"[🔍] Filling iframe form: {value}")
-                
-                # Find the iframe
-                iframe = page.locator(f'iframe#{value}').first
-                if await iframe.count() == 0:
-                    # Try by title
-                    iframe = page.locator(f'iframe[title*="{value}"]').first
-                if await iframe.count() == 0:
-                    # Try by src containing the value
-                    iframe = page.locator(f'iframe[src*="{value}"]').first
-                
-                if await iframe.count() == 0:
-                    print("[!] Could not find iframe")
-                    return False
-                
-                # Switch to iframe context
-                frame = await iframe.content_frame()
+                log.debug("Filling iframe form: %s", value)
+                frame = await self._resolve_form_frame(page, value)
                 if not frame:
-                    print("[!] Could not access iframe content")
                     return False
-                
-                print("[✓] Switched to iframe context")
-                
-                # Get all form elements in the iframe
-                form_elements = await frame.query_selector_all('''
-                    input:not([type="submit"]):not([type="hidden"]),
-                    select,
-                    textarea
-                ''')
-                
-                if not form_elements:
-                    print("[!] No form elements found in iframe")
-                    return False
-                    
-                print(f"[✓] Found {len(form_elements)} form elements in iframe")
-                
-                # Fill the form elements in iframe
-                for element in form_elements:
-                    try:
-                        # Get element type
-                        element_type = await element.evaluate('el => el.tagName.toLowerCase()')
-                        
-                        if element_type == 'select':
-                            # Handle dropdown selection
-                            await self.handle_dropdown_selection_in_frame(frame, element)
-                            continue
-                            
-                        # Get field attributes
-                        field_name = await element.get_attribute('name')
-                        field_id = await element.get_attribute('id')
-                        placeholder = await element.get_attribute('placeholder')
-                        
-                        # Map the field to a value
-                        field_type, value = self.field_mapper.map_field(field_name, field_id, placeholder)
-                        
-                        if field_type and value:
-                            # Fill the field in iframe
-                            await element.fill(value)
-                            print(f"[✓] Filled {field_type} field in iframe with value: {value}")
-                            
-                            # Handle special cases
-                            if field_type == 'message' and element_type == 'textarea':
-                                await element.fill(value)
-                                print(f"[✓] Filled textarea in iframe with message: {value}")
-                                
-                    except Exception as e:
-                        print(f"[!] Error filling iframe field: {str(e)}")
-                        continue
-                
-                return True
-            
-            # Handle regular forms
+                log.info("Switched to iframe context")
+                root = frame.locator('html')
             else:
-             if key == 'id':
-                # Get all form fields
-                fields = page.locator(f'form#{value}')
-                
-             else: 
-                fields = page.locator(f'form.{value.strip().split()[0]}')
-                
+                root = page.locator(self.form_selector(form_found)).first
+                if await root.count() == 0:
+                    log.warning("No form fields found")
+                    return False
+
+            fields = await root.evaluate(self.FIELD_DESCRIBE_SCRIPT)
             if not fields:
-                print("[!] No form fields found")
-                return False, None
-            # Get all form elements
-            form_elements = await fields.locator('''
-                input:not([type="submit"]):not([type="hidden"]),
-                select,
-                textarea
-            ''').all()
-            
-            
-            if not form_elements:
-                print("[!] No form fields found")
+                log.warning("No form fields found")
                 return False
-            
-            for element in form_elements:
-                
-                # Get element type
-                element_type = await element.evaluate('el => el.tagName.toLowerCase()')
-                
-                if element_type == 'select':
-                    # Handle dropdown selection
-                    await self.handle_dropdown_selection(page, element)
+            log.info("Found %s form elements", len(fields))
+
+            values = []
+            dropdowns = []
+            for field in fields:
+                if not field['visible'] or field['type'] in self.NON_TEXT_TYPES:
+                    continue
+                if field['tag'] == 'select':
+                    dropdowns.append(field)
                     continue
-                    
-                # Get field attributes
-                field_name = await element.get_attribute('name')
-                field_id = await element.get_attribute('id')
-                placeholder = await element.get_attribute('placeholder')
-                
-                # Map the field to a value
-                field_type, value = self.field_mapper.map_field(field_name, field_id, placeholder)
-                # print(field_type, value)
-                if field_type and value:
-                    # Fill the field
-                    await element.fill(value)
-                    print(f"[✓] Filled {field_type} field with value: {value}")
-                    
-                    # Handle special cases
-                    if field_type == 'message' and element_type == 'textarea':
-                        await element.fill(value)
-                        print(f"[✓] Filled textarea with message: {value}")
-                    
-            # print(f"[*] Found {len(fields)} form fields")
-            all_fields_filled = True
 
-            return all_fields_filled
+                # Reuse the cached mapping for this form, else map the field
+                # from its attributes, falling back to its label text
+                field_key = field['name'] or field['id']
+                field_type = self.cached_field_map.get(field_key) if field_key else None
+                if field_type:
+                    field_value = self.field_mapper.value_for(field_type)
+                else:
+                    field_type, field_value = self.field_mapper.map_field(field['name'], field['id'], field['placeholder'])
+                    if not field_type:
+                        field_type, field_value = self.field_mapper.map_field(field['label'], field['ariaLabel'], None)
+                if field_type and field_key:
+                    self.field_map[field_key] = field_type
+                if field_type and field_value:
+                    values.append({'index': field['index'], 'value': str(field_value), 'field_type': field_type})
 
-        except Exception as e:
-            print(f"[!] Error in fill_form: {str(e)}")
-            return False
+            # Dropdown decisions are independent, so make them concurrently
+            choices = await asyncio.gather(
+                *(self.choose_dropdown_option(field['options']) for field in dropdowns),
+                return_exceptions=True
+            )
+            for field, choice in zip(dropdowns, choices):
+                if isinstance(choice, Exception):
+                    log.warning("Error handling dropdown selection: %s", choice)
+                elif choice is not None:
+                    values.append({'index': field['index'], 'value': choice, 'field_type': 'dropdown'})
 
-    async def handle_dropdown_selection_in_frame(self, frame, element) -> bool:
-        """Handle dropdown selection in iframe context."""
-        try:
-            print("[🔍] Processing dropdown selection in iframe...")
-            
-            # Get all options from the dropdown
-            options = await element.evaluate("""
-                (select) => {
-                    return Array.from(select.options).map(option => ({
-                        text: option.text,
-                        value: option.value,
-                        selected: option.selected
-                    }));
-                }
-            """)
-            
-            if not options:
-                print("[!] No options found in dropdown")
-                return False
-                
-            print(f"[✓] Found {len(options)} options in dropdown")
-            
-            # Extract option texts for the agent
-            option_texts = [opt['text'] for opt in options]
-            
-            # Use the dropdown agent to select the most appropriate option
-            selection = await self.form_analyzer.select_dropdown_option(option_texts)
-            
-            if not selection or 'selected_option' not in selection:
-                print("[!] Agent could not make a selection")
-                return False
-                
-            selected_text = selection['selected_option']
-            print(f"[✓] Agent selected option: {selected_text}")
-            
-            # Find the matching option and select it
-            for option in options:
-                if option['text'] == selected_text:
-                    # Select the option
-                    await element.select_option(value=option['value'])
-                    print(f"[✓] Selected option: {selected_text}")
-                    return True
-                    
-            print("[!] Could not find matching option")
-            return False
+            filled = set()
+            if values:
+                results = await root.evaluate(self.FIELD_FILL_SCRIPT, values)
+                filled = {r['index'] for r in results if r['ok']}
+                for item in values:
+                    status = "Filled" if item['index'] in filled else "Could not fill"
+                    log.debug("%s %s field with value: %s", status, item['field_type'], item['value'])
+            self.step("filled", fields=len(fields), filled=len(filled))
+
+            all_fields_filled = True
+
+            return all_fields_filled
 
         except Exception as e:
-            print(f"[!] Error handling dropdown selection in iframe: {str(e)}")
+            log.warning("Error in fill_form: %s", e)
             return False
 
     async def check_for_captcha(self, page) -> bool:
         """Check if there's a solvable CAPTCHA on the page."""
         try:
-            print("[🔍] Checking for CAPTCHA...")
+            log.debug("Checking for CAPTCHA...")
             
             # Check for text-only CAPTCHA warnings first (not solvable)
             text_only_captcha_selectors = [
@@ -896,12 +2408,12 @@ class DynamicWeb:
                         """)
                         
                         if is_warning_only:
-                            print(f"[ℹ️] Found text-only CAPTCHA warning (not solvable): {selector}")
+                            log.debug("Found text-only CAPTCHA warning (not solvable): %s", selector)
                             # Don't return True for warning-only captchas
                             continue
                             
                 except Exception as e:
-                    print(f"[!] Error checking text-only CAPTCHA: {str(e)}")
+                    log.warning("Error checking text-only CAPTCHA: %s", e)
                     continue
             
             # Check for solvable CAPTCHA elements (exclude v3)
@@ -942,11 +2454,12 @@ class DynamicWeb:
                             """)
                             
                             if is_recaptcha_v3:
-                                print(f"[ℹ️] Found reCAPTCHA v3 (invisible/warning only): {selector}")
+                                log.debug("Found reCAPTCHA v3 (invisible/warning only): %s", selector)
                                 # Don't return True for v3 as it's not solvable
                                 continue
                                 
-                            frame = await element.content_frame()
+                            handle = await element.element_handle()
+                            frame = await handle.content_frame() if handle else None
                             if frame:
                                 # Check for interactive CAPTCHA elements
                                 has_checkbox = (
@@ -959,725 +2472,626 @@ class DynamicWeb:
                                 has_image = await frame.locator('div.rc-imageselect-challenge').count() > 0
                                 
                                 if any([has_checkbox, has_challenge, has_audio, has_image]):
-                                    print(f"[!] Found solvable CAPTCHA: {selector}")
+                                    log.warning("Found solvable CAPTCHA: %s", selector)
                                     return True
                         except Exception:
                             continue
             
-            print("[✓] No solvable CAPTCHA found")
+            log.info("No solvable CAPTCHA found")
             return False
             
         except Exception as e:
-            print(f"[!] Error checking for CAPTCHA: {str(e)}")
+            log.warning("Error checking for CAPTCHA: %s", e)
             return False
 
-    async def find_button(self, page) -> bool:
+    # Collects visible clickable elements in one pass. Each node appears once,
+    # inner parts of a link/button and wrappers around real controls are
+    # pruned, text is truncated and the payload is capped, with form-related
+    # elements kept first. Every element is tagged with data-df-click so it
+    # can be clicked later by selector instead of being re-found by text.
+    CLICKABLE_SCRIPT = r"""
+        (maxElements) => {
+            const SELECTOR = 'button, a[href], [role="button"], input[type="button"], input[type="submit"], ' +
+                '.btn, .button, [class*="btn"], [class*="button"], [class*="cta"], [class*="submit"], ' +
+                '[class*="send"], [class*="request"], [class*="quote"], [class*="contact"], [class*="estimate"]';
+            const CONTROL = 'a[href], button, [role="button"], input[type="button"], input[type="submit"]';
+            const HINT = /quote|estimate|contact|request|consult|book|schedule|get started|form/i;
+
+            document.querySelectorAll('[data-df-click]').forEach(el => el.removeAttribute('data-df-click'));
+            const matched = new Set(document.querySelectorAll(SELECTOR));
+            const found = [];
+            for (const el of matched) {
+                if (el.offsetParent === null) continue;  // not visible
+                const isControl = el.matches(CONTROL);
+                const control = el.parentElement && el.parentElement.closest(CONTROL);
+                if (control && matched.has(control)) continue;  // part of a link/button already listed
+                if (!isControl && el.querySelector(CONTROL)) continue;  // wrapper around real controls
+                const text = (el.innerText || el.textContent || el.value || '').replace(/\s+/g, ' ').trim().slice(0, 120);
+                const className = typeof el.className === 'string' ? el.className.slice(0, 120) : '';
+                const href = el.getAttribute('href') || '';
+                found.push({
+                    el: el, tagName: el.tagName, text: text, className: className, id: el.id || '',
+                    href: href, absoluteHref: el.href || '', hint: HINT.test(text + ' ' + href + ' ' + className)
+                });
+            }
+
+            const kept = found.filter(e => e.hint).concat(found.filter(e => !e.hint)).slice(0, maxElements);
+            return kept.map((e, i) => {
+                e.el.setAttribute('data-df-click', String(i));
+                return {
+                    tagName: e.tagName, text: e.text, className: e.className, id: e.id,
+                    href: e.href, absoluteHref: e.absoluteHref, selector: '[data-df-click="' + i + '"]'
+                };
+            });
+        }
+    """
+
+    @traced("find_button")
+    async def find_button(self, page, max_elements: int = 150) -> bool:
         """Find and click a button that might lead to a form."""
         try:
-            print("[🔍] Looking for navigation buttons that lead to forms...")
+            log.debug("Looking for navigation buttons that lead to forms...")
             
             # Get all clickable elements with their text content
-            all_clickable_elements = await page.evaluate("""
-                () => {
-                    const elements = [];
-                    
-                    // Get all potential clickable elements
-                    const selectors = [
-                        'button',
-                        'a[href]',
-                        '[role="button"]',
-                        'input[type="button"]',
-                        'input[type="submit"]',
-                        '.btn',
-                        '.button',
-                        '[class*="btn"]',
-                        '[class*="button"]',
-                        '[class*="cta"]',
-                        '[class*="submit"]',
-                        '[class*="send"]',
-                        '[class*="request"]',
-                        '[class*="quote"]',
-                        '[class*="contact"]',
-                        '[class*="estimate"]'
-                    ];
-                    
-                    selectors.forEach(selector => {
-                        const found = document.querySelectorAll(selector);
-                        found.forEach(el => {
-                            if (el.offsetParent !== null) { // Check if visible
-                                const text = el.textContent || el.innerText || '';
-                                const className = el.className || '';
-                                const id = el.id || '';
-                                
-                                elements.push({
-                                    tagName: el.tagName,
-                                    text: text.trim(),
-                                    className: className,
-                                    id: id,
-                                    selector: selector,
-                                    isVisible: true
-                                });
-                            }
-                        });
-                    });
-                    
-                    return elements;
-                }
-            """)
+            all_clickable_elements = await page.evaluate(self.CLICKABLE_SCRIPT, max_elements)
             
-            print(f"[ℹ️] Found {len(all_clickable_elements)} potential clickable elements")
+            log.debug("Found %s potential clickable elements", len(all_clickable_elements))
             
             if not all_clickable_elements:
-                print("[!] No clickable elements found")
+                log.warning("No clickable elements found")
                 return False
             
             # Use the FormNavigationAgent to analyze and find the best element
-            print("[🤖] Using AI agent to analyze navigation elements...")
-            analysis_result = await self.navigation_agent.analyze_navigation_elements(all_clickable_elements)
+            log.debug("Using AI agent to analyze navigation elements...")
+            async def page_context():
+                # Readability summary for the LLM prompt, built only on a close call
+                article = await self.content_extractor.extract(page)
+                if article:
+                    return f"{article['title']}: {article['excerpt'] or article['text'][:500]}"
+                return None
+            analysis_result = await self.navigation_agent.analyze_navigation_elements(
+                all_clickable_elements, page_context if self.content_extractor else None)
             best_index = analysis_result.get('best_element_index', -1)
+            Tracer.annotate(elements=len(all_clickable_elements), source=analysis_result.get('source'))
             confidence = analysis_result.get('confidence', 0)
             reasoning = analysis_result.get('reasoning', '')
             element_text = analysis_result.get('element_text', '')
             
-            print(f"[📊] AI Analysis Results:")
-            print(f"  - Best Element Index: {best_index}")
-            print(f"  - Confidence: {confidence}%")
-            print(f"  - Reasoning: {reasoning}")
-            print(f"  - Element Text: '{element_text}'")
+            log.debug("AI Analysis Results: index=%s confidence=%s%% text=%r reasoning=%s",
+                      best_index, confidence, element_text, reasoning)
             
             if best_index >= 0 and best_index < len(all_clickable_elements):
-                # Try to click the best element identified by the agent
                 best_element = all_clickable_elements[best_index]
-                print(f"[🎯] Attempting to click AI-selected element: '{best_element['text']}'")
-                
+                element_text = best_element['text']
+                tag_name = best_element['tagName'].lower()
+                element = page.locator(best_element['selector']).first
+                log.info("Attempting to click %s element: '%s'", tag_name, element_text)
+
+                # Strategy 1: Scroll into view and click with force
                 try:
-                    # Try multiple click strategies for the selected element
-                    selector = best_element['selector']
-                    element_text = best_element['text']
-                    tag_name = best_element['tagName'].lower()
-                    
-                    print(f"[🎯] Attempting to click {tag_name} element: '{element_text}'")
-                    
-                    # Strategy 1: Scroll into view and click with force
-                    try:
-                        element = page.locator(selector).filter(has_text=element_text)
-                        if await element.count() > 0:
-                            # Scroll element into view first
-                            await element.first.scroll_into_view_if_needed()
-                            await page.wait_for_timeout(1000)  # Wait for scroll to complete
-                            
-                            # Try clicking with force
-                            await element.first.click(force=True, timeout=10000)
-                            print(f"[✓] Successfully clicked AI-selected element: {element_text}")
-                            return True  
-                    except Exception as e:
-                     print(f"[!] Strategy 1 failed: {str(e)}")
-                    
-                    # Strategy 2: Click by text with scroll
-                    try:
-                        # Scroll to element first
-                        await page.evaluate(f"""
-                            const element = document.evaluate(
-                                "//a[contains(text(), '{element_text}')] | //button[contains(text(), '{element_text}')]",
-                                document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
-                            ).singleNodeValue;
-                            if (element) {{
-                                element.scrollIntoView({{ behavior: 'smooth', block: 'center' }});
-                            }}
-                        """)
-                        await page.wait_for_timeout(1000)
-                        
-                        await page.click(f"text={element_text}", force=True, timeout=10000)
-                        print(f"[✓] Successfully clicked AI-selected element by text: {element_text}")
-                        return True
-                    except Exception as e:
-                        print(f"[!] Strategy 2 failed: {str(e)}")
-                    
-                    # Strategy 3: Click by tag and text with JavaScript
-                    try:
-                        # For links, use expect_navigation
-                        if tag_name == 'a':
-                            async with page.expect_navigation(wait_until="networkidle"):
-                                await page.evaluate(f"""
-                                    const elements = document.querySelectorAll('{tag_name}');
-                                    for (let el of elements) {{
-                                        if (el.textContent.includes('{element_text}')) {{
-                                            el.scrollIntoView({{ behavior: 'smooth', block: 'center' }});
-                                            el.click();
-                                            return true;
-                                        }}
-                                    }}
-                                """)
-                        else:
-                            # For buttons, just click without navigation wait
-                            await page.evaluate(f"""
-                                const elements = document.querySelectorAll('{tag_name}');
-                                for (let el of elements) {{
-                                    if (el.textContent.includes('{element_text}')) {{
-                                        el.scrollIntoView({{ behavior: 'smooth', block: 'center' }});
-                                        el.click();
-                                        return true;
-                                    }}
-                                }}
-                            """)
-                            await page.wait_for_timeout(2000)
-                        
-                        print(f"[✓] Successfully clicked AI-selected element by JavaScript: {element_text}")
-                        return True
-                    except Exception as e:
-                        print(f"[!] Strategy 3 failed: {str(e)}")
-                    
-                    # Strategy 4: Click by href for links with proper navigation (including sliders/carousels)
-                    if tag_name == 'a':
-                        try:
-                            # Get the href first
-                            href_result = await page.evaluate(f"""
-                                const link = document.querySelector('a[href*="/contact"], a[href*="/quote"], a[href*="/request"], a[href*="/form"]');
-                                if (link && link.textContent.includes('{element_text}')) {{
-                                    return link.href;
-                                }}
-                                return null;
-                            """)
-                            
-                            if href_result:
-                                print(f"[🔗] Found link with href: {href_result}")
-                                
-                                # Method 1: Handle slider/carousel navigation
-                                try:
-                                    print("[🎠] Attempting slider/carousel navigation...")
-                                    
-                                    # Check if we're in a slider/carousel context
-                                    slider_result = await page.evaluate(f"""
-                                        // Find the link in slider/carousel context
-                                        const link = document.querySelector('a[href="{href_result}"]');
-                                        if (link) {{
-                                            // Check if link is in a slider/carousel
-                                            let parent = link.parentElement;
-                                            let isInSlider = false;
-                                            let sliderContainer = null;
-                                            
-                                            while (parent && parent !== document.body) {{
-                                                const className = parent.className || '';
-                                                const id = parent.id || '';
-                                                
-                                                if (className.includes('slider') || className.includes('carousel') || 
-                                                    className.includes('swiper') || className.includes('slick') ||
-                                                    id.includes('slider') || id.includes('carousel')) {{
-                                                    isInSlider = true;
-                                                    sliderContainer = parent;
-                                                    break;
-                                                }}
-                                                parent = parent.parentElement;
-                                            }}
-                                            
-                                            if (isInSlider) {{
-                                                // Ensure the slide with the link is active/visible
-                                                link.scrollIntoView({{ behavior: 'smooth', block: 'center', inline: 'center' }});
-                                                
-                                                // Wait a bit for any animations
-                                                setTimeout(() => {{
-                                                    // Try to make the link visible and clickable
-                                                    link.style.display = 'block';
-                                                    link.style.visibility = 'visible';
-                                                    link.style.opacity = '1';
-                                                    link.style.zIndex = '9999';
-                                                    
-                                                    // Click the link
-                                                    link.click();
-                                                }}, 1000);
-                                                
-                                                return true;
-                                            }} else {{
-                                                // Regular link, just click it
-                                                link.scrollIntoView({{ behavior: 'smooth', block: 'center' }});
-                                                link.click();
-                                                return true;
-                                            }}
-                                        }}
-                                        return false;
-                                    """)
-                                    
-                                    if slider_result:
-                                        await page.wait_for_load_state("networkidle")
-                                        await page.wait_for_timeout(2000)
-                                        print(f"[✓] Successfully handled slider/carousel navigation: {element_text}")
-                                        return True
-                            
-                                except Exception as e:
-                                    print(f"[!] Slider navigation failed: {str(e)}")
-                                
-                                # Method 2: Direct navigation with full URL
-                                try:
-                                    current_url = page.url
-                                    base_url = current_url.rstrip('/')
-                                    if href_result.startswith('/'):
-                                        full_url = base_url + href_result
-                                    else:
-                                        full_url = href_result
-                                    
-                                    print(f"[🔗] Attempting direct navigation to: {full_url}")
-                                    await page.goto(full_url, wait_until="networkidle")
-                                    print(f"[✓] Successfully navigated to: {full_url}")
-                                    return True
-                                except Exception as e:
-                                    print(f"[!] Direct navigation failed: {str(e)}")
-                                
-                                # Method 3: Click the link and wait for navigation
-                                try:
-                                    element = page.locator(f'a[href="{href_result}"]')
-                                    if await element.count() > 0:
-                                        # Wait for navigation to start
-                                        async with page.expect_navigation(wait_until="networkidle"):
-                                            await element.first.click()
-                                        print(f"[✓] Successfully clicked link and navigated: {element_text}")
-                                        return True
-                                except Exception as e:
-                                    print(f"[!] Click navigation failed: {str(e)}")
-                                
-                                # Method 4: JavaScript click with navigation wait
-                                try:
-                                    await page.evaluate(f"""
-                                        const link = document.querySelector('a[href="{href_result}"]');
-                                        if (link) {{
-                                            link.scrollIntoView({{ behavior: 'smooth', block: 'center' }});
-                                            link.click();
-                                        }}
-                                    """)
-                                    await page.wait_for_load_state("networkidle")
-                                    print(f"[✓] Successfully clicked link via JavaScript: {element_text}")
-                                    return True
-                                except Exception as e:
-                                    print(f"[!] JavaScript click failed: {str(e)}")
-                            
-                        except Exception as e:
-                            print(f"[!] Strategy 4 failed: {str(e)}")
-                    
-                    # Strategy 5: Click by class if available
-                    if best_element['className']:
-                        try:
-                            class_selector = f"{tag_name}.{best_element['className'].replace(' ', '.')}"
-                            element = page.locator(class_selector)
-                            if await element.count() > 0:
-                                await element.first.scroll_into_view_if_needed()
-                                await page.wait_for_timeout(1000)
-                                await element.first.click(force=True, timeout=10000)
-                                print(f"[✓] Successfully clicked AI-selected element by class: {element_text}")
-                                return True
-                        except Exception as e:
-                            print(f"[!] Strategy 5 failed: {str(e)}")
-                    
-                    # Strategy 6: Handle horizontally scrollable containers
-                    try:
-                        await page.evaluate(f"""
-                            const element = document.querySelector('{tag_name}[href*="/contact"], {tag_name}[href*="/quote"], {tag_name}[href*="/request"], {tag_name}[href*="/form"]');
-                            if (element && element.textContent.includes('{element_text}')) {{
-                                // Find the scrollable parent container
-                                let parent = element.parentElement;
-                                while (parent && parent !== document.body) {{
-                                    const style = window.getComputedStyle(parent);
-                                    if (style.overflowX === 'auto' || style.overflowX === 'scroll' || 
-                                        style.overflow === 'auto' || style.overflow === 'scroll') {{
-                                        // Scroll the container to make element visible
-                                        const rect = element.getBoundingClientRect();
-                                        const parentRect = parent.getBoundingClientRect();
-                                        
-                                        if (rect.left < parentRect.left) {{
-                                            parent.scrollLeft -= (parentRect.left - rect.left + 50);
-                                        }} else if (rect.right > parentRect.right) {{
-                                            parent.scrollLeft += (rect.right - parentRect.right + 50);
-                                        }}
-                                        break;
-                                    }}
-                                    parent = parent.parentElement;
-                                }}
-                                
-                                // Also scroll the element itself into view
-                                element.scrollIntoView({{ behavior: 'smooth', block: 'center', inline: 'center' }});
-                                
-                                // Wait a bit then click
-                                setTimeout(() => {{
-                                    element.click();
-                                }}, 1000);
-                            }}
-                        """)
-                        await page.wait_for_timeout(2000)
-                        print(f"[✓] Successfully clicked element in scrollable container: {element_text}")
-                        return True
-                    except Exception as e:
-                        print(f"[!] Strategy 6 failed: {str(e)}")
-                    
-                    # Strategy 7: Force click with JavaScript (bypass viewport checks)
+                    await element.scroll_into_view_if_needed(timeout=5000)
+                    await element.click(force=True, timeout=10000)
+                    Tracer.annotate(strategy="click")
+                    log.info("Successfully clicked AI-selected element: %s", element_text)
+                    return True
+                except Exception as e:
+                    log.warning("Strategy 1 failed: %s", e)
+
+                # Strategy 2: DOM click on the same node (sliders, overflow containers)
+                try:
+                    await element.evaluate("el => { el.scrollIntoView({ block: 'center', inline: 'center' }); el.click(); }")
+                    await page.wait_for_timeout(2000)
+                    Tracer.annotate(strategy="dom_click")
+                    log.info("Successfully clicked AI-selected element by JavaScript: %s", element_text)
+                    return True
+                except Exception as e:
+                    log.warning("Strategy 2 failed: %s", e)
+
+                # Strategy 3: Navigate straight to the link target
+                href = best_element.get('absoluteHref', '')
+                if tag_name == 'a' and href.startswith(('http://', 'https://')):
                     try:
-                        await page.evaluate(f"""
-                            const elements = document.querySelectorAll('{tag_name}');
-                            for (let el of elements) {{
-                                if (el.textContent.includes('{element_text}')) {{
-                                    // Force click without viewport checks
-                                    el.dispatchEvent(new MouseEvent('click', {{
-                                        bubbles: true,
-                                        cancelable: true,
-                                        view: window
-                                    }}));
-                                    return true;
-                                }}
-                            }}
-                        """)
-                        await page.wait_for_timeout(2000)
-                        print(f"[✓] Successfully force-clicked element via JavaScript: {element_text}")
+                        log.info("Attempting direct navigation to: %s", href)
+                        self.navigation_count += 1
+                        await page.goto(href, wait_until="networkidle")
+                        Tracer.annotate(strategy="direct_goto")
+                        log.info("Successfully navigated to: %s", href)
                         return True
                     except Exception as e:
-                        print(f"[!] Strategy 7 failed: {str(e)}")
-                    
-                    print(f"[!] All click strategies failed for AI-selected element: {element_text}")
-                    
-                except Exception as e:
-                 print(f"[!] Error clicking AI-selected element: {str(e)}")
+                        log.warning("Direct navigation failed: %s", e)
+
+                log.warning("All click strategies failed for AI-selected element: %s", element_text)
+            else:
+                log.warning("AI agent could not identify a suitable navigation element")
+            
+            log.warning("No suitable navigation button found")
+            return False
+            
+        except Exception as e:
+            log.warning("Error in navigation button detection: %s", e)
+            return False
+
+    # Scores every visible form, form-like container and form iframe in one
+    # pass and returns them ranked, each with a selector unique in the page.
+    FORM_DISCOVERY_SCRIPT = r"""
+        () => {
+            const BUTTON_TEXT = /submit|send message|pay now|get a free estimate|register|request a free (estimat|quote)|contact\s*us|get quotation|call/i;
+            const FIELDS = 'input:not([type="hidden"]):not([type="submit"]):not([type="button"]), select, textarea';
+            const SUBMITS = 'button[type="submit"], input[type="submit"], button:not([type]), [role="button"], .form-submit-button';
+            const VENDORS = {
+                'jotform': 'jotform', 'hsforms': 'hubspot', 'hubspot': 'hubspot', 'typeform': 'typeform',
+                'docs.google.com/forms': 'google', 'wufoo': 'wufoo', 'cognitoforms': 'cognito',
+                'formstack': 'formstack', 'gravityforms': 'gravity', 'forms.office': 'microsoft'
+            };
+
+            const styleVisible = (el) => {
+                const style = window.getComputedStyle(el);
+                return style.display !== 'none' && style.visibility !== 'hidden' && style.opacity !== '0';
+            };
+            const isVisible = (el) => styleVisible(el) &&
+                (el.offsetParent !== null || window.getComputedStyle(el).position === 'fixed');
+            const uniqueId = (el) => el.id && document.querySelectorAll('#' + CSS.escape(el.id)).length === 1;
+            const cssPath = (el) => {
+                const parts = [];
+                let node = el;
+                while (node && node.nodeType === 1 && node !== document.body && node !== document.documentElement) {
+                    let part = node.tagName.toLowerCase();
+                    if (uniqueId(node)) {
+                        parts.unshift(part + '#' + CSS.escape(node.id));
+                        return parts.join(' > ');
+                    }
+                    const parent = node.parentElement;
+                    if (parent) {
+                        const same = Array.from(parent.children).filter(c => c.tagName === node.tagName);
+                        if (same.length > 1) part += ':nth-of-type(' + (same.indexOf(node) + 1) + ')';
+                    }
+                    parts.unshift(part);
+                    node = parent;
+                }
+                return 'body > ' + parts.join(' > ');
+            };
+            const countFields = (root) => {
+                const result = { count: 0, email: false, textarea: false };
+                for (const field of root.querySelectorAll(FIELDS)) {
+                    const name = (field.getAttribute('name') || '').toLowerCase();
+                    if (name.includes('website') || !styleVisible(field)) continue;  // honeypots
+                    result.count++;
+                    if (field.type === 'email' || name.includes('mail')) result.email = true;
+                    if (field.tagName === 'TEXTAREA') result.textarea = true;
+                }
+                return result;
+            };
+            const hasButtonText = (root) => Array.from(root.querySelectorAll('button, input[type="submit"]'))
+                .some(b => BUTTON_TEXT.test(b.textContent || b.value || ''));
+            const className = (el) => typeof el.className === 'string' ? el.className : '';
+
+            const candidates = [];
+
+            for (const form of document.querySelectorAll('form')) {
+                if (!isVisible(form)) continue;
+                const fields = countFields(form);
+                const buttonText = hasButtonText(form);
+                if (fields.count < 3 && !(buttonText && fields.count > 0)) continue;
+                candidates.push({
+                    kind: 'form', id: form.id || '', className: className(form), selector: cssPath(form),
+                    inputs: fields.count, hasSubmit: !!form.querySelector(SUBMITS),
+                    score: 100 + fields.count * 5 + (buttonText ? 20 : 0) + (fields.email ? 10 : 0) + (fields.textarea ? 5 : 0)
+                });
+            }
+
+            const containers = [];
+            for (const el of document.querySelectorAll('div, section, article, ul')) {
+                if (el.closest('form') || el.querySelector('form') || !el.querySelector(FIELDS)) continue;
+                if (!el.querySelector('button[type="submit"], input[type="submit"]')) continue;
+                const cls = className(el);
+                const hasFormAttr = el.getAttribute('role') === 'form' || el.hasAttribute('data-form') ||
+                    el.hasAttribute('data-wf-form') || el.hasAttribute('data-form-type');
+                const hasFormClass = ['form', 'jotform', 'jf-required', 'page-section', 'form-line', 'gform']
+                    .some(c => cls.includes(c));
+                const hasFormStructure = !!el.querySelector('label, fieldset, legend');
+                if (!(hasFormAttr || hasFormClass || hasFormStructure)) continue;
+                const fields = countFields(el);
+                if (fields.count <= 2 || !isVisible(el)) continue;
+                containers.push({ el, fields });
+            }
+            // Keep only the innermost container holding a given set of fields
+            for (const { el, fields } of containers) {
+                if (containers.some(c => c.el !== el && el.contains(c.el) && c.fields.count === fields.count)) continue;
+                candidates.push({
+                    kind: 'container', id: el.id || '', className: className(el), selector: cssPath(el),
+                    inputs: fields.count, hasSubmit: true,
+                    score: 40 + fields.count * 5 + (fields.email ? 10 : 0) + (fields.textarea ? 5 : 0)
+                });
+            }
+
+            for (const frame of document.querySelectorAll('iframe')) {
+                if (!isVisible(frame)) continue;
+                const src = frame.getAttribute('src') || '';
+                const text = `${frame.id} ${frame.title} ${src}`.toLowerCase();
+                if (text.includes('recaptcha') || text.includes('hcaptcha')) continue;
+                const vendorKey = Object.keys(VENDORS).find(k => text.includes(k));
+                const formish = ['form', 'quote', 'request', 'contact', 'submit'].some(w => text.includes(w));
+                if (!vendorKey && !formish) continue;
+                candidates.push({
+                    kind: 'iframe', id: frame.id || '', title: frame.title || '', src: src,
+                    vendor: vendorKey ? VENDORS[vendorKey] : null, selector: cssPath(frame),
+                    needsProbe: !vendorKey, inputs: 0, score: vendorKey ? 90 : 60
+                });
+            }
+
+            return candidates.sort((a, b) => b.score - a.score);
+        }
+    """
+
+    @staticmethod
+    def form_selector(identifier) -> Optional[str]:
+        """CSS selector for a form identifier returned by ``find_form_elements``."""
+        key, value = identifier
+        if key == 'id':
+            return f'form#{value}'
+        if key == 'class':
+            return f'form.{value.strip().split()[0]}'
+        if key == 'selector':
+            return value
+        return None
+
+    @traced("discover_forms")
+    async def discover_forms(self, page) -> List[Dict[str, Any]]:
+        """Ranked form/container/iframe candidates from a single page.evaluate."""
+        try:
+            return await page.evaluate(self.FORM_DISCOVERY_SCRIPT) or []
+        except Exception as e:
+            log.warning("Error running form discovery: %s", e)
+            return []
+
+    @traced("iframe_probe")
+    async def _iframe_has_form(self, page, selector: str) -> bool:
+        """Look inside an iframe that is form-like only by its attributes."""
+        try:
+            iframe = await page.query_selector(selector)
+            frame = await iframe.content_frame() if iframe else None
+            if not frame:
+                return False
+            counts = await frame.evaluate(
+                "() => ({ forms: document.forms.length, inputs: document.querySelectorAll('input, select, textarea').length })"
+            )
+            return counts['forms'] > 0 or counts['inputs'] >= 3
+        except Exception as e:
+            log.debug("Error accessing iframe content: %s", e)
+            return False
+
+    @staticmethod
+    def _candidate_identifier(candidate: Dict[str, Any]) -> tuple:
+        if candidate['kind'] == 'iframe':
+            # The discovered selector works for iframes without id, title or src
+            return ('iframe', candidate['selector'])
+        if candidate['kind'] == 'form' and candidate['id'] and re.fullmatch(r'[A-Za-z_][\w-]*', candidate['id']) \
+                and candidate['selector'].startswith('form#'):
+            return ('id', candidate['id'])
+        return ('selector', candidate['selector'])
+
+    @traced("find_form")
+    async def find_form_elements(self, page) -> bool:
+        """Find the best form on the page.
+
+        Returns an identifier tuple ``('id' | 'selector' | 'iframe', value)``,
+        or None when nothing form-like is found. The full ranked candidate
+        list is kept in ``self.form_candidates``.
+        """
+        try:
+            log.debug("Searching for forms...")
+            candidates = await self.discover_forms(page)
+            self.form_candidates = candidates
+            self.form_vendor = None
+            log.debug("Found %s form candidates", len(candidates))
+
+            for candidate in candidates:
+                if candidate['kind'] == 'iframe' and candidate['needsProbe'] \
+                        and not await self._iframe_has_form(page, candidate['selector']):
+                    continue
+                identifier = self._candidate_identifier(candidate)
+                self.form_vendor = candidate.get('vendor')
+                Tracer.annotate(strategy=candidate['kind'], score=candidate['score'], candidates=len(candidates))
+                log.info("Found %s form (score %s, %s inputs): %s",
+                         candidate['kind'], candidate['score'], candidate['inputs'], identifier)
+                return identifier
+
+            return None
+
+        except Exception as e:
+            log.warning("Error finding form elements: %s", e)
+            return False
+
+    # Whether a cached form is still where it was: the form (or, for iframes,
+    # the iframe at the discovered selector) exists and still has every field
+    # name/id that was mapped last time.
+    FORM_CACHE_CHECK_SCRIPT = """
+        ([selector, frameValue, keys]) => {
+            if (frameValue !== null) {
+                try {
+                    const frame = document.querySelector(frameValue);
+                    return !!frame && frame.tagName === 'IFRAME';
+                } catch (e) {
+                    return false;
+                }
+            }
+            const root = document.querySelector(selector);
+            if (!root) return false;
+            const present = new Set();
+            for (const el of root.querySelectorAll('input, select, textarea')) {
+                if (el.name) present.add(el.name);
+                if (el.id) present.add(el.id);
+            }
+            return keys.every(key => present.has(key));
+        }
+    """
+
+    async def cached_form_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        """The form cache entry for ``url``'s domain, if any."""
+        if self.form_cache is None:
+            return None
+        return await self.form_cache.get(FormLocationCache.key(url))
+
+    @traced("form_cache")
+    async def cached_form_location(self, page, url: str, entry: Optional[Dict[str, Any]]):
+        """Identifier of the cached form ``entry`` for ``url``, if it still matches.
+
+        ``_process_page`` loads the entry's form URL instead of ``url``, so
+        normally the page is already there; a page the caller loaded is moved
+        to it first. The entry is then validated with one evaluate. On a
+        mismatch it is dropped and, if the page is not showing ``url``,
+        ``url`` is loaded so discovery starts from where it normally would.
+        """
+        self.cached_field_map = {}
+        self.cached_submit_selector = None
+        if self.form_cache is None:
+            return None
+        key = FormLocationCache.key(url)
+        if not entry:
+            Tracer.annotate(result="miss")
+            return None
+
+        identifier = tuple(entry['identifier'])
+        moved = not self.is_showing(page, entry['form_url'])
+        try:
+            if moved and not await self.load_page_with_retry(page, entry['form_url'], max_retries=1):
+                valid = False
+            elif identifier[0] == 'iframe':
+                valid = await page.evaluate(self.FORM_CACHE_CHECK_SCRIPT, [None, identifier[1], []])
             else:
-                print("[!] AI agent could not identify a suitable navigation element")
-            
-            print("[!] No suitable navigation button found")
-            return False
-            
+                valid = await page.evaluate(self.FORM_CACHE_CHECK_SCRIPT,
+                                            [self.form_selector(identifier), None, list(entry['fields'])])
         except Exception as e:
-            print(f"[!] Error in navigation button detection: {str(e)}")
-            return False
+            log.debug("Cached form check failed: %s", e)
+            valid = False
 
-    async def find_form_elements(self, page) -> bool:
-        """Find form elements on the page using multiple detection strategies."""
-        try:
-            print("[🔍] Searching for form relevant button...")
-            form_btn = page.locator("button").filter(has_text=re.compile(
-                    r"Submit | Send Message | Pay Now |get a free Estimate Now|Register|Request a free estimation|"
-                    r"Request a free quote|Contact\s*us|Get Quotation|Call",
-                    re.IGNORECASE))
-            ##find button with given text inside to track towards the form using the button
-            buttons = await form_btn.all()
-            ##first here it will check for form elemetns using buttons , if none found , will move to next strategy
-            if buttons:
-                for btn in buttons:
-                    
-                    try:
-                        form = btn.locator("xpath=ancestor::form")
-                        if not await form.count() > 0:
-                            print("❌ No form ancestor for this button. Going back...")
-                            await page.go_back()
-                            await page.wait_for_load_state('networkidle')
-                            continue
-                        else:
-                            form_id = await form.get_attribute('id')
-                            form_class = await form.get_attribute('class')
-                            identifier = ('id', form_id) if form_id else ('class', form_class)
-                            return identifier
-                            
-                    except Exception as e:
-                        print(str(e))
-            
+        Tracer.annotate(result="hit" if valid else "invalid", moved=moved)
+        if valid:
+            log.info("Using cached form %s on %s", identifier, page.url)
+            self.form_candidates = []
+            self.form_vendor = entry.get('vendor')
+            self.cached_submit_selector = entry.get('submit_selector')
+            self.cached_field_map = dict(entry.get('fields') or {})
+            return identifier
 
-            # # Strategy 1: Check for actual form structure
-            try:
-                # First check for traditional form tags
-                form_elements = await page.query_selector_all('form')
-                if form_elements:
-                    # Verify these are actual forms with input fields
-                    for form in form_elements:
-                        if await form.is_visible():
-                            inputs = await form.query_selector_all('''
-                            input:not([type="hidden"]),
-                            select,
-                            textarea
-                        ''')
-                        valid_inputs = []
-                        for inp in inputs:
-                            # Ignore honeypot fields like name="website"
-                            name = await inp.get_attribute("name")
-                            if name and "website" in name.lower():
-                                continue
+        log.info("Cached form for %s no longer matches, rediscovering", key)
+        await self.form_cache.delete(key)
+        if not self.is_showing(page, url) and not await self.load_page_with_retry(page, url):
+            log.warning("Failed to reload page after cache mismatch: %s", url)
+        return None
 
-                            style = await inp.evaluate('el => window.getComputedStyle(el)')
-                            if style['display'] != 'none' and style['visibility'] != 'hidden' and style['opacity'] != '0':
-                                valid_inputs.append(inp)
+    async def remember_form_location(self, url: str, form_url: str, identifier):
+        """Record where the form for ``url``'s domain was found and how it was filled."""
+        if self.form_cache is None or not identifier:
+            return
+        await self.form_cache.set(FormLocationCache.key(url), {
+            "form_url": form_url,
+            "identifier": list(identifier),
+            "vendor": self.form_vendor,
+            "submit_selector": self.submit_selector,
+            "fields": self.field_map,
+        })
 
-                        if valid_inputs and len(valid_inputs) >= 3:
-                            print("[✓] Found valid form with input fields (adjusted strategy)")
-                            form_id = await form.get_attribute('id')
-                            form_class = await form.get_attribute('class')
-                            identifier = ('id', form_id) if form_id else ('class', form_class)
-                            return identifier
-            except Exception:
-                pass
+    async def forget_form_location(self, url: str):
+        if self.form_cache is not None:
+            await self.form_cache.delete(FormLocationCache.key(url))
 
-            # Strategy 2: Check for iframe forms (like JotForm)
-            print("[🔍] Checking for iframe forms...")
-            try:
-                # Wait for iframes to load
-                await page.wait_for_timeout(2000)
-                
-                iframe_elements = await page.query_selector_all('iframe')
-                print(f"[ℹ️] Found {len(iframe_elements)} iframes using query_selector_all")
-                
-                # Also try with locator
-                iframe_locator = page.locator('iframe')
-                iframe_count = await iframe_locator.count()
-                print(f"[ℹ️] Found {iframe_count} iframes using locator")
-                
-                # List all iframes for debugging
-                for i in range(iframe_count):
-                    iframe = iframe_locator.nth(i)
-                    iframe_id = await iframe.get_attribute('id')
-                    iframe_title = await iframe.get_attribute('title')
-                    iframe_src = await iframe.get_attribute('src')
-                    # print(f"[ℹ️] Iframe {i+1}: id='{iframe_id}', title='{iframe_title}', src='{iframe_src}'")
-                
-                for iframe in iframe_elements:
-                    try:
-                        # Check if iframe is visible
-                        is_visible = await iframe.is_visible()
-                        print(f"[ℹ️] Iframe visibility: {is_visible}")
-                        
-                        if not is_visible:
-                            continue
-                            
-                        # Get iframe attributes
-                        iframe_id = await iframe.get_attribute('id')
-                        iframe_title = await iframe.get_attribute('title')
-                        iframe_src = await iframe.get_attribute('src')
-                        
-                        print(f"[ℹ️] Checking iframe: id='{iframe_id}', title='{iframe_title}', src='{iframe_src}'")
-                        
-                        # Check if this looks like a form iframe
-                        form_indicators = ['form', 'jotform', 'quote', 'request', 'contact', 'submit']
-                        iframe_text = f"{iframe_id or ''} {iframe_title or ''} {iframe_src or ''}".lower()
-                        
-                        print(f"[ℹ️] Iframe text for analysis: {iframe_text}")
-                        
-                        # Special check for JotForm
-                        is_jotform = 'jotform' in iframe_src.lower() if iframe_src else False
-                        print(f"[ℹ️] Is JotForm iframe: {is_jotform}")
-                        
-                        if is_jotform or any(indicator in iframe_text for indicator in form_indicators):
-                            print(f"[✓] Found potential form iframe: {iframe_title}")
-                            
-                            # For JotForm, we know it's a form, so return immediately
-                            if is_jotform:
-                                print(f"[✓] JotForm iframe detected: {iframe_id}")
-                                identifier = ('iframe', iframe_id or iframe_title or 'jotform-iframe')
-                                return identifier
-                            
-                            # Wait for iframe to load
-                            try:
-                                # Wait for iframe to be ready
-                                await iframe.wait_for_element_state('attached', timeout=5000)
-                                
-                                # Try to access the iframe content
-                                frame = await iframe.content_frame()
-                                if frame:
-                                    print(f"[✓] Successfully accessed iframe content")
-                                    
-                                    # Wait a bit for iframe content to load
-                                    await page.wait_for_timeout(2000)
-                                    
-                                    # Check for forms inside the iframe
-                                    iframe_forms = await frame.query_selector_all('form')
-                                    if iframe_forms:
-                                        print(f"[✓] Found {len(iframe_forms)} forms inside iframe")
-                                        
-                                        # Return iframe identifier
-                                        identifier = ('iframe', iframe_id or iframe_title or 'form-iframe')
-                                        return identifier
-                                    
-                                    # Check for form-like elements inside iframe
-                                    form_inputs = await frame.query_selector_all('input, select, textarea')
-                                    if form_inputs and len(form_inputs) >= 3:
-                                        print(f"[✓] Found {len(form_inputs)} form inputs inside iframe")
-                                        
-                                        # Return iframe identifier
-                                        identifier = ('iframe', iframe_id or iframe_title or 'form-iframe')
-                                        return identifier
-                                        
-                            except Exception as e:
-                                print(f"[!] Error accessing iframe content: {str(e)}")
-                                continue
-                                
-                    except Exception as e:
-                        print(f"[!] Error checking iframe: {str(e)}")
-                        continue
-                        
-            except Exception as e:
-                print(f"[!] Error checking iframes: {str(e)}")
+    async def process_page(self, page, url: str, navigate: Optional[bool] = None) -> bool:
+        """Process a single page for form filling.
 
+        Navigation is owned here: with ``page=None`` a fresh context is leased
+        from ``self.browser_pool`` and navigated to ``url``. A caller-supplied
+        page is only navigated if it is not already showing ``url``, so a
+        caller that pre-loads the page never causes a second load.
+        ``navigate`` forces the decision either way.
 
-            # Strategy 3: Check for form-like structures using Readability.js approach
-            try:
-                # Get all potential form containers
-                form_containers = await page.evaluate("""
-                    () => {
-                        // Function to check if element is visible
-                        const isVisible = (el) => {
-                            const style = window.getComputedStyle(el);
-                            return style.display !== 'none' && 
-                                   style.visibility !== 'hidden' && 
-                                   style.opacity !== '0' &&
-                                   el.offsetParent !== null;
-                        };
-
-                        // Function to check if element is likely a form
-                        const isLikelyForm = (el) => {
-                            // Must have input fields
-                            const inputs = el.querySelectorAll('input:not([type="submit"]):not([type="hidden"]), select, textarea');
-                            if (inputs.length === 0) return false;
-
-                            // Must have submit button or similar
-                            const hasSubmit = el.querySelector('button[type="submit"], input[type="submit"], button:not([type]), [role="button"], .form-submit-button');
-                            if (!hasSubmit) return false;
-
-                            // Check for form-like attributes
-                            const hasFormAttr = el.hasAttribute('role') && el.getAttribute('role') === 'form' ||
-                                              el.hasAttribute('data-form') ||
-                                              el.hasAttribute('data-wf-form') ||
-                                              el.hasAttribute('data-form-type');
-
-                            // Check for form-like classes
-                            const hasFormClass = el.className.includes('form') ||
-                                                el.className.includes('jotform') ||
-                                                el.className.includes('jf-required') ||
-                                                el.className.includes('page-section') ||
-                                                el.className.includes('form-line') ||
-                                                el.className.includes('gform');
-
-                            // Check for form-like structure
-                            const hasFormStructure = el.querySelector('label') !== null ||
-                                                   el.querySelector('fieldset') !== null ||
-                                                   el.querySelector('legend') !== null;
-
-                            return (hasFormAttr || hasFormClass || hasFormStructure) && isVisible(el);
-                        };
-
-                        // Get all potential form containers
-                        const containers = Array.from(document.querySelectorAll('div, section, article, ul, form'));
-
-                        return containers.filter(isLikelyForm).map(el => ({
-                            tagName: el.tagName,
-                            className: el.className,
-                            id: el.id,
-                            hasInputs: el.querySelectorAll('input, select, textarea').length,
-                            hasSubmit: !!el.querySelector('button[type="submit"], input[type="submit"]'),
-                            isVisible: isVisible(el)
-                        }));
-                    }
-                """)
-                if form_containers and len(form_containers) > 0:
-                    # Log the found containers for debugging
-                    print(f"[ℹ️] Found {len(form_containers)} potential form containers")
-                    for container in form_containers:
-                        print(f"[ℹ️] Container: {container['tagName']} (class: {container['className']}, id: {container['id']})")
-                        print(f"[ℹ️] Has {container['hasInputs']} inputs, submit: {container['hasSubmit']}, visible: {container['isVisible']}")
-                    
-                    # Verify at least one container is a valid form (must have more than 2 inputs)
-                    valid_containers = [c for c in form_containers if c['hasInputs'] > 2 and c['hasSubmit'] and c['isVisible']]
-                    if valid_containers:
-                        print("[✓] Found valid form-like structure")
-                        # Return the first valid container
-                        container = valid_containers[0]
-                        form_id = container['id']
-                        form_class = container['className']
-                        identifier = ('id', form_id) if form_id else ('class', form_class)
-                        return identifier
+        Each call is traced; the step timings and round-trip counts end up in
+        ``self.timings`` and the number of page loads in
+        ``self.navigation_count``.
+        """
+        self.navigation_count = 0
+        tracer = Tracer(url).activate()
+        log_context = bind_log_context(url=url)
+        result = None
+        try:
+            if page is None:
+                if self.browser_pool is None:
+                    result = {"status": "error", "message": "No page given and no browser pool configured"}
+                    return result
+                async with self.browser_pool.lease(url) as context:
+                    page = await context.new_page()
+                    result = await self._process_page(page, url, navigate=True)
+            else:
+                result = await self._process_page(page, url, navigate)
+            return result
+        finally:
+            _log_context.reset(log_context)
+            tracer.deactivate()
+            status = result.get("status", "unknown") if isinstance(result, dict) else "failed"
+            self.timings = tracer.finish(status)
 
-            except Exception as e:
-                print(f"[!] Error in form-like structure detection: {str(e)}")
+    @classmethod
+    def is_showing(cls, page, url: str) -> bool:
+        """Whether ``page`` already has ``url`` loaded (ignoring scheme, www. and trailing slash)."""
+        def key(value):
+            normalized = cls.normalize_url(value)
+            if not normalized:
+                return None
+            parsed = urlparse(normalized)
+            host = parsed.netloc[4:] if parsed.netloc.startswith('www.') else parsed.netloc
+            return host, parsed.path, parsed.query
+        current = key(page.url) if page.url and page.url != 'about:blank' else None
+        return current is not None and current == key(url)
 
+    async def _process_page(self, page, url: str, navigate: Optional[bool] = None) -> bool:
+        try:
+            log.info("Processing URL: %s", url)
+            if navigate is None:
+                navigate = not self.is_showing(page, url)
 
-        except Exception as e:
-            print(f"[!] Error finding form elements: {str(e)}")
-            return False
+            if navigate:
+                # Set realistic browser headers to avoid bot detection
+                await page.set_extra_http_headers({
+                    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                    'Accept-Language': 'en-US,en;q=0.5',
+                    'Accept-Encoding': 'gzip, deflate, br',
+                    'DNT': '1',
+                    'Connection': 'keep-alive',
+                    'Upgrade-Insecure-Requests': '1',
+                })
 
-    async def process_page(self, page, url: str) -> bool:
-        """Process a single page for form filling."""
-        try:
-            print(f"\n[🌐] Processing URL: {url}")
-
-            # Set realistic browser headers to avoid bot detection
-            await page.set_extra_http_headers({
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-            })
-
-            # Navigate to the page with retry logic
-            success = await self.load_page_with_retry(page, url)
-            if not success:
-                print(f"[!] Failed to load page after retries: {url}")
-                return False
+            if self.content_extractor:
+                await self.content_extractor.install(page.context)
+
+            # A repeat visit goes straight to where the form was found last
+            # time; cached_form_location falls back to ``url`` on a mismatch
+            entry = await self.cached_form_entry(url)
+            if navigate:
+                target = entry['form_url'] if entry else url
+                self.step("navigate", url=target)
+                # Navigate to the page with retry logic
+                success = await self.load_page_with_retry(page, target, max_retries=1 if entry else 3)
+                if not success and entry:
+                    log.info("Cached form page %s did not load, starting from %s", target, url)
+                    await self.forget_form_location(url)
+                    entry = None
+                    success = await self.load_page_with_retry(page, url)
+                if not success:
+                    log.warning("Failed to load page after retries: %s", url)
+                    return False
+            else:
+                log.debug("Page already loaded by caller, skipping navigation")
+                await self.wait_until_ready(page, self.readiness_timeout(urlparse(url).netloc.lower()))
                 
-            print("[✓] Page loaded successfully")
-            
+            log.info("Page loaded successfully")
+            self.step("loaded", url=page.url, navigations=self.navigation_count)
 
-            form_found = await self.find_form_elements(page)
-            if form_found is not None:
-                print(f"[✓] Form found with ID:{form_found} on current page")
+            self.field_map = {}
+            self.submit_selector = None
+            # A still-valid cached location skips discovery (and find_button)
+            form_found = await self.cached_form_location(page, url, entry)
+            cached = bool(form_found)
+            if not cached:
+                form_found = await self.find_form_elements(page)
+            if form_found:
+                log.info("Form found with ID:%s on current page", form_found)
+                self.step("form_found", identifier=list(form_found), url=page.url, cached=cached)
+                # Start CAPTCHA solving now so it overlaps with filling
+                self.start_captcha_solving(page, page.url)
                 # Fill the form
                 success = await self.fill_form(page,form_found)
                 if not success:
-                    print("[!] Failed to fill form")
+                    log.warning("Failed to fill form")
                     return False
             else:
-                print("[!] No form found on current page, looking for form button...")
+                log.warning("No form found on current page, looking for form button...")
+                self.step("find_button")
                 # Try to find and click a button that might lead to a form
                 success = await self.find_button(page)
                 await page.wait_for_load_state("networkidle")
                 if not success:
-                    print("[!] Could not find button that lead to form")
+                    log.warning("Could not find button that lead to form")
                     return False
                 
                 # Handle page context after button click
                 context_success, page = await self.handle_page_context_after_button_click(page, success)
                 
                 if not context_success:
-                    print("[!] Failed to handle page context after button click")
+                    log.warning("Failed to handle page context after button click")
                     return False
                 
-                print(f"[✓] Using target page for form detection: {page.url}")
+                log.info("Using target page for form detection: %s", page.url)
+                self.step("followed_button", url=page.url)
 
                 try:
                     form_found = await self.find_form_elements(page)
                     if form_found:
+                        self.step("form_found", identifier=list(form_found), url=page.url)
+                        self.start_captcha_solving(page, page.url)
                         # Fill the form on the new page
                         success = await self.fill_form(page,form_found)
                         
                         if not success:
-                            print("[!] Failed to fill form")
+                            log.warning("Failed to fill form")
                             return False
                     else:
-                        print("[!] No form found on target page")
+                        log.warning("No form found on target page")
                         return False
                     
                 except Exception as e:
-                    print(f"[!] Error finding form on target page: {str(e)}")
+                    log.warning("Error finding form on target page: %s", e)
                     return False
             
             # Submit the form (use target_page if available, otherwise use original page)
             submit_page = page if 'page' in locals() else page
+            form_url = submit_page.url
+            self.step("submit")
             success = await self.submit_form('input[type="submit"]', url, submit_page, form_found)
             if not success:
-                print("[!] Form submission failed or could not be verified")
+                log.warning("Form submission failed or could not be verified")
+                if cached:
+                    await self.forget_form_location(url)
                 return False
             
-            print("[✓] Form processed successfully")
+            await self.remember_form_location(url, form_url, form_found)
+            log.info("Form processed successfully")
             return {"status": "success", "message": "[✓] Form processed successfully"}
             
         except Exception as e:
-            print(f"[!] Error processing URL {url}: {str(e)}")
+            log.error("Error processing URL %s: %s", url, e)
             return {"status": "error", "message": str(e)}
+        finally:
+            self.cancel_captcha_solving()
+
+    # Visible text of the region around the form (its enclosing section, or
+    # the body when there is no form), which is where success and error
+    # messages usually render.
+    REGION_TEXT_SCRIPT = """
+        (selector) => {
+            const form = selector ? document.querySelector(selector) : null;
+            const region = form
+                ? (form.closest('section, main, article, [role="main"], [role="dialog"]') || form.parentElement || form)
+                : document.body;
+            return region ? region.innerText : '';
+        }
+    """
 
+    async def page_region_text(self, page, form_selector: Optional[str] = None) -> str:
+        """Visible text around the form instead of the page's full HTML."""
+        try:
+            return await page.evaluate(self.REGION_TEXT_SCRIPT, form_selector) or ''
+        except Exception as e:
+            log.warning("Could not read region text, using page HTML: %s", e)
+            return await page.content()
+
+    @traced("submit_form")
     async def submit_form(self, selector: str,url, page, identifier, parent_div=None) -> bool:
         """Submit the form and verify the submission.
             Will  add parent div button check case later on"""
+        capture = NetworkCapture()
         try:
-            print("[🔍] Monitoring Form Submission")
+            log.debug("Monitoring Form Submission")
             
             # Get the initial URL
             initial_url = page.url
@@ -1685,6 +3099,7 @@ class DynamicWeb:
             
             # First, try to find submit button within the specific form identified by the identifier
             submit_button = None
+            cached_submit = self.cached_submit_selector
             
             # Define submit button selectors to try
             submit_selectors = [
@@ -1707,29 +3122,18 @@ class DynamicWeb:
                 'button:has-text("Send Message")',
                 'button:has-text("Submit Form")'
             ]
+            if cached_submit:
+                # The selector that worked on this form last time goes first
+                submit_selectors = [cached_submit] + [sel for sel in submit_selectors if sel != cached_submit]
             
             # Strategy 1: Use AI-powered button detection to find submit button
-            print(f"[🎯] Using AI analyzer to find submit button for form identified by {key}: {value}")
-            
-            # Set up network request monitoring
-            requests_log = []
+            log.info("Using AI analyzer to find submit button for form identified by %s: %s", key, value)
             
-            async def log_request(route):
-                request = route.request
-                requests_log.append({
-                    'url': request.url,
-                    'method': request.method,
-                    'headers': dict(request.headers),
-                    'post_data': request.post_data
-                })
-                print(f"[📡] Request: {request.method} {request.url}")
-                await route.continue_()
-            
-            # Start monitoring network requests
-            await page.route("**", log_request)
+            # Passively record form submissions (document/XHR/fetch POSTs)
+            capture.attach(page)
             
             # Set up MutationObserver before button click to track DOM changes
-            print("[🔍] Setting up MutationObserver to track DOM changes...")
+            log.debug("Setting up MutationObserver to track DOM changes...")
             await page.evaluate("""
                 () => {
                     window._formSubmitTime = Date.now();
@@ -1757,14 +3161,19 @@ class DynamicWeb:
                 }
             """)
             
-            # Use the AI-powered find_button function to detect submit buttons
-            ai_button_success = await self.find_button(page)
+            # Use the AI-powered find_button function to detect submit buttons,
+            # unless the cache already knows which button submits this form
+            ai_button_success = False
+            if cached_submit:
+                log.info("Using cached submit selector: %s", cached_submit)
+            else:
+                ai_button_success = await self.find_button(page)
             
             if ai_button_success:
-                print("[✓] AI analyzer found and clicked a submit button")
+                log.info("AI analyzer found and clicked a submit button")
                 
                 # Monitor network requests to see what URLs are being requested
-                print("[📡] Monitoring network requests after button click...")
+                log.debug("Monitoring network requests after button click...")
                 
                 # Wait for any navigation or form submission to complete
                 await page.wait_for_load_state("networkidle")
@@ -1772,24 +3181,24 @@ class DynamicWeb:
                 
                 # Check if the button click resulted in a form submission
                 current_url = page.url
-                print(f"[🔍] Current URL after AI button click: {current_url}")
+                log.debug("Current URL after AI button click: %s", current_url)
                 
                 # Get all recent network requests
                 try:
                     # Check captured network requests
-                    print(f"[📊] Total requests captured: {len(requests_log)}")
-                    for i, req in enumerate(requests_log):
-                        print(f"[📡] Request {i+1}: {req['method']} {req['url']}")
+                    log.debug("Total requests captured: %s", len(capture.entries))
+                    for i, req in enumerate(capture.entries):
+                        log.debug("Request %s: %s %s", i+1, req['method'], req['url'])
                         if req['post_data']:
-                            print(f"[📡] Post data: {req['post_data'][:200]}...")
+                            log.debug("Post data: %s...", req['post_data'][:200])
                     
                     # Check current page state
                     page_title = await page.title()
-                    print(f"[📄] Page title: {page_title}")
+                    log.debug("Page title: %s", page_title)
 
                     
                 except Exception as e:
-                    print(f"[!] Error monitoring page state: {str(e)}")
+                    log.warning("Error monitoring page state: %s", e)
                 
                 # Check for form submission indicators
                 try:
@@ -1806,12 +3215,12 @@ class DynamicWeb:
                     
                     for indicator in success_indicators:
                         if await page.locator(indicator).count() > 0:
-                            print(f"[✓] Found success indicator: {indicator}")
+                            log.info("Found success indicator: %s", indicator)
                             return True
                     
                     # Check if URL changed (indicating form submission)
                     if current_url != initial_url:
-                        print(f"[✓] URL changed from {initial_url} to {current_url}")
+                        log.info("URL changed from %s to %s", initial_url, current_url)
                         return True
                     
                     # Check for form submission response
@@ -1819,57 +3228,50 @@ class DynamicWeb:
                         # Look for any response content that might indicate success
                         page_content = await page.content()
                         if any(word in page_content.lower() for word in ['thank', 'success', 'submitted', 'sent']):
-                            print("[✓] Found success keywords in page content")
+                            log.info("Found success keywords in page content")
                             return True
                     except Exception as e:
-                        print(f"[!] Error checking page content: {str(e)}")
+                        log.warning("Error checking page content: %s", e)
                     
-                    print("[ℹ️] AI button click completed, but no clear success indicators found")
+                    log.debug("AI button click completed, but no clear success indicators found")
                     return True  # Assume success if no clear failure indicators
                     
                 except Exception as e:
-                    print(f"[!] Error checking form submission result: {str(e)}")
+                    log.warning("Error checking form submission result: %s", e)
                     return True  # Assume success if we can't determine
-            else:
-                print("[!] AI analyzer could not find a suitable submit button")
+            elif not cached_submit:
+                log.warning("AI analyzer could not find a suitable submit button")
             
             # Fallback: Try traditional form-specific button detection
-            print("[🔄] Falling back to traditional form-specific button detection...")
+            log.debug("Falling back to traditional form-specific button detection...")
             
             for sel in submit_selectors:
                 try:
-                    if key == 'id':
-                        # Look for submit button within the form with specific ID
-                        form_selector = f'form#{value}'
-                        button_selector = f'form#{value} {sel}'
-                    elif key == 'class':
-                        # Look for submit button within the form with specific class
-                        form_selector = f'form.{value.strip().split()[0]}'
-                        button_selector = f'form.{value.strip().split()[0]} {sel}'
+                    if key in ('id', 'class', 'selector'):
+                        # Look for submit button within the identified form
+                        form_selector = self.form_selector(identifier)
+                        button_selector = f'{form_selector} {sel}'
                     elif key == 'iframe':
-                        # For iframe forms, look within the iframe
-                        print(f"[🖼️] Looking for submit button within iframe: {value}")
-                        # Try to find iframe and access its content
-                        iframe = page.locator(f'iframe#{value}, iframe[title="{value}"]')
-                        if await iframe.count() > 0:
-                            frame = await iframe.first.content_frame()
-                            if frame:
-                                # Look for submit button within the iframe
-                                for iframe_sel in submit_selectors:
-                                    try:
-                                        iframe_button = frame.locator(iframe_sel)
-                                        if await iframe_button.count() > 0:
-                                            # Check if button is visible
-                                            is_visible = await iframe_button.first.is_visible()
-                                            if is_visible:
-                                                submit_button = iframe_button.first
-                                                print(f"[✓] Found visible submit button in iframe with selector: {iframe_sel}")
-                                                break
-                                    except Exception:
-                                        continue
-                                if submit_button:
-                                    break
-                        continue
+                        # For iframe forms, look within the iframe (resolved
+                        # the same way fill_form resolved it); every selector
+                        # is tried inside, so the outer loop is done after this
+                        log.debug("Looking for submit button within iframe: %s", value)
+                        frame = await self._resolve_form_frame(page, value)
+                        if frame:
+                            for iframe_sel in submit_selectors:
+                                try:
+                                    iframe_button = frame.locator(iframe_sel)
+                                    if await iframe_button.count() > 0:
+                                        # Check if button is visible
+                                        is_visible = await iframe_button.first.is_visible()
+                                        if is_visible:
+                                            submit_button = iframe_button.first
+                                            self.submit_selector = iframe_sel
+                                            log.info("Found visible submit button in iframe with selector: %s", iframe_sel)
+                                            break
+                                except Exception:
+                                    continue
+                        break
                     else: 
                         continue
                    
@@ -1890,14 +3292,15 @@ class DynamicWeb:
                         
                         if is_visible:
                             submit_button = button.first
-                            print(f"[✓] Found visible submit button within form with selector: {sel}")
+                            self.submit_selector = sel
+                            log.info("Found visible submit button within form with selector: %s", sel)
                             break
                 except Exception as e:
-                    print(f"[!] Error checking selector {sel}: {str(e)}")
+                    log.debug("Error checking selector %s: %s", sel, e)
                     continue
             
             if not submit_button:
-                print("[!] No visible submit button found anywhere on the page")
+                log.warning("No visible submit button found anywhere on the page")
                 return False
 
             # Get the form method and check if it's using JavaScript
@@ -1933,20 +3336,25 @@ class DynamicWeb:
                     'mutation': 0  # New indicator for DOM changes
                 }
 
+                if response_status is None:
+                    response_status = capture.last_status(since=submitted_at)
+                    if response_status is not None:
+                        log.debug("Using captured submission status: %s", response_status)
+
                 if response_status is not None:
                     indicators['response_status'] = 1 if response_status in [200, 201, 202, 204, 302] else 0
-                    print(f"[✓] Response status: {response_status}")
+                    log.info("Response status: %s", response_status)
 
                 current_url = page.url
                 if current_url != initial_url:
                     indicators['url_change'] = (
                         1 if any(w in current_url.lower() for w in ['thank', 'success']) else 0.5
                     )
-                    print("[✓] URL changed or contains success indicators")
+                    log.info("URL changed or contains success indicators")
 
                 # === Check for DOM changes using MutationObserver ===
                 try:
-                    print("[🔍] Checking for DOM changes using MutationObserver...")
+                    log.debug("Checking for DOM changes using MutationObserver...")
                     
                     # Check if MutationObserver logs exist
                     mutation_analysis = await page.evaluate("""
@@ -2009,49 +3417,43 @@ class DynamicWeb:
                     """)
                     
                     if mutation_analysis['hasLogs']:
-                        print(f"[📊] Mutation Analysis Results:")
-                        print(f"  - Total relevant logs: {mutation_analysis['totalLogs']}")
-                        print(f"  - Visible form fields: {mutation_analysis['visibleFieldsCount']}")
-                        
-                        if mutation_analysis['logs']:
-                            print(f"[📝] Recent DOM changes:")
-                            for i, log in enumerate(mutation_analysis['logs']):
-                                print(f"    {i+1}. '{log['text']}' (at {log['time']})")
+                        log.debug("Mutation Analysis Results: %s relevant logs, %s visible form fields",
+                                  mutation_analysis['totalLogs'], mutation_analysis['visibleFieldsCount'])
+                        if log.isEnabledFor(logging.DEBUG):
+                            for i, change in enumerate(mutation_analysis['logs']):
+                                log.debug("Recent DOM change %d: %r (at %s)", i + 1, change['text'], change['time'])
                         
                         # Priority 1: Check for success/error messages
                         if mutation_analysis['successMessage']:
-                            print(f"[✅] Found success message: '{mutation_analysis['successMessage']}'")
+                            log.info("Found success message: '%s'", mutation_analysis['successMessage'])
                             indicators['mutation'] = 1
                         elif mutation_analysis['errorMessage']:
-                            print(f"[❌] Found error message: '{mutation_analysis['errorMessage']}'")
+                            log.error("Found error message: '%s'", mutation_analysis['errorMessage'])
                             indicators['mutation'] = 0
                         # Priority 2: Check for form fields disappearing
                         elif mutation_analysis['visibleFieldsCount'] == 0:
-                            print("[✅] All form fields disappeared - likely successful submission")
+                            log.info("All form fields disappeared - likely successful submission")
                             indicators['mutation'] = 1
                         else:
-                            print("[ℹ️] No clear success/error indicators in DOM changes")
+                            log.debug("No clear success/error indicators in DOM changes")
                             indicators['mutation'] = 0.5
                     else:
-                        print("[ℹ️] No mutation logs found - using traditional indicators")
+                        log.debug("No mutation logs found - using traditional indicators")
                         indicators['mutation'] = 0.5
                         
                 except Exception as e:
-                    print(f"[!] Error in MutationObserver analysis: {str(e)}")
+                    log.warning("Error in MutationObserver analysis: %s", e)
                     indicators['mutation'] = 0.5
 
                 # === Look for success/failure messages (traditional method) ===
-                form_selector = (
-                    f'form#{value}' if key == 'id'
-                    else f'form.{value.strip().split()[0]}' if key == 'class'
-                    else parent_div
-                )
+                form_selector = self.form_selector(identifier) or parent_div
 
                 try:
-                    if form_selector:
-                        content = await page.locator(form_selector).inner_text()
+                    article = await self.content_extractor.extract(page) if self.content_extractor else None
+                    if article and article['text']:
+                        content = f"{article['title']}\n{article['text']}"
                     else:
-                        content = await page.content()
+                        content = await self.page_region_text(page, form_selector)
                     
                     analysis = await self.sentiment_analyzer.analyze_text(content)
                     if analysis['status'] == 'success':
@@ -2061,9 +3463,9 @@ class DynamicWeb:
                     else:
                         indicators['message'] = 0.5
 
-                    print(f"[✓] Agent message analysis: {analysis['status']} — {analysis['reasoning']}")
+                    log.info("Agent message analysis: %s — %s", analysis['status'], analysis['reasoning'])
                 except Exception as e:
-                    print(f"[!] Failed to analyze message: {e}")
+                    log.warning("Failed to analyze message: %s", e)
 
                 final_prob = (
                     indicators['response_status'] * 0.4 +
@@ -2071,7 +3473,7 @@ class DynamicWeb:
                     indicators['message'] * 0.2 +
                     indicators['mutation'] * 0.2  # Add mutation indicator to final calculation
                 )
-                print(f"[📊] Final submission probability: {final_prob:.2f}")
+                log.debug("Final submission probability: %.2f", final_prob)
                 return final_prob >= 0.5
 
 
@@ -2088,43 +3490,35 @@ class DynamicWeb:
             for selector in captcha_message_selectors:
                 try:
                     if await page.locator(selector).count() > 0:
-                        print(f"[!] Site is protected by CAPTCHA: {selector}")
+                        log.warning("Site is protected by CAPTCHA: %s", selector)
                         return {"status": "error", "message": "Site is protected by CAPTCHA and cannot be automated"}
                 except Exception:
                     continue
 
-            # CAPTCHA detection - use the enhanced check_for_captcha method
-            has_solvable_captcha = await self.check_for_captcha(page)
-            
-            if has_solvable_captcha:
-                print("[🤖] Solvable CAPTCHA detected, attempting to solve...")
-                
-                # Get site key using the enhanced method
-                site_key = await self.site_key(url)
-                if not site_key:
-                    print("[!] Could not find site key")
-                else:
-                        print(f"[🔑] Found site key: {site_key}")
-                        
-                        # Solve CAPTCHA
-                        solver = self.Captcha_solver(site_key, url)
-                        if not solver:
-                            print("[!] Failed to solve CAPTCHA")
-                        else:
-                        # Set the response
-                            try:
-                                await page.evaluate(f'''
-                                const textarea = document.querySelector("textarea[name='g-recaptcha-response']");
-                                if (textarea) {{
-                                    textarea.style.display = 'block';
-                                    textarea.value = "{solver}";
-                                }}
-                                ''')
-                                print("[✓] CAPTCHA response set")
-                            except Exception as e:
-                             print(f"[!] Error setting CAPTCHA response: {str(e)}")
+            # CAPTCHA: reuse the speculative solve started before filling, if any
+            captcha_task = self._captcha_task or self.start_captcha_solving(page, page.url)
+            self._captcha_task = None
+            try:
+                solver = await captcha_task
+            except Exception as e:
+                log.warning("CAPTCHA handling failed: %s", e)
+                solver = None
+
+            if solver:
+                # Set the response
+                try:
+                    await page.evaluate(f'''
+                    const textarea = document.querySelector("textarea[name='g-recaptcha-response']");
+                    if (textarea) {{
+                        textarea.style.display = 'block';
+                        textarea.value = "{solver}";
+                    }}
+                    ''')
+                    log.info("CAPTCHA response set")
+                except Exception as e:
+                    log.warning("Error setting CAPTCHA response: %s", e)
             else:
-                print("[ℹ️] No solvable CAPTCHA found, proceeding with form submission")
+                log.debug("No CAPTCHA solution to apply, proceeding with form submission")
 
             # === Submit the form ===
             expecter = page.expect_response(lambda response: (
@@ -2133,6 +3527,7 @@ class DynamicWeb:
             )) if form_info['method'] != 'get' and not form_info['hasSubmitHandler'] else \
                 page.expect_response(lambda response: 'analytics' not in response.url.lower())
 
+            submitted_at = time.time()
             async with expecter as response_info:
                 try:
                     try:
@@ -2145,21 +3540,24 @@ class DynamicWeb:
 
                     try:
                         response = await response_info.value
-                        print(f"[📡] Request URL: {response.url}")
-                        print(f"[📡] Response Status: {response.status}")
+                        log.debug("Request URL: %s", response.url)
+                        log.debug("Response Status: %s", response.status)
                         await page.wait_for_load_state("networkidle")
                         return await check_success_indicators(response.status)
                     except Exception:
                         await page.wait_for_load_state("networkidle")
                         return await check_success_indicators()
                 except Exception as e:
-                    print(f"[!] Error during form submission: {e}")
+                    log.warning("Error during form submission: %s", e)
                     return False
 
         except Exception as e:
-            print(f"[!] Unexpected error in submit_form: {e}")
+            log.error("Unexpected error in submit_form: %s", e)
             return False
+        finally:
+            capture.detach()
 
+    @traced("follow_button")
     async def handle_page_context_after_button_click(self, page, button_click_success: bool) -> tuple[bool, object]:
         """
         Handle page context after button click and return the appropriate page for form detection.
@@ -2174,20 +3572,23 @@ class DynamicWeb:
         """
         try:
             if not button_click_success:
-                print("[!] Button click was not successful")
+                log.warning("Button click was not successful")
                 return False, page
                             
             await page.wait_for_load_state("networkidle")
-            print("[🔍] Checking page context after button click...")
+            log.debug("Checking page context after button click...")
             
-            # Debug: Save current page HTML to file
-            try:
-                html_content = await page.content()
-                with open("debug_page_after_click.html", "w", encoding="utf-8") as f:
-                    f.write(html_content)
-                print("[📄] Debug: Page HTML saved to 'debug_page_after_click.html'")
-            except Exception as e:
-                print(f"[!] Failed to save debug HTML: {str(e)}")
+            # Debug: Save current page HTML to file (debug logging only)
+            if log.isEnabledFor(logging.DEBUG):
+                try:
+                    html_content = await page.content()
+                    path = os.path.join(self.DEBUG_DIR, "page_after_click.html")
+                    os.makedirs(self.DEBUG_DIR, exist_ok=True)
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(html_content)
+                    log.debug("Debug: Page HTML saved to '%s'", path)
+                except Exception as e:
+                    log.warning("Failed to save debug HTML: %s", e)
             
             # Get the browser context
             context = page.context
@@ -2197,43 +3598,46 @@ class DynamicWeb:
             
             # Check for new pages in the same context (new tabs)
             all_pages = context.pages
-            print(f"[ℹ️] Total pages in context: {len(all_pages)}")
+            log.debug("Total pages in context: %s", len(all_pages))
             
             # Case 1: New page in same context (new tab)
             if len(all_pages) > 1:
-                print("[✓] New tab detected!")
+                log.info("New tab detected!")
                 
                 # Get the newest page (last in the list)
                 new_page = all_pages[-1]
                 current_url = new_page.url
-                print(f"[✓] New tab URL: {current_url}")
+                log.info("New tab URL: %s", current_url)
                 
                 # Switch to the new page
                 await new_page.bring_to_front()
-                print("[✓] Switched to new tab")
+                log.info("Switched to new tab")
                 
                 # Wait for the new page to load completely
                 await new_page.wait_for_load_state("networkidle")
                 await new_page.wait_for_timeout(3000)  # Extra wait for dynamic content
                 
-                # Debug: Save new page HTML to file
-                try:
-                    html_content = await new_page.content()
-                    with open("debug_new_page_after_click.html", "w", encoding="utf-8") as f:
-                        f.write(html_content)
-                    print("[📄] Debug: New page HTML saved to 'debug_new_page_after_click.html'")
-                except Exception as e:
-                    print(f"[!] Failed to save new page debug HTML: {str(e)}")
+                # Debug: Save new page HTML to file (debug logging only)
+                if log.isEnabledFor(logging.DEBUG):
+                    try:
+                        html_content = await new_page.content()
+                        path = os.path.join(self.DEBUG_DIR, "new_page_after_click.html")
+                        os.makedirs(self.DEBUG_DIR, exist_ok=True)
+                        with open(path, "w", encoding="utf-8") as f:
+                            f.write(html_content)
+                        log.debug("Debug: New page HTML saved to '%s'", path)
+                    except Exception as e:
+                        log.warning("Failed to save new page debug HTML: %s", e)
                 
                 return True, new_page
             
             # Case 2: No new tab, stay on current page
             else:
-                print("[ℹ️] No new tab detected, staying on current page")
+                log.debug("No new tab detected, staying on current page")
                 
                 # Check if URL changed on current page
                 current_url = page.url
-                print(f"[ℹ️] Current page URL: {current_url}")
+                log.debug("Current page URL: %s", current_url)
                 
                 # Wait for any dynamic content to load
                 await page.wait_for_load_state("networkidle")
@@ -2242,5 +3646,750 @@ class DynamicWeb:
                 return True, page
                 
         except Exception as e:
-            print(f"[!] Error handling page context: {str(e)}")
-            return False, page
\ No newline at end of file
+            log.warning("Error handling page context: %s", e)
+            return False, page
+
+
+class BatchRunner:
+    """Runs DynamicWeb jobs for a stream of URLs over a shared BrowserPool.
+
+    At most ``concurrency`` jobs run at once and at most ``per_domain`` of
+    them hit the same domain, with ``domain_delay`` seconds between jobs on a
+    domain. A URL whose domain is busy is set aside (up to ``max_deferred``
+    of them) and picked up once the domain frees, so one slow site never
+    holds a worker while other domains wait. Each result is appended to
+    ``results_path`` (JSON lines) as soon as its job finishes; URLs already
+    in that file are skipped, so an interrupted run resumes where it stopped.
+    """
+    # How often workers re-check deferred URLs while nothing else is ready
+    DEFER_POLL = 0.25
+
+    def __init__(self, browser_pool: BrowserPool, cap_api: str, api_key: str, results_path: str,
+                 concurrency: int = 4, per_domain: int = 1, domain_delay: float = 2.0,
+                 job_timeout: float = 300.0, user_data: Optional[Dict] = None,
+                 max_deferred: Optional[int] = None):
+        self.browser_pool = browser_pool
+        self.cap_api = cap_api
+        self.api_key = api_key
+        self.results_path = results_path
+        self.concurrency = concurrency
+        self.per_domain = per_domain
+        self.domain_delay = domain_delay
+        self.job_timeout = job_timeout
+        self.user_data = user_data
+        self.max_deferred = max_deferred or concurrency * 8
+        # Only domains with a running job or a pending delay have entries
+        self._domain_active: Dict[str, int] = {}
+        self._domain_ready_at: Dict[str, float] = {}
+        self._deferred: Dict[str, deque] = {}
+        self._deferred_count = 0
+
+    @staticmethod
+    def url_digest(url: str) -> int:
+        return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def load_checkpoint(self) -> set:
+        """Digests (see ``url_digest``) of the URLs that already have a result."""
+        done = set()
+        if not os.path.exists(self.results_path):
+            return done
+        with open(self.results_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    done.add(self.url_digest(json.loads(line)['url']))
+                except (ValueError, KeyError):
+                    continue
+        return done
+
+    async def run(self, urls: Iterable) -> Dict[str, int]:
+        """Process every URL (or ``iter_work_items`` item) and return counts per status."""
+        done = self.load_checkpoint()
+        if done:
+            log.info("Resuming, %s URLs already processed", len(done))
+        stats: Dict[str, int] = {"skipped": 0}
+        # A small bounded queue keeps only a few URLs in memory at a time
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        with open(self.results_path, 'a', encoding='utf-8') as out:
+            workers = [asyncio.create_task(self._worker(queue, out, stats)) for _ in range(self.concurrency)]
+            try:
+                for item in urls:
+                    url = item.get('url') if isinstance(item, dict) else item
+                    url = url.strip() if isinstance(url, str) else None
+                    digest = self.url_digest(url) if url else None
+                    if digest is None or digest in done:
+                        stats["skipped"] += 1
+                        continue
+                    # Also skips repeats of this URL later in the same input
+                    done.add(digest)
+                    await queue.put(url)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+
+        log.debug("Batch finished: %s", stats)
+        return stats
+
+    @staticmethod
+    def _domain(url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+    def _domain_free(self, domain: str, now: float) -> bool:
+        return self._domain_active.get(domain, 0) < self.per_domain \
+            and self._domain_ready_at.get(domain, 0) <= now
+
+    def _take_deferred(self) -> Optional[str]:
+        """Oldest deferred URL whose domain can take a job now."""
+        now = asyncio.get_running_loop().time()
+        for domain, urls in self._deferred.items():
+            if self._domain_free(domain, now):
+                url = urls.popleft()
+                if not urls:
+                    del self._deferred[domain]
+                self._deferred_count -= 1
+                return url
+        return None
+
+    async def _worker(self, queue: asyncio.Queue, out, stats: Dict[str, int]):
+        draining = False
+        while True:
+            url = self._take_deferred()
+            if url is None:
+                if draining or self._deferred_count >= self.max_deferred:
+                    if not self._deferred_count:
+                        return
+                    await asyncio.sleep(self.DEFER_POLL)
+                    continue
+                if self._deferred_count:
+                    # Keep polling the deferred URLs while waiting for new ones
+                    try:
+                        url = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        await asyncio.sleep(self.DEFER_POLL)
+                        continue
+                else:
+                    url = await queue.get()
+                if url is None:
+                    draining = True
+                    continue
+                domain = self._domain(url)
+                if not self._domain_free(domain, asyncio.get_running_loop().time()):
+                    self._deferred.setdefault(domain, deque()).append(url)
+                    self._deferred_count += 1
+                    continue
+            record = await self._run_job(url)
+            stats[record["status"]] = stats.get(record["status"], 0) + 1
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+
+    async def _run_job(self, url: str) -> Dict[str, Any]:
+        domain = self._domain(url)
+        loop = asyncio.get_running_loop()
+        self._domain_active[domain] = self._domain_active.get(domain, 0) + 1
+        started = loop.time()
+        pipe = None
+        try:
+            pipe = DynamicWeb(self.cap_api, self.api_key, user_data=self.user_data,
+                              browser_pool=self.browser_pool)
+            result = await asyncio.wait_for(pipe.process_page(None, url), timeout=self.job_timeout)
+        except asyncio.TimeoutError:
+            result = {"status": "timeout", "message": f"Job exceeded {self.job_timeout:.0f}s"}
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+        finally:
+            self._finish_domain(domain, loop.time())
+        # process_page records its (partial) trace even when it is cancelled
+        timings = pipe.timings if pipe is not None else {}
+
+        if not isinstance(result, dict):
+            result = {"status": "failed", "message": "Form could not be processed"}
+        return {
+            "url": url,
+            "status": result.get("status", "unknown"),
+            "message": result.get("message", ""),
+            "elapsed": round(loop.time() - started, 2),
+            "steps": timings.get("steps", {}),
+            "round_trips": timings.get("round_trips", 0),
+            "navigations": pipe.navigation_count if pipe is not None else 0,
+            "finished_at": time.time()
+        }
+
+    def _finish_domain(self, domain: str, now: float):
+        active = self._domain_active.get(domain, 1) - 1
+        if active > 0:
+            self._domain_active[domain] = active
+        else:
+            self._domain_active.pop(domain, None)
+        # Drop delays that have already passed so the map stays small
+        for other in [d for d, ready in self._domain_ready_at.items() if ready <= now]:
+            del self._domain_ready_at[other]
+        if self.domain_delay > 0:
+            self._domain_ready_at[domain] = now + self.domain_delay
+
+
+class MemoryJobStore:
+    """Job queue, records and step events held in this process.
+
+    ``max_pending`` bounds each shard's queue; ``enqueue`` returns False
+    when it is full so callers can push back. Finished records are kept for
+    ``result_ttl`` seconds.
+    """
+
+    def __init__(self, max_pending: int = 20, result_ttl: float = 3600, max_jobs: int = 10000):
+        self.max_pending = max_pending
+        self._queues: Dict[int, asyncio.Queue] = {}
+        self._records: TTLCache = TTLCache(maxsize=max_jobs, ttl=result_ttl)
+        self._events: TTLCache = TTLCache(maxsize=max_jobs, ttl=result_ttl)
+        self._changed: Optional[asyncio.Condition] = None
+
+    async def open(self):
+        self._changed = asyncio.Condition()
+
+    async def close(self):
+        pass
+
+    async def recover(self, shard: int = 0):
+        pass
+
+    def _queue(self, shard: int) -> asyncio.Queue:
+        if shard not in self._queues:
+            self._queues[shard] = asyncio.Queue(maxsize=self.max_pending)
+        return self._queues[shard]
+
+    async def enqueue(self, job_id: str, payload: Dict[str, Any], shard: int = 0) -> bool:
+        try:
+            self._queue(shard).put_nowait((job_id, payload))
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def dequeue(self, shard: int = 0, timeout: float = 1.0) -> Optional[tuple]:
+        try:
+            return await asyncio.wait_for(self._queue(shard).get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def pending(self) -> int:
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    async def requeue(self, job_id: str, payload: Dict[str, Any], shard: int = 0) -> bool:
+        # Nothing here outlives the process, so an interrupted job just ends
+        return False
+
+    async def drain(self, shard: int = 0) -> List[tuple]:
+        """Remove and return the queued jobs of ``shard``; they do not outlive this process."""
+        queue = self._queue(shard)
+        jobs = []
+        while not queue.empty():
+            jobs.append(queue.get_nowait())
+        return jobs
+
+    async def save(self, job_id: str, record: Dict[str, Any]):
+        self._records[job_id] = record
+
+    async def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._records.get(job_id)
+
+    async def add_event(self, job_id: str, event: Dict[str, Any]):
+        self._events.setdefault(job_id, []).append(event)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def events(self, job_id: str, start: int = 0, timeout: float = 15.0) -> List[Dict[str, Any]]:
+        """Events from index ``start`` on, waiting up to ``timeout`` for new ones."""
+        async with self._changed:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: len(self._events.get(job_id, ())) > start),
+                    timeout=timeout
+                )
+            except asyncio.TimeoutError:
+                pass
+        return self._events.get(job_id, [])[start:]
+
+
+class RedisJobStore:
+    """Redis-backed job store so several app processes share one queue.
+
+    Works with any Redis-compatible server (Redis, Valkey, KeyDB). The
+    ``redis`` package is only needed when this backend is used.
+    """
+
+    def __init__(self, url: str, max_pending: int = 20, result_ttl: float = 3600, prefix: str = 'dynamicforms'):
+        self.url = url
+        self.max_pending = max_pending
+        self.result_ttl = int(result_ttl)
+        self.prefix = prefix
+        self._redis = None
+
+    async def open(self):
+        try:
+            import redis.asyncio as aioredis
+        except ImportError as e:
+            raise RuntimeError("JOB_BACKEND=redis needs the 'redis' package (pip install redis)") from e
+        self._redis = aioredis.from_url(self.url, decode_responses=True)
+        await self._redis.ping()
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def recover(self, shard: int = 0):
+        pass
+
+    def _key(self, *parts) -> str:
+        return ':'.join((self.prefix,) + tuple(str(part) for part in parts))
+
+    async def enqueue(self, job_id: str, payload: Dict[str, Any], shard: int = 0) -> bool:
+        queue = self._key('queue', shard)
+        if await self._redis.llen(queue) >= self.max_pending:
+            return False
+        await self._redis.lpush(queue, json.dumps({"id": job_id, "payload": payload}))
+        return True
+
+    async def dequeue(self, shard: int = 0, timeout: float = 1.0) -> Optional[tuple]:
+        item = await self._redis.brpop([self._key('queue', shard)], timeout=max(1, int(timeout)))
+        if not item:
+            return None
+        job = json.loads(item[1])
+        return job["id"], job["payload"]
+
+    async def pending(self) -> int:
+        total = 0
+        async for key in self._redis.scan_iter(match=self._key('queue', '*')):
+            total += await self._redis.llen(key)
+        return total
+
+    async def requeue(self, job_id: str, payload: Dict[str, Any], shard: int = 0) -> bool:
+        """Put an interrupted job back at the head of its shard's queue."""
+        await self._redis.rpush(self._key('queue', shard), json.dumps({"id": job_id, "payload": payload}))
+        return True
+
+    async def drain(self, shard: int = 0) -> List[tuple]:
+        # Queued jobs stay in Redis for the next worker of this shard
+        return []
+
+    async def save(self, job_id: str, record: Dict[str, Any]):
+        await self._redis.set(self._key('job', job_id), json.dumps(record), ex=self.result_ttl)
+
+    async def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self._redis.get(self._key('job', job_id))
+        return json.loads(raw) if raw else None
+
+    async def add_event(self, job_id: str, event: Dict[str, Any]):
+        key = self._key('events', job_id)
+        await self._redis.rpush(key, json.dumps(event))
+        await self._redis.expire(key, self.result_ttl)
+
+    async def events(self, job_id: str, start: int = 0, timeout: float = 15.0) -> List[Dict[str, Any]]:
+        key = self._key('events', job_id)
+        deadline = time.monotonic() + timeout
+        while True:
+            raw = await self._redis.lrange(key, start, -1)
+            if raw or time.monotonic() >= deadline:
+                return [json.loads(item) for item in raw]
+            await asyncio.sleep(0.5)
+
+
+class SqliteJobStore:
+    """Job queue, records and step events in a SQLite file shared by local processes.
+
+    This is the default store of the multi-process mode: the web process
+    enqueues, each worker process claims jobs of its own shard, and every
+    process reads records and events from the same WAL-mode file. Jobs a
+    worker had claimed but not finished, because it crashed or was stopped
+    mid-job, are queued again when that shard restarts.
+
+    SQLite calls block (a writer may wait up to ``busy_timeout`` seconds for
+    the file lock), so they run on two single-thread executors, one per
+    connection: writes and claims on one, record and event reads on the
+    other, and the event loop never waits on the lock.
+    """
+
+    def __init__(self, path: str, max_pending: int = 20, result_ttl: float = 3600, poll_interval: float = 0.25,
+                 busy_timeout: float = 10.0):
+        self.path = path
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.busy_timeout = busy_timeout
+        self._db: Optional[sqlite3.Connection] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        self._write_executor: Optional[ThreadPoolExecutor] = None
+        self._read_executor: Optional[ThreadPoolExecutor] = None
+
+    async def _write(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._write_executor, func, *args)
+
+    async def _read(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, func, *args)
+
+    async def open(self):
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs-write")
+        self._read_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs-read")
+        await self._write(self._open_writer)
+        await self._read(self._open_reader)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=self.busy_timeout)
+
+    def _open_writer(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = self._connect()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, shard INTEGER NOT NULL DEFAULT 0, state TEXT NOT NULL,
+                payload TEXT, record TEXT NOT NULL, updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_by_state ON jobs (state, shard);
+            CREATE TABLE IF NOT EXISTS job_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, event TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS job_events_by_job ON job_events (job_id, seq);
+        """)
+        expired = time.time() - self.result_ttl
+        self._db.execute("DELETE FROM job_events WHERE job_id IN (SELECT id FROM jobs WHERE state = 'done' AND updated_at < ?)", (expired,))
+        self._db.execute("DELETE FROM jobs WHERE state = 'done' AND updated_at < ?", (expired,))
+
+    def _open_reader(self):
+        self._reader = self._connect()
+
+    async def close(self):
+        for connection, executor in ((self._db, self._write_executor), (self._reader, self._read_executor)):
+            if connection is not None:
+                await asyncio.get_running_loop().run_in_executor(executor, connection.close)
+            if executor is not None:
+                executor.shutdown(wait=False)
+        self._db = self._reader = None
+        self._write_executor = self._read_executor = None
+
+    async def recover(self, shard: int = 0):
+        count = await self._write(self._recover, shard)
+        if count:
+            log.info("Re-queued %s unfinished jobs of shard %s", count, shard)
+
+    def _recover(self, shard: int) -> int:
+        return self._db.execute(
+            "UPDATE jobs SET state = 'queued' WHERE state = 'claimed' AND shard = ?", (shard,)
+        ).rowcount
+
+    def _transaction(self, func, *args):
+        """Run ``func`` inside BEGIN IMMEDIATE, which takes the write lock up front."""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(*args)
+            self._db.execute("COMMIT")
+        except sqlite3.Error:
+            self._db.execute("ROLLBACK")
+            raise
+        return result
+
+    async def enqueue(self, job_id: str, payload: Dict[str, Any], shard: int = 0) -> bool:
+        return await self._write(self._transaction, self._enqueue, job_id, payload, shard)
+
+    def _enqueue(self, job_id: str, payload: Dict[str, Any], shard: int) -> bool:
+        # Counted inside the same transaction, so concurrent submitters cannot overshoot max_pending
+        queued = self._db.execute(
+            "SELECT COUNT(*) FROM jobs WHERE state = 'queued' AND shard = ?", (shard,)
+        ).fetchone()[0]
+        if queued >= self.max_pending:
+            return False
+        self._db.execute(
+            "UPDATE jobs SET state = 'queued', shard = ?, payload = ?, updated_at = ? WHERE id = ?",
+            (shard, json.dumps(payload), time.time(), job_id)
+        )
+        return True
+
+    async def requeue(self, job_id: str, payload: Dict[str, Any], shard: int = 0) -> bool:
+        """Queue an interrupted job again; it keeps its place by submission order."""
+        await self._write(self._requeue, job_id)
+        return True
+
+    def _requeue(self, job_id: str):
+        self._db.execute("UPDATE jobs SET state = 'queued' WHERE id = ?", (job_id,))
+
+    async def dequeue(self, shard: int = 0, timeout: float = 1.0) -> Optional[tuple]:
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self._write(self._transaction, self._claim, shard)
+            if job is not None or time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(self.poll_interval)
+
+    def _claim(self, shard: int) -> Optional[tuple]:
+        row = self._db.execute(
+            "SELECT id, payload FROM jobs WHERE state = 'queued' AND shard = ? ORDER BY rowid LIMIT 1", (shard,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE jobs SET state = 'claimed', updated_at = ? WHERE id = ?", (time.time(), row[0]))
+        return row[0], json.loads(row[1])
+
+    async def pending(self) -> int:
+        return await self._read(
+            lambda: self._reader.execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued'").fetchone()[0]
+        )
+
+    async def drain(self, shard: int = 0) -> List[tuple]:
+        # Queued jobs stay in the file for the next worker of this shard
+        return []
+
+    async def save(self, job_id: str, record: Dict[str, Any]):
+        await self._write(self._save, job_id, record)
+
+    def _save(self, job_id: str, record: Dict[str, Any]):
+        # A record with finished_at set marks the job done; otherwise its queue state is kept
+        self._db.execute(
+            "INSERT INTO jobs (id, state, record, updated_at) VALUES (?, 'new', ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET record = excluded.record, updated_at = excluded.updated_at, "
+            "state = CASE WHEN ? THEN 'done' ELSE jobs.state END",
+            (job_id, json.dumps(record), time.time(), record.get("finished_at") is not None)
+        )
+
+    async def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = await self._read(
+            lambda: self._reader.execute("SELECT record FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    async def add_event(self, job_id: str, event: Dict[str, Any]):
+        await self._write(
+            self._db.execute, "INSERT INTO job_events (job_id, event) VALUES (?, ?)", (job_id, json.dumps(event))
+        )
+
+    async def events(self, job_id: str, start: int = 0, timeout: float = 15.0) -> List[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            rows = await self._read(lambda: self._reader.execute(
+                "SELECT event FROM job_events WHERE job_id = ? ORDER BY seq LIMIT -1 OFFSET ?", (job_id, start)
+            ).fetchall())
+            if rows or time.monotonic() >= deadline:
+                return [json.loads(row[0]) for row in rows]
+            await asyncio.sleep(self.poll_interval * 2)
+
+
+class JobQueue:
+    """Runs submitted jobs on a bounded pool of workers.
+
+    ``submit`` stores a queued record and returns its id, or None when the
+    store is full. Each worker calls ``handler(payload, emit)`` where
+    ``emit`` appends a step event to the job; the handler's return value
+    becomes the job's result. Records move through queued, running and
+    finished (with the handler's status), and a final ``finished`` event
+    closes the stream. A job cut off by ``stop`` is queued again when the
+    store outlives the process (SQLite, Redis) and finishes as ``cancelled``
+    otherwise, as do queued jobs of the in-memory store; either way its open
+    streams get a ``finished`` event with status ``cancelled``.
+
+    Jobs are spread over ``shards`` by a hash of their domain, so every job
+    for a domain lands in the same worker process and hits its warm
+    caches. This queue's own workers only run jobs of ``shard``; a queue
+    with ``workers=0`` only submits (the web process in multi-process mode).
+    """
+
+    FINAL_STEP = 'finished'
+
+    def __init__(self, handler, workers: int = 2, store=None, shards: int = 1, shard: int = 0):
+        self.handler = handler
+        self.workers = workers
+        self.store = store or MemoryJobStore()
+        self.shards = max(1, shards)
+        self.shard = shard
+        self._tasks: List[asyncio.Task] = []
+        self._draining = False
+        self._closed = False
+        self._streams = 0
+
+    @classmethod
+    def from_env(cls, handler, workers: Optional[int] = None, shard: int = 0) -> "JobQueue":
+        """Build a queue from JOB_WORKERS, JOB_MAX_PENDING, JOB_RESULT_TTL, JOB_SHARDS and JOB_BACKEND.
+
+        JOB_BACKEND is ``memory`` (default), ``sqlite:///path/to/jobs.sqlite3``
+        or a ``redis://`` URL.
+        """
+        max_pending = int(os.environ.get("JOB_MAX_PENDING", 20))
+        result_ttl = float(os.environ.get("JOB_RESULT_TTL", 3600))
+        backend = os.environ.get("JOB_BACKEND", "memory")
+        if backend.startswith(("redis://", "rediss://", "unix://")):
+            store = RedisJobStore(backend, max_pending=max_pending, result_ttl=result_ttl)
+        elif backend.startswith("sqlite://"):
+            store = SqliteJobStore(backend[len("sqlite://"):].lstrip('/') or "cache/jobs.sqlite3",
+                                   max_pending=max_pending, result_ttl=result_ttl)
+        else:
+            store = MemoryJobStore(max_pending=max_pending, result_ttl=result_ttl)
+        if workers is None:
+            workers = int(os.environ.get("JOB_WORKERS", 2))
+        return cls(handler, workers=workers, store=store,
+                   shards=int(os.environ.get("JOB_SHARDS", 1)), shard=shard)
+
+    def shard_for(self, url: Optional[str]) -> int:
+        """Stable shard of ``url``'s domain (the same in every process)."""
+        if self.shards == 1:
+            return 0
+        domain = urlparse(DynamicWeb.normalize_url(url) or '').netloc.lower()
+        if domain.startswith('www.'):
+            domain = domain[4:]
+        digest = hashlib.blake2b(domain.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') % self.shards
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._draining = False
+        self._closed = False
+        await self.store.open()
+        if self.workers:
+            await self.store.recover(self.shard)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        log.info("Job queue started with %s workers (shard %s of %s)", self.workers, self.shard, self.shards)
+
+    async def stop(self, drain_timeout: float = 0):
+        """Stop the workers, letting running jobs finish for up to ``drain_timeout`` seconds."""
+        self._draining = True
+        tasks, self._tasks = self._tasks, []
+        if tasks and drain_timeout > 0:
+            log.info("Draining job queue (up to %.0fs)", drain_timeout)
+            await asyncio.wait(tasks, timeout=drain_timeout)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.workers:
+            for job_id, _ in await self.store.drain(self.shard):
+                record = await self.store.load(job_id) or {"id": job_id}
+                await self._finish_cancelled(job_id, record)
+        # Open streams read their last events and end before the store goes away
+        self._closed = True
+        deadline = time.monotonic() + 3
+        while self._streams and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        await self.store.close()
+
+    async def submit(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        job_id = uuid.uuid4().hex
+        record = {
+            "id": job_id,
+            "status": "queued",
+            "url": payload.get("url"),
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None
+        }
+        await self.store.save(job_id, record)
+        if not await self.store.enqueue(job_id, payload, self.shard_for(payload.get("url"))):
+            record.update(status="rejected", finished_at=time.time())
+            await self.store.save(job_id, record)
+            return None
+        await self.store.add_event(job_id, {"step": "queued", "time": record["submitted_at"]})
+        return record
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.store.load(job_id)
+
+    async def stream(self, job_id: str, heartbeat: float = 15.0):
+        """Yield the job's step events until it finishes; None marks a heartbeat.
+
+        Once ``stop`` closes the queue the stream reads what is left and ends.
+        """
+        seen = 0
+        quiet_since = time.monotonic()
+        self._streams += 1
+        try:
+            while True:
+                closing = self._closed
+                try:
+                    # Short waits so a closing queue is noticed promptly
+                    events = await self.store.events(job_id, seen, timeout=0 if closing else min(heartbeat, 1.0))
+                except Exception:
+                    if self._closed:
+                        return
+                    raise
+                for event in events:
+                    yield event
+                    if event.get("step") == self.FINAL_STEP and (closing or await self._really_finished(job_id)):
+                        return
+                seen += len(events)
+                if closing:
+                    return
+                if events:
+                    quiet_since = time.monotonic()
+                elif time.monotonic() - quiet_since >= heartbeat:
+                    quiet_since = time.monotonic()
+                    yield None
+        finally:
+            self._streams -= 1
+
+    async def _worker(self):
+        while not self._draining:
+            job = await self.store.dequeue(self.shard, timeout=1.0)
+            if job is None:
+                continue
+            job_id, payload = job
+            record = await self.store.load(job_id) or {"id": job_id, "url": payload.get("url")}
+            record.update(status="running", started_at=time.time())
+            await self.store.save(job_id, record)
+            await self.store.add_event(job_id, {"step": "running", "time": record["started_at"]})
+
+            # emit is synchronous for the pipeline; one pump writes events in order
+            events: asyncio.Queue = asyncio.Queue()
+            pump = asyncio.create_task(self._pump(job_id, events))
+            log_context = bind_log_context(job=job_id)
+            try:
+                result = await self.handler(payload, events.put_nowait)
+            except asyncio.CancelledError:
+                pump.cancel()
+                await asyncio.shield(self._interrupted(job_id, payload, record))
+                raise
+            except Exception as e:
+                log.exception("Job %s failed", job_id)
+                result = {"status": "error", "message": str(e)}
+            finally:
+                _log_context.reset(log_context)
+            events.put_nowait(None)
+            await pump
+            if not isinstance(result, dict):
+                result = {"status": "failed", "message": "Form could not be processed"}
+
+            record.update(status=result.get("status", "unknown"), finished_at=time.time(), result=result)
+            await self.store.save(job_id, record)
+            await self.store.add_event(job_id, {"step": self.FINAL_STEP, "time": record["finished_at"],
+                                                "status": record["status"]})
+
+    async def _really_finished(self, job_id: str) -> bool:
+        """False for a ``finished`` event of a run that was interrupted and queued again."""
+        record = await self.store.load(job_id)
+        return record is None or record.get("finished_at") is not None
+
+    async def _interrupted(self, job_id: str, payload: Dict[str, Any], record: Dict[str, Any]):
+        """Queue a job cut off mid-run again where the store allows, else cancel it."""
+        if not await self.store.requeue(job_id, payload, self.shard):
+            await self._finish_cancelled(job_id, record)
+            return
+        record.update(status="queued", started_at=None, finished_at=None)
+        await self.store.save(job_id, record)
+        # Streams in a stopping process end here; others follow the next run
+        await self.store.add_event(job_id, {"step": self.FINAL_STEP, "time": time.time(), "status": "cancelled"})
+
+    async def _finish_cancelled(self, job_id: str, record: Dict[str, Any]):
+        """Mark a job cancelled and close its event streams."""
+        record.update(status="cancelled", finished_at=time.time())
+        await self.store.save(job_id, record)
+        await self.store.add_event(job_id, {"step": self.FINAL_STEP, "time": record["finished_at"],
+                                            "status": "cancelled"})
+
+    async def _pump(self, job_id: str, events: asyncio.Queue):
+        while True:
+            event = await events.get()
+            if event is None:
+                return
+            try:
+                await self.store.add_event(job_id, event)
+            except Exception as e:
+                log.warning("Could not record step event for job %s: %s", job_id, e)